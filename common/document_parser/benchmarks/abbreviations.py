@@ -0,0 +1,78 @@
+"""Compare abbreviations.add_abbreviations_n with gamechangerml's expand_abbreviations
+
+    python -m common.document_parser.benchmarks.abbreviations <parsed json file or dir> [--repeat N]
+
+Inputs are parsed documents (pdf-to-json output), add_abbreviations_n needs their paragraphs.
+"""
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+from common.document_parser.lib import abbreviations
+from common.utils.parsed_json import iter_parsed_json_files, load_parsed_json
+
+
+def load_doc_dicts(path):
+    path = Path(path)
+    files = sorted(iter_parsed_json_files(path)) if path.is_dir() else [path]
+    for file in files:
+        try:
+            doc_dict = load_parsed_json(file)
+        except json.JSONDecodeError:
+            print(f"Skipping {file.name}, not valid json")
+            continue
+        if doc_dict.get("paragraphs"):
+            yield file.name, doc_dict
+
+
+def time_call(func, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="parsed json file or directory of them")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per document, the median is reported")
+    args = parser.parse_args()
+
+    try:
+        from gamechangerml.src.featurization.abbreviation import expand_abbreviations
+    except ImportError:
+        expand_abbreviations = None
+        print("gamechangerml not installed, only timing add_abbreviations_n")
+
+    totals = {"new_cold": 0.0, "new_warm": 0.0, "old": 0.0}
+    print(f"{'document':50} {'paras':>6} {'new cold ms':>12} {'new warm ms':>12} {'old ms':>10} {'found':>6} {'old found':>10}")
+    for name, doc_dict in load_doc_dicts(args.path):
+        abbreviations._PARAGRAPH_CACHE.clear()
+        start = time.perf_counter()
+        abbreviations.add_abbreviations_n(doc_dict, time_budget=None)
+        cold = time.perf_counter() - start
+        warm, _ = time_call(lambda: abbreviations.add_abbreviations_n(doc_dict, time_budget=None), args.repeat)
+        found = len(doc_dict["abbreviations_n"])
+
+        old, old_found = float("nan"), "-"
+        if expand_abbreviations is not None:
+            old, (_, old_abbreviations) = time_call(lambda: expand_abbreviations(doc_dict["text"]), args.repeat)
+            old_found = len(old_abbreviations)
+            totals["old"] += old
+
+        totals["new_cold"] += cold
+        totals["new_warm"] += warm
+        print(f"{name[:50]:50} {len(doc_dict['paragraphs']):>6} {cold * 1000:>12.2f} {warm * 1000:>12.2f} "
+              f"{old * 1000:>10.2f} {found:>6} {old_found:>10}")
+
+    print(f"{'total':50} {'':>6} {totals['new_cold'] * 1000:>12.2f} {totals['new_warm'] * 1000:>12.2f} "
+          f"{totals['old'] * 1000 if expand_abbreviations else float('nan'):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
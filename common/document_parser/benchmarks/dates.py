@@ -0,0 +1,75 @@
+"""Micro-benchmark for dates.find_dates against the previous four-pass extraction
+
+    python -m common.document_parser.benchmarks.dates [--pages N] [--repeat N] [--text-file PATH]
+
+Uses a synthetic document of --pages pages (about 3000 characters each, with a few
+dates per page) unless a plain text file is given.
+"""
+import argparse
+import random
+import re
+import statistics
+import time
+
+from common.document_parser.lib import dates
+
+SAMPLE_DATES = ["31 August, 2000", "August 31, 1984", "Sept. 4, 2012", "4 Dec 2019", "March 15 2021"]
+
+
+def synthetic_text(pages, seed=0):
+    rng = random.Random(seed)
+    words = ["the", "secretary", "shall", "issue", "policy", "department", "defense", "2.3", "(a)", "section",
+             "may", "march", "provide", "12", "support", "annual", "report", "1999", "december", "office"]
+    page_texts = []
+    for _ in range(pages):
+        tokens = [rng.choice(words) for _ in range(450)]
+        for _ in range(3):
+            tokens.insert(rng.randrange(len(tokens)), rng.choice(SAMPLE_DATES))
+        page_texts.append(" ".join(tokens))
+    return "\n".join(page_texts)
+
+
+def legacy_dates_to_list(text):
+    """The previous approach: compile each pattern per call and scan the text once per format"""
+    found = []
+    for pattern in (dates.PAT_DAY_MONTH_YEAR, dates.PAT_DAY_MONTH_YEAR_SHORT,
+                    dates.PAT_MONTH_DAY_YEAR, dates.PAT_MONTH_DAY_YEAR_SHORT):
+        found += re.compile(pattern, re.IGNORECASE).findall(text)
+    return found
+
+
+def best_of(func, text, repeat):
+    timings = []
+    for _ in range(repeat):
+        re.purge()
+        start = time.perf_counter()
+        result = func(text)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=500, help="pages in the synthetic document")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per engine, the median is reported")
+    parser.add_argument("--text-file", help="benchmark on this text file instead of a synthetic document")
+    args = parser.parse_args()
+
+    if args.text_file:
+        with open(args.text_file, encoding="utf-8", errors="ignore") as f:
+            text = f.read()
+    else:
+        text = synthetic_text(args.pages)
+
+    legacy_seconds, legacy_found = best_of(legacy_dates_to_list, text, args.repeat)
+    new_seconds, new_found = best_of(dates.dates_to_list, text, args.repeat)
+
+    mb = len(text) / 1e6
+    print(f"text: {len(text):,} chars")
+    print(f"legacy (4 scans): {legacy_seconds * 1000:9.2f} ms  {mb / legacy_seconds:7.2f} MB/s  {len(legacy_found)} matches")
+    print(f"single scan:      {new_seconds * 1000:9.2f} ms  {mb / new_seconds:7.2f} MB/s  {len(new_found)} dates")
+    print(f"speedup: {legacy_seconds / new_seconds:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Compare entities.extract_entities with searching every paragraph on its own
+
+    python -m common.document_parser.benchmarks.entities <parsed json file or dir> [--repeat N] [--scale N]
+
+Inputs are parsed documents (pdf-to-json output), extract_entities needs their paragraphs. --scale
+repeats every document's paragraphs N times to time paragraph heavy documents.
+"""
+import argparse
+import copy
+from collections import Counter
+from itertools import chain
+
+from gamechangerml.src.utilities.text_utils import simple_clean
+
+from common.document_parser.benchmarks.abbreviations import load_doc_dicts, time_call
+from common.document_parser.lib import entities
+from common.document_parser.lib.entities_utils import remove_overlapping_ents, replace_nonalpha_chars
+
+
+def extract_entities_per_paragraph(doc_dict):
+    """extract_entities as it was before searching all paragraphs at once, the reference output"""
+    all_ents = []
+    for par in doc_dict["paragraphs"]:
+        ents_by_type = {ent_type: set() for ent_type in entities.ENTITY_RENAME_DICT.values()}
+        text = par.get("par_raw_text_t")
+        if text is None:
+            par["entities"] = ents_by_type
+            continue
+        text = replace_nonalpha_chars(simple_clean(text), "")
+        ents = [
+            (start, end, entities.ENTITIES_LOOKUP_DICT[keyword]["raw_ent"],
+             entities.ENTITIES_LOOKUP_DICT[keyword]["ent_type"])
+            for keyword, start, end in entities.PROCESSOR.extract_keywords(text, span_info=True)
+        ]
+        for ent in remove_overlapping_ents(ents):
+            ents_by_type[entities.ENTITY_RENAME_DICT[ent[3]]].add(ent[2])
+        par["entities"] = {k: list(v) for k, v in ents_by_type.items()}
+        all_ents += list(chain.from_iterable(par["entities"].values()))
+
+    doc_dict["entities"] = list(set(all_ents))
+    doc_dict["top_entities_t"] = [ent[0] for ent in Counter(all_ents).most_common(5)]
+    return doc_dict
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="parsed json file or directory of them")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per document, the median is reported")
+    parser.add_argument("--scale", type=int, default=1, help="times every document's paragraphs are repeated")
+    args = parser.parse_args()
+
+    totals = {"new": 0.0, "old": 0.0}
+    mismatches = 0
+    print(f"{'document':50} {'paras':>7} {'new ms':>10} {'old ms':>10} {'speedup':>8} {'same':>5}")
+    for name, doc_dict in load_doc_dicts(args.path):
+        doc_dict["paragraphs"] = [dict(par) for _ in range(args.scale) for par in doc_dict["paragraphs"]]
+        new_doc, old_doc = copy.deepcopy(doc_dict), copy.deepcopy(doc_dict)
+        new, new_result = time_call(lambda: entities.extract_entities(new_doc), args.repeat)
+        old, old_result = time_call(lambda: extract_entities_per_paragraph(old_doc), args.repeat)
+        same = new_result == old_result
+        mismatches += not same
+
+        totals["new"] += new
+        totals["old"] += old
+        print(f"{name[:50]:50} {len(doc_dict['paragraphs']):>7} {new * 1000:>10.2f} {old * 1000:>10.2f} "
+              f"{old / new if new else float('nan'):>8.2f} {'yes' if same else 'NO':>5}")
+
+    print(f"{'total':50} {'':>7} {totals['new'] * 1000:>10.2f} {totals['old'] * 1000:>10.2f} "
+          f"{totals['old'] / totals['new'] if totals['new'] else float('nan'):>8.2f}")
+    if mismatches:
+        print(f"{mismatches} documents came out different")
+
+
+if __name__ == "__main__":
+    main()
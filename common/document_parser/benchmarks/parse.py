@@ -0,0 +1,372 @@
+"""Parse benchmark suite: per stage timings of policy_analytics.parse and end to end
+pdf-to-json throughput at several worker counts, written to a json report that can be
+diffed between commits
+
+    python -m common.document_parser.benchmarks.parse [--corpus DIR] [--synthetic-pages N [N ...]]
+        [--workers N [N ...]] [--repeat N] [--report PATH] [--baseline PATH]
+
+The corpus defaults to the documents under dev_tools/universal_test_harness/data/crawler_output
+(pdf, html and txt files with their .metadata). Synthetic pdfs of --synthetic-pages pages are
+generated from a fixed seed, so every run parses the same text.
+
+Stages are the ones parse runs, in order: handle_pages (handle_text_pages for html/txt),
+add_paragraphs, every function in policy_analytics.parse.ENRICHMENT_FUNCS and post_process.
+The ingest date and crawler info lookups need the orch database and are left out of both
+the stage timings and the end to end runs.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+import fitz
+
+from common import PACKAGE_PATH
+from common.document_parser.lib import (
+    file_utils,
+    pages,
+    paragraphs,
+    pdf_reader,
+    read_meta,
+    write_doc_dict_to_json,
+)
+from common.document_parser import instrumentation
+from common.document_parser.parsers.policy_analytics import init_doc
+from common.document_parser.parsers.policy_analytics.parse import ENRICHMENT_FUNCS, post_process
+from common.document_parser.process import process_dir
+from common.utils.parsed_json import iter_parsed_json_files
+
+REPO_PATH = Path(PACKAGE_PATH).parent
+DEFAULT_CORPUS = REPO_PATH / "dev_tools" / "universal_test_harness" / "data" / "crawler_output"
+CORPUS_SUFFIXES = (".pdf", ".html", ".txt")
+REPORT_VERSION = 1
+
+# Building blocks of synthetic pages, chosen so every stage has something to find:
+# references, organizations, abbreviation definitions, dates and numbered sections.
+SYNTHETIC_SENTENCES = [
+    "The Under Secretary of Defense for Acquisition and Sustainment (USD(A&S)) shall issue guidance.",
+    "In accordance with DoD Instruction 5000.02 and DoD Directive 5105.21, the Director will report annually.",
+    "The Federal Voting Assistance Program (FVAP) coordinates with the Military Services.",
+    "This issuance is effective {date} and supersedes the version dated {date}.",
+    "Heads of the DoD Components shall establish procedures consistent with Title 10, United States Code.",
+    "The Defense Logistics Agency (DLA) maintains records as prescribed in DoD Manual 8910.01.",
+    "Requests for exceptions are submitted through the Chairman of the Joint Chiefs of Staff.",
+    "The Secretary of the Navy will designate an office of primary responsibility for the program.",
+    "Funding is provided through the annual budget process described in Executive Order 12333.",
+    "Information collections referenced in this issuance are exempt from licensing.",
+]
+SYNTHETIC_DATES = ["31 August, 2000", "August 31, 1984", "Sept. 4, 2012", "4 Dec 2019", "March 15 2021"]
+SYNTHETIC_PAGE_CHARS = 2500
+SYNTHETIC_FONT_SIZE = 8
+
+
+class StageTimer:
+    """Seconds per stage, accumulated over every document run through it.
+    A stage that raises is counted as an error and skipped, like in parse."""
+
+    def __init__(self):
+        self.seconds = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def run(self, name, func, *args):
+        start = time.perf_counter()
+        try:
+            func(*args)
+            return True
+        except Exception as e:
+            self.errors[name] += 1
+            print(f"{name} failed: {e}", file=sys.stderr)
+            return False
+        finally:
+            self.seconds[name].append(time.perf_counter() - start)
+
+
+def create_doc_dict(f_name, meta_data):
+    meta_dict = read_meta.read_metadata(meta_data)
+    doc_dict = init_doc.create_doc_dict_with_meta(meta_dict)
+    init_doc.assign_f_name_fields(f_name, doc_dict)
+    init_doc.assign_other_fields(doc_dict)
+    return doc_dict
+
+
+def handle_fitz_pages(f_name, doc_dict):
+    doc_obj = pdf_reader.get_fitz_doc_obj(f_name)
+    try:
+        pages.handle_pages(doc_obj, doc_dict)
+    finally:
+        doc_obj.close()
+
+
+def run_pipeline(f_name, meta_data=None, timer=None):
+    """
+    Run parse's stages on a document, timing each of them into timer
+    Args:
+        f_name: pdf, html or txt file
+        meta_data: its .metadata file, if any
+        timer: StageTimer to record into
+
+    Returns: the doc dict, None if its pages could not be read
+    """
+    timer = timer or StageTimer()
+    doc_dict = create_doc_dict(f_name, meta_data)
+
+    if file_utils.is_native_text_file(f_name):
+        loaded = timer.run("pages.handle_text_pages", lambda: pages.handle_text_pages(
+            file_utils.read_native_text(f_name), doc_dict, pages.DEFAULT_VIRTUAL_PAGE_CHARS))
+    else:
+        loaded = timer.run("pages.handle_pages", handle_fitz_pages, f_name, doc_dict)
+    if not loaded:
+        return None
+
+    timer.run("paragraphs.add_paragraphs", paragraphs.add_paragraphs, doc_dict)
+    for func in ENRICHMENT_FUNCS:
+        timer.run(instrumentation.stage_name(func), func, doc_dict)
+    timer.run("parse.post_process", post_process, doc_dict)
+    return doc_dict
+
+
+def offline_parse(f_name, meta_data=None, out_dir="./", **kwargs):
+    """parse_func for process_dir: the benchmarked stages, written out like parse does"""
+    doc_dict = run_pipeline(f_name, meta_data)
+    if doc_dict is not None:
+        write_doc_dict_to_json.write(out_dir=out_dir, ex_dict=doc_dict)
+
+
+def corpus_files(corpus_dir):
+    return sorted(
+        p for p in Path(corpus_dir).glob("**/*")
+        if p.is_file() and p.suffix.lower() in CORPUS_SUFFIXES
+    )
+
+
+def synthetic_page_texts(num_pages, seed=0):
+    """Deterministic policy-like text, about SYNTHETIC_PAGE_CHARS characters per page"""
+    rng = random.Random(seed)
+    page_texts = []
+    section = 1
+    for _ in range(num_pages):
+        lines = []
+        length = 0
+        while length < SYNTHETIC_PAGE_CHARS:
+            if rng.random() < 0.1:
+                line = f"SECTION {section}: {rng.choice(['GENERAL ISSUANCE INFORMATION', 'RESPONSIBILITIES', 'PROCEDURES'])}"
+                section += 1
+            else:
+                line = " ".join(
+                    rng.choice(SYNTHETIC_SENTENCES).format(date=rng.choice(SYNTHETIC_DATES))
+                    for _ in range(rng.randint(1, 3))
+                )
+            lines.append(line)
+            length += len(line) + 1
+        page_texts.append("\n".join(lines))
+    return page_texts
+
+
+def write_synthetic_pdf(directory, num_pages, seed=0):
+    """Write a synthetic pdf of num_pages pages (and its .metadata) into directory"""
+    name = f"DoDI 9{num_pages:03d}.{seed:02d} Synthetic {num_pages} Pages"
+    path = Path(directory, name + ".pdf")
+
+    doc = fitz.open()
+    # camelCase names are the PyMuPDF < 1.19 api the parser is pinned to
+    new_page = getattr(doc, "new_page", None) or doc.newPage
+    for page_text in synthetic_page_texts(num_pages, seed):
+        page = new_page()
+        insert_textbox = getattr(page, "insert_textbox", None) or page.insertTextbox
+        insert_textbox(fitz.Rect(36, 36, page.rect.width - 36, page.rect.height - 36),
+                       page_text, fontsize=SYNTHETIC_FONT_SIZE)
+    doc.save(str(path))
+    doc.close()
+
+    metadata = {
+        "doc_name": name,
+        "doc_title": f"Synthetic {num_pages} Pages",
+        "doc_num": f"9{num_pages:03d}.{seed:02d}",
+        "doc_type": "DoDI",
+        "publication_date": "2020-01-01",
+        "cac_login_required": False,
+        "crawler_used": "benchmark",
+        "source_page_url": "",
+        "downloadable_items": [{"doc_type": "pdf", "web_url": "", "compression_type": None}],
+        "version_hash_raw_data": {},
+        "access_timestamp": "2021-01-01 12:00:00.000000",
+        "source_fqdn": "",
+        "version_hash": "",
+    }
+    Path(str(path) + ".metadata").write_text(json.dumps(metadata))
+    return path
+
+
+def metadata_for(f_name):
+    meta_path = Path(str(f_name) + ".metadata")
+    return meta_path if meta_path.exists() else None
+
+
+def summarize(seconds):
+    ordered = sorted(seconds)
+    return {
+        "runs": len(ordered),
+        "total_s": sum(ordered),
+        "median_s": statistics.median(ordered),
+        "p95_s": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        "max_s": ordered[-1],
+    }
+
+
+def time_stages(files, repeat):
+    """
+    Run every file through the stages repeat times, after one untimed warm up run
+    (the first run of a process pays for loading models and building caches)
+    Returns: suite report with stage summaries in pipeline order
+    """
+    timer = StageTimer()
+    total_pages = 0
+    for f_name in files:
+        run_pipeline(f_name, metadata_for(f_name), StageTimer())
+        doc_dict = None
+        for _ in range(repeat):
+            doc_dict = run_pipeline(f_name, metadata_for(f_name), timer)
+        if doc_dict is not None:
+            total_pages += doc_dict.get("page_count", 0)
+
+    return {
+        "docs": len(files),
+        "pages": total_pages,
+        "stages": {name: summarize(seconds) for name, seconds in timer.seconds.items()},
+        "errors": dict(timer.errors),
+    }
+
+
+def stage_files(files, directory):
+    """Copy files (and their .metadata) into one directory with unique names for process_dir"""
+    for f_name in files:
+        target = Path(directory, f"{f_name.parent.name}__{f_name.name}")
+        shutil.copyfile(f_name, target)
+        meta_path = metadata_for(f_name)
+        if meta_path:
+            shutil.copyfile(meta_path, str(target) + ".metadata")
+
+
+def time_end_to_end(files, worker_counts, work_dir):
+    """pdf-to-json over all files with process_dir, once per worker count (-1 is in process)"""
+    in_dir = Path(work_dir, "in")
+    in_dir.mkdir()
+    stage_files(files, in_dir)
+
+    results = []
+    for workers in worker_counts:
+        out_dir = Path(work_dir, f"out_{workers}")
+        start = time.perf_counter()
+        process_dir(offline_parse, dir_path=str(in_dir), out_dir=str(out_dir), multiprocess=workers)
+        seconds = time.perf_counter() - start
+        written = len(list(iter_parsed_json_files(out_dir))) if out_dir.exists() else 0
+        results.append({
+            "workers": workers,
+            "docs": len(files),
+            "written": written,
+            "seconds": seconds,
+            "docs_per_second": len(files) / seconds,
+        })
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_PATH, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_suite(name, suite):
+    print(f"\n{name}: {suite['docs']} docs, {suite['pages']} pages")
+    for stage, stats in suite["stages"].items():
+        errors = suite["errors"].get(stage, 0)
+        print(f"  {stage:40} median {stats['median_s'] * 1000:10.2f} ms  max {stats['max_s'] * 1000:10.2f} ms"
+              + (f"  {errors} errors" if errors else ""))
+
+
+def print_comparison(report, baseline):
+    print(f"\ncompared to {baseline.get('commit') or 'baseline'} (median, new / old):")
+    for name, suite in report["suites"].items():
+        old_suite = baseline.get("suites", {}).get(name)
+        if not old_suite:
+            continue
+        for stage, stats in suite["stages"].items():
+            old = old_suite["stages"].get(stage)
+            if old and old["median_s"] > 0:
+                print(f"  {name:24} {stage:40} {old['median_s'] * 1000:10.2f} -> {stats['median_s'] * 1000:10.2f} ms"
+                      f"  {stats['median_s'] / old['median_s']:.2f}x")
+    old_runs = {run["workers"]: run for run in baseline.get("end_to_end", [])}
+    for run in report["end_to_end"]:
+        old = old_runs.get(run["workers"])
+        if old:
+            print(f"  end to end, {run['workers']} workers: {old['seconds']:.2f} -> {run['seconds']:.2f} s"
+                  f"  {run['seconds'] / old['seconds']:.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=str(DEFAULT_CORPUS), help="directory of documents to parse")
+    parser.add_argument("--synthetic-pages", type=int, nargs="*", default=[200, 1000],
+                        help="page counts of the synthetic documents, none to skip them")
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2, 4],
+                        help="process_dir worker counts for the end to end runs, none to skip them")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs of each document")
+    parser.add_argument("--report", default="parse_benchmark.json", help="where to write the json report")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    args = parser.parse_args()
+
+    report = {
+        "version": REPORT_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": args.repeat,
+        "suites": {},
+        "end_to_end": [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix="parse_benchmark_") as work_dir:
+        files = corpus_files(args.corpus)
+        report["suites"]["corpus"] = time_stages(files, args.repeat)
+
+        synthetic_dir = Path(work_dir, "synthetic")
+        synthetic_dir.mkdir()
+        for num_pages in args.synthetic_pages:
+            path = write_synthetic_pdf(synthetic_dir, num_pages)
+            report["suites"][f"synthetic_{num_pages}_pages"] = time_stages([path], args.repeat)
+            files.append(path)
+
+        if args.workers:
+            report["end_to_end"] = time_end_to_end(files, args.workers, work_dir)
+
+    for name, suite in report["suites"].items():
+        print_suite(name, suite)
+    for run in report["end_to_end"]:
+        print(f"end to end, {run['workers']} workers: {run['docs']} docs ({run['written']} written) "
+              f"in {run['seconds']:.2f} s, {run['docs_per_second']:.2f} docs/s")
+
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nreport written to {args.report}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            print_comparison(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ import sys
 import resource
 import platform
 import shutil
+import functools
 
 
 @click.group()
@@ -28,6 +29,9 @@ def pdf_to_json(
         force_ocr: bool = False,
         num_ocr_threads: int = 2,
         batch_size: int = 100,
+        metrics_out: str = None,
+        prometheus_textfile: str = None,
+        render_pdf: bool = False,
 ) -> None:
     """
     Converts input pdf file to json
@@ -35,15 +39,22 @@ def pdf_to_json(
         parser_path: path to parser module or json config file that creates a parser
         source: A source directory to be processed.
         destination: A destination directory to be processed
-        verify: Boolean to determine if output jsons are to be verified vs a json schema
+        verify: Boolean to determine if output jsons are to be verified vs a json schema (before they are written)
         metadata: file path of metadata to be processed.
         multiprocess: Multiprocessing. Will take integer for number of cores,
         ocr_missing_doc: OCR non-OCR'ed files
         num_ocr_threads: Number of threads to use for OCR (per file)
+        metrics_out: Record per stage time and memory of every document, write the run's summary here (json)
+        prometheus_textfile: Also write the summary as a Prometheus textfile collector file
+        render_pdf: Also render html/txt inputs to pdf next to them (for thumbnails and the raw archive),
+            passed on to parsers that take it, like policy_analytics.parse
     """
     from common.document_parser.process import process_dir, single_process, resolve_dynamic_parser
+    from common.document_parser import instrumentation
 
     parser = resolve_dynamic_parser(parser_path)
+    if render_pdf:
+        parser = functools.partial(parser, render_pdf=True)
 
     doc_logger = get_default_logger()
     if Path(source).is_file():
@@ -56,12 +67,17 @@ def pdf_to_json(
             ocr_missing_doc,
             num_ocr_threads,
             force_ocr,
-            destination)
+            destination,
+            verify,
+            bool(metrics_out or prometheus_textfile))
 
-        single_process(parser_input)
+        result = single_process(parser_input)
+        validation_failures = result.validation_failures
+        if result.metrics is not None:
+            instrumentation.write_run_metrics([result.metrics], metrics_out, prometheus_textfile)
 
     else:
-        process_dir(
+        validation_failures = process_dir(
             parser,
             dir_path=source,
             out_dir=destination,
@@ -70,11 +86,14 @@ def pdf_to_json(
             ocr_missing_doc=ocr_missing_doc,
             force_ocr=force_ocr,
             num_ocr_threads=num_ocr_threads,
-            batch_size=batch_size
+            batch_size=batch_size,
+            verify=verify,
+            metrics_out=metrics_out,
+            prometheus_textfile=prometheus_textfile
         )
     if verify:
-        verified = validators.verify(destination)
-        if verified:
+        # docs were validated in memory as they were written, no need to re-read the output
+        if validators.report_failures(validation_failures) == 0:
             print("Jsons are verified")
         else:
             print("Jsons do not match the schema")
@@ -164,6 +183,25 @@ def pdf_to_json(
     help="Batch size. If using multiprocessing, controls the size of batches that \
         will be processed at one time.",
 )
+@click.option(
+    '--metrics-out',
+    help="Record wall time, CPU time and peak RSS of every parser stage per document "
+         "and write the run's summary (p50/p95/max per stage, slowest documents) to this json file.",
+    type=click.Path(dir_okay=False, resolve_path=True),
+    default=None,
+)
+@click.option(
+    '--prometheus-textfile',
+    help="Write the same summary as a Prometheus textfile collector file (*.prom).",
+    type=click.Path(dir_okay=False, resolve_path=True),
+    default=None,
+)
+@click.option(
+    '--render-pdf',
+    help="Also render html and txt inputs to pdf next to them, for thumbnails and the raw archive. "
+         "Their text is read directly either way.",
+    is_flag=True
+)
 def pdf_to_json_cmd_wrapper(
         parser_path: str,
         source: str,
@@ -176,6 +214,9 @@ def pdf_to_json_cmd_wrapper(
         force_ocr: bool,
         num_ocr_threads: int,
         batch_size: int,
+        metrics_out: str,
+        prometheus_textfile: str,
+        render_pdf: bool,
 ) -> None:
     """Parse OCR'ed PDF files into JSON schema"""
     if platform.system() == "Linux":
@@ -191,7 +232,10 @@ def pdf_to_json_cmd_wrapper(
         ocr_missing_doc=ocr_missing_doc,
         force_ocr=force_ocr,
         num_ocr_threads=num_ocr_threads,
-        batch_size=batch_size
+        batch_size=batch_size,
+        metrics_out=metrics_out,
+        prometheus_textfile=prometheus_textfile,
+        render_pdf=render_pdf
     )
 
 
@@ -0,0 +1,206 @@
+"""
+Opt-in per stage timing and memory instrumentation for the document parser.
+
+Parsers wrap their stages in stage(name), which is a no-op unless a document is being
+instrumented (see instrument_document). Each worker hands its documents' records back to
+the parent process with its results, the parent summarizes them once the run is over.
+"""
+import json
+import math
+import resource
+import sys
+import time
+import typing
+from contextlib import contextmanager
+
+from common.utils.parsed_json import write_atomic
+
+# stage records of the document being instrumented, None when not instrumenting
+_current_stages: typing.Optional[typing.List[dict]] = None
+
+# documents listed in the summary's slowest_docs
+SLOWEST_DOCS = 10
+PROMETHEUS_PREFIX = "gc_parser"
+PROMETHEUS_QUANTILES = (("0.5", "p50"), ("0.95", "p95"), ("1", "max"))
+
+
+class _Sample(typing.NamedTuple):
+    wall: float
+    cpu: float
+    peak_rss_mb: float
+
+
+def stage_name(func: typing.Callable) -> str:
+    """module.function, e.g. entities.extract_entities"""
+    return f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+
+def get_peak_rss_mb() -> float:
+    """High water mark of this process' resident memory"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes everywhere else
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _sample() -> _Sample:
+    return _Sample(time.perf_counter(), time.process_time(), get_peak_rss_mb())
+
+
+def _measure(start: _Sample) -> dict:
+    end = _sample()
+    return {
+        "wall_s": end.wall - start.wall,
+        "cpu_s": end.cpu - start.cpu,
+        "peak_rss_mb": end.peak_rss_mb,
+        # how far the stage pushed the process' high water mark
+        "rss_growth_mb": end.peak_rss_mb - start.peak_rss_mb,
+    }
+
+
+@contextmanager
+def stage(name: str):
+    """Record wall time, cpu time and peak RSS of the enclosed stage for the current document"""
+    stages = _current_stages
+    if stages is None:
+        yield
+        return
+
+    start = _sample()
+    try:
+        yield
+    except BaseException:
+        stages.append({"stage": name, **_measure(start), "failed": True})
+        raise
+    stages.append({"stage": name, **_measure(start), "failed": False})
+
+
+@contextmanager
+def instrument_document(filename: str):
+    """
+    Record every stage run while inside this context
+    Args:
+        filename: document being parsed
+
+    Yields: the document's record, its totals are filled in when the context exits
+    """
+    global _current_stages
+    previous = _current_stages
+    record = {"filename": filename, "stages": []}
+    _current_stages = record["stages"]
+    start = _sample()
+    try:
+        yield record
+    finally:
+        _current_stages = previous
+        record.update(_measure(start))
+
+
+def percentile(values: typing.Sequence[float], q: float) -> float:
+    """Nearest rank percentile, q in [0, 1]"""
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1))]
+
+
+def _distribution(values: typing.Sequence[float]) -> dict:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "max": 0.0, "total": 0.0}
+    return {
+        "p50": percentile(values, 0.5),
+        "p95": percentile(values, 0.95),
+        "max": max(values),
+        "total": sum(values),
+    }
+
+
+def summarize_run(doc_records: typing.List[dict], slowest: int = SLOWEST_DOCS) -> dict:
+    """
+    Args:
+        doc_records: records of every instrumented document in the run
+        slowest: how many of the slowest documents to list
+
+    Returns: per stage p50/p95/max/total of wall time, cpu time and RSS growth, with the
+        max peak RSS and failure count, in the order stages first ran; plus the slowest documents
+    """
+    by_stage = {}
+    for record in doc_records:
+        for stage_record in record["stages"]:
+            by_stage.setdefault(stage_record["stage"], []).append(stage_record)
+
+    return {
+        "docs": len(doc_records),
+        "wall_s": _distribution([r["wall_s"] for r in doc_records]),
+        "stages": {
+            name: {
+                "count": len(runs),
+                "failed": sum(r["failed"] for r in runs),
+                "wall_s": _distribution([r["wall_s"] for r in runs]),
+                "cpu_s": _distribution([r["cpu_s"] for r in runs]),
+                "rss_growth_mb": _distribution([r["rss_growth_mb"] for r in runs]),
+                "peak_rss_mb": max(r["peak_rss_mb"] for r in runs),
+            }
+            for name, runs in by_stage.items()
+        },
+        "slowest_docs": [
+            {
+                "filename": r["filename"],
+                "wall_s": r["wall_s"],
+                "cpu_s": r["cpu_s"],
+                "peak_rss_mb": r["peak_rss_mb"],
+                "slowest_stage": max(r["stages"], key=lambda s: s["wall_s"])["stage"] if r["stages"] else None,
+            }
+            for r in sorted(doc_records, key=lambda r: r["wall_s"], reverse=True)[:slowest]
+        ],
+    }
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def format_prometheus(summary: dict) -> str:
+    """Summary in the Prometheus text exposition format, for node_exporter's textfile collector"""
+    lines = [
+        f"# HELP {PROMETHEUS_PREFIX}_docs Documents parsed in the last run",
+        f"# TYPE {PROMETHEUS_PREFIX}_docs gauge",
+        f"{PROMETHEUS_PREFIX}_docs {summary['docs']}",
+    ]
+    for metric, key, help_text in (
+            ("stage_wall_seconds", "wall_s", "Wall time of a parser stage per document"),
+            ("stage_cpu_seconds", "cpu_s", "CPU time of a parser stage per document"),
+    ):
+        name = f"{PROMETHEUS_PREFIX}_{metric}"
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} summary"]
+        for stage_key, stats in summary["stages"].items():
+            label = f'stage="{_label(stage_key)}"'
+            for quantile, stat in PROMETHEUS_QUANTILES:
+                lines.append(f'{name}{{{label},quantile="{quantile}"}} {stats[key][stat]}')
+            lines.append(f"{name}_sum{{{label}}} {stats[key]['total']}")
+            lines.append(f"{name}_count{{{label}}} {stats['count']}")
+
+    for metric, help_text, value in (
+            ("stage_peak_rss_bytes", "Highest process RSS at the end of a parser stage",
+             lambda stats: int(stats["peak_rss_mb"] * 1024 * 1024)),
+            ("stage_failures", "Documents a parser stage raised on", lambda stats: stats["failed"]),
+    ):
+        name = f"{PROMETHEUS_PREFIX}_{metric}"
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        for stage_key, stats in summary["stages"].items():
+            lines.append(f'{name}{{stage="{_label(stage_key)}"}} {value(stats)}')
+
+    return "\n".join(lines) + "\n"
+
+
+def write_run_metrics(doc_records: typing.List[dict], summary_path: typing.Optional[str] = None,
+                      prometheus_path: typing.Optional[str] = None) -> dict:
+    """
+    Summarize the run and write it as json and/or a Prometheus textfile, both atomically
+    Returns: the summary
+    """
+    summary = summarize_run(doc_records)
+    if summary_path:
+        write_atomic(summary_path, json.dumps(summary, indent=2).encode("utf-8"))
+        print(f"Parser stage metrics written to {summary_path}")
+    if prometheus_path:
+        write_atomic(prometheus_path, format_prometheus(summary).encode("utf-8"))
+        print(f"Parser stage metrics textfile written to {prometheus_path}")
+    return summary
@@ -1,9 +1,219 @@
-from gamechangerml.src.featurization.abbreviation import expand_abbreviations
+import re
+import time
+from collections import OrderedDict
+from hashlib import blake2b
 
+from common.document_parser.lib.document import FieldNames
+
+
+# A parenthesized candidate short form, e.g. "( FVAP )" or "( Do DD )", optionally
+# ending in a parenthesized qualifier, e.g. "( USD ( A&S ) )". Paragraph text is
+# tokenized, so tokens inside the parentheses may be separated by spaces.
+SHORT_FORM_PATTERN = re.compile(
+    r"\(\s*([A-Za-z][A-Za-z0-9&/.\- ]{0,15}?)\s*"
+    r"(?:(\(\s*([A-Za-z0-9][A-Za-z0-9&/.\- ]{0,15}?)\s*\))\s*)?\)"
+)
+
+# Tokens that end the window a long form is looked for in.
+LONG_FORM_STOP_TOKENS = frozenset({"(", ")", ".", ";", ":", "?", "!", "•"})
+
+# A long form starting with one of these matched the short form's first letter
+# too late, e.g. "and sustainment" for "(A&S)".
+LONG_FORM_BAD_FIRST_WORDS = frozenset({"and", "of", "the", "for", "in", "on", "to", "or", "with", "by"})
+
+MIN_SHORT_FORM_LEN = 2
+MAX_SHORT_FORM_LEN = 10
+
+# Seconds spent per document before the remaining paragraphs are skipped.
+DEFAULT_TIME_BUDGET = 5.0
+
+# Paragraph hash -> abbreviations found in it. Boilerplate paragraphs repeat
+# within and across documents parsed by the same worker.
+PARAGRAPH_CACHE_SIZE = 50000
+_PARAGRAPH_CACHE = OrderedDict()
+
+
+def normalize_short_form(candidate):
+    """Join tokens of a candidate short form, or return None if it does not
+    look like an abbreviation (e.g. "( 1 )", "( see below )").
+    """
+    short_form = candidate.replace(" ", "")
+    if not MIN_SHORT_FORM_LEN <= len(short_form) <= MAX_SHORT_FORM_LEN:
+        return None
+    if len(candidate.split()) > 3:
+        return None
+    if not any(c.isupper() for c in short_form):
+        return None
+    if sum(c.isalpha() for c in short_form) < MIN_SHORT_FORM_LEN:
+        return None
+    return short_form
+
+
+def normalize_nested_short_form(head, qualifier):
+    """Join a short form and its parenthesized qualifier, e.g. "USD", "A&S" ->
+    "USD(A&S)", or return None if the head does not look like an abbreviation.
+    """
+    head = normalize_short_form(head)
+    qualifier = qualifier.replace(" ", "")
+    if head is None or len(qualifier) > MAX_SHORT_FORM_LEN:
+        return None
+    return f"{head}({qualifier})"
+
+
+def long_form_window(text, end, short_form):
+    """Words directly before text[end] (the short form's opening parenthesis),
+    at most min(len + 5, 2 * len) of them (Schwartz & Hearst), stopping at
+    sentence punctuation. Scans back from end, so the cost doesn't grow with
+    how far into the paragraph the short form is.
+    """
+    max_words = min(len(short_form) + 5, 2 * len(short_form))
+    window = []
+    i = end
+    while len(window) < max_words:
+        while i > 0 and text[i - 1].isspace():
+            i -= 1
+        if i == 0:
+            break
+        start = i - 1
+        while start > 0 and not text[start - 1].isspace():
+            start -= 1
+        token = text[start:i]
+        if token in LONG_FORM_STOP_TOKENS:
+            break
+        window.append(token)
+        i = start
+    window.reverse()
+    return " ".join(window)
+
+
+def find_word_initial(window, c, end):
+    """Index of the last c (case insensitive) before window[end] that starts a
+    word, -1 if there is none.
+    """
+    i = end - 1
+    while i >= 0 and (window[i].lower() != c or (i > 0 and window[i - 1].isalnum())):
+        i -= 1
+    return i
+
+
+def match_long_form(short_form, window):
+    """Shortest suffix of window whose characters spell out short_form in
+    order, with its first character starting a word (Schwartz & Hearst). A
+    first character matched on a word like "of" is looked for further left,
+    e.g. "Office of the Secretary of Defense" for "OSD".
+    """
+    s = len(short_form) - 1
+    l = len(window) - 1
+    while s > 0:
+        c = short_form[s].lower()
+        if not c.isalnum():
+            s -= 1
+            continue
+        while l >= 0 and window[l].lower() != c:
+            l -= 1
+        if l < 0:
+            return None
+        l -= 1
+        s -= 1
+
+    first = short_form[0].lower()
+    start = find_word_initial(window, first, l + 1)
+    while start >= 0:
+        long_form = window[window.rfind(" ", 0, start) + 1:].strip(" ,")
+        long_form_words = long_form.lower().split()
+        if long_form_words[0] not in LONG_FORM_BAD_FIRST_WORDS:
+            break
+        start = find_word_initial(window, first, start)
+    else:
+        return None
+
+    if len(long_form) <= len(short_form) or " " not in long_form:
+        return None
+    if short_form.lower() in long_form_words:
+        return None
+    return long_form
+
+
+def find_abbreviations(text):
+    """(short form, long form) pairs defined in text as "Long Form (LF)", in
+    order of appearance. One pass over the text with a compiled scanner.
+    """
+    found = []
+    for match in SHORT_FORM_PATTERN.finditer(text):
+        head, qualifier = match.group(1), match.group(3)
+        if qualifier is None:
+            candidates = [(normalize_short_form(head), match.start())]
+        else:
+            # "( USD ( A&S ) )", else the qualifier on its own as in "( see ( DHA ) )"
+            candidates = [
+                (normalize_nested_short_form(head, qualifier), match.start()),
+                (normalize_short_form(qualifier), match.start(2)),
+            ]
+        for short_form, end in candidates:
+            if short_form is None:
+                continue
+            long_form = match_long_form(short_form, long_form_window(text, end, short_form))
+            if long_form is not None:
+                found.append((short_form, long_form))
+                break
+    return found
+
+
+def find_abbreviations_cached(text):
+    key = blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    cached = _PARAGRAPH_CACHE.get(key)
+    if cached is not None:
+        _PARAGRAPH_CACHE.move_to_end(key)
+        return cached
+
+    found = find_abbreviations(text)
+    _PARAGRAPH_CACHE[key] = found
+    if len(_PARAGRAPH_CACHE) > PARAGRAPH_CACHE_SIZE:
+        _PARAGRAPH_CACHE.popitem(last=False)
+    return found
+
+
+def add_abbreviations_n(doc_dict, time_budget=DEFAULT_TIME_BUDGET):
+    """Add abbreviations defined in the document as "Long Form (LF)".
+
+    Works paragraph by paragraph from doc_dict["paragraphs"] (see
+    paragraphs.add_paragraphs), so it must run after them.
+
+    Adds the following key/ value to doc_dict:
+        "abbreviations_n" (list of dict): one per distinct definition, in order
+            of first appearance, with keys "abbr_s" (short form) and
+            "description_s" (long form).
+
+    Args:
+        doc_dict (dict): Dictionary representation of a document.
+        time_budget (float or None): Seconds to spend on the document before
+            the remaining paragraphs are skipped. None for no limit.
+
+    Returns:
+        dict: The updated doc_dict.
+    """
+    abbreviations = []
+    seen = set()
+    start = time.perf_counter()
+    paragraphs = doc_dict.get(FieldNames.PARAGRAPHS) or []
+
+    for i, paragraph in enumerate(paragraphs):
+        if time_budget is not None and time.perf_counter() - start > time_budget:
+            print(
+                f"Abbreviation time budget ({time_budget}s) reached for "
+                f"{doc_dict.get(FieldNames.FILENAME)}, skipped "
+                f"{len(paragraphs) - i} of {len(paragraphs)} paragraphs"
+            )
+            break
+        text = paragraph.get(FieldNames.PAR_RAW_TEXT) or ""
+        if "(" not in text:
+            continue
+        for short_form, long_form in find_abbreviations_cached(text):
+            key = (short_form, long_form.lower())
+            if key in seen:
+                continue
+            seen.add(key)
+            abbreviations.append({"abbr_s": short_form, "description_s": long_form})
 
-def add_abbreviations_n(doc_dict):
-    # TODO: (09/09/2021) Improve abbreviation processing time.
-    # TODO: (09/09/2021) Process abbreviations separate from parsing.
-    _, abbreviations = ("", []) # expand_abbreviations(doc_dict["text"])
     doc_dict["abbreviations_n"] = abbreviations
     return doc_dict
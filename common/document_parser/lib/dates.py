@@ -1,123 +1,83 @@
-
 """
 This module contains functions for date extractions
 """
 
 import re
 import datetime
+import typing
 
 PAT_DAY_MONTH_YEAR = r"(\d{1,2}\s*(?:january|february|march|april|may|june|july|august|september|october|november|december)\s*,*\s*\d{4})"
 PAT_DAY_MONTH_YEAR_SHORT = r"(\d{1,2}\s*(?:jan\.?|feb\.?|mar\.?|apr\.?|may\.?|jun\.?|jul\.?|aug\.?|sep\.?|sept\.?|oct\.?|nov\.?|dec\.?)\s*,*\s*\d{4})"
 PAT_MONTH_DAY_YEAR = r"((?:january|february|march|april|may|june|july|august|september|october|november|december)\s*\d{1,2}\s*,*\s*\d{4})"
 PAT_MONTH_DAY_YEAR_SHORT = r"((?:jan\.?|feb\.?|mar\.?|apr\.?|may\.?|jun\.?|jul\.?|aug\.?|sep\.?|sept\.?|oct\.?|nov\.?|dec\.?)\s*\d{1,2}\s*,*\s*\d{4})"
 
-
-def extract_d_B_Y(text: str):
-    """
-    Function to extract date from text
-    Args:
-        text: date to be extracted
-
-    Returns: extracted date in form of list
-
+# Month names are the rare part of a date, so the text is scanned once for them and
+# each hit is checked for a day before it (%d %B %Y) or a day after it (%B %d %Y).
+# Full names and abbreviations (jan, jan., sept, ...) share one alternation.
+_MONTH = r"jan(?:uary|\.)?|feb(?:ruary|\.)?|mar(?:ch|\.)?|apr(?:il|\.)?|may\.?|june?\.?|july?\.?" \
+         r"|aug(?:ust|\.)?|sep(?:t(?:ember)?)?\.?|oct(?:ober|\.)?|nov(?:ember|\.)?|dec(?:ember|\.)?"
+MONTH_PATTERN = re.compile(_MONTH)
+MONTH_PATTERN_IGNORECASE = re.compile(_MONTH, re.IGNORECASE)
+_DAY_BEFORE = re.compile(r"(\d{1,2})\s*\Z")
+_YEAR_AFTER = re.compile(r"\s*,*\s*(\d{4})")
+_DAY_YEAR_AFTER = re.compile(r"\s*(\d{1,2})\s*,*\s*(\d{4})")
+# How far back from a month name a preceding day is looked for
+_DAY_BEFORE_WINDOW = 16
+
+MONTH_NUMBERS = {
+    month: i for i, month in enumerate(
+        ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1
+    )
+}
+
+
+class DateHit(typing.NamedTuple):
+    """A date found in text, start/end are offsets into that text"""
+    start: int
+    end: int
+    date: datetime.datetime
+
+
+def find_dates(text: str) -> typing.List[DateHit]:
     """
-    date_list = []
-    m_comp = re.compile(PAT_DAY_MONTH_YEAR, re.IGNORECASE)
-    all_m = m_comp.findall(text)
-
-    for m_date in all_m:
-        simp_str = ' '.join(m_date.replace(",", "").replace(".", "").split())
-        try:
-            date_time_obj = datetime.datetime.strptime(simp_str, '%d %B %Y')
-            date_list.append(date_time_obj)
-        except ValueError:
-            print("Datetime had an issue extracting Date for " + str(simp_str))
-
-    return date_list
+    Single scan of text for dates in any of the supported formats
 
-
-def extract_d_B_Y_short(text: str):
-    """
-    Function to extract date from text
     Args:
-        text: date to be extracted
+        text: text to search
 
-    Returns: extracted date in form of list
+    Returns: hits in order of their offsets, invalid dates (e.g. 31 september) are skipped
 
     """
-    date_list = []
-    m_comp = re.compile(PAT_DAY_MONTH_YEAR_SHORT, re.IGNORECASE)
-    all_m = m_comp.findall(text)
-
-    for m_date in all_m:
-        simp_str = ' '.join(
-            m_date.replace(",", "")
-            .replace(".", "")
-            .lower()
-            .replace("sept", "sep")
-            .split()
-        )
-        try:
-            date_time_obj = datetime.datetime.strptime(simp_str, '%d %b %Y')
-            date_list.append(date_time_obj)
-        except ValueError:
-            print("Datetime had an issue extracting Date for " + str(simp_str))
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        months = MONTH_PATTERN.finditer(lowered)
+    else:
+        # lowercasing changed some non-ascii character's length, offsets would no longer line up
+        months = MONTH_PATTERN_IGNORECASE.finditer(text)
+
+    hits = []
+    last_end = 0
+    for m in months:
+        if m.start() < last_end:
+            continue
+        day_before = _DAY_BEFORE.search(text, max(last_end, m.start() - _DAY_BEFORE_WINDOW), m.start())
+        year_after = _YEAR_AFTER.match(text, m.end()) if day_before else None
+        if year_after:
+            start, day, year, end = day_before.start(), day_before.group(1), year_after.group(1), year_after.end()
+        else:
+            day_year_after = _DAY_YEAR_AFTER.match(text, m.end())
+            if not day_year_after:
+                continue
+            start, (day, year), end = m.start(), day_year_after.groups(), day_year_after.end()
 
-    return date_list
-
-
-def extract_B_d_Y(text: str):
-    """
-    Function to extract date from text
-    Args:
-        text: date to be extracted
-
-    Returns: extracted date in form of list
-
-    """
-    date_list = []
-    m_comp = re.compile(PAT_MONTH_DAY_YEAR, re.IGNORECASE)
-    all_m = m_comp.findall(text)
-
-    for m_date in all_m:
-        simp_str = ' '.join(m_date.replace(",", "").replace(".", "").split())
-        try:
-            date_time_obj = datetime.datetime.strptime(simp_str, '%B %d %Y')
-            date_list.append(date_time_obj)
-        except ValueError:
-            print("Datetime had an issue extracting Date for " + str(simp_str))
-
-    return date_list
-
-
-def extract_B_d_Y_short(text: str):
-    """
-    Function to extract date from text
-    Args:
-        text: date to be extracted
-
-    Returns: extracted date in form of list
-
-    """
-    date_list = []
-    m_comp = re.compile(PAT_MONTH_DAY_YEAR_SHORT, re.IGNORECASE)
-    all_m = m_comp.findall(text)
-
-    for m_date in all_m:
-        simp_str = ' '.join(
-            m_date.replace(",", "")
-            .replace(".", "")
-            .lower()
-            .replace("sept", "sep")
-            .split()
-        )
         try:
-            date_time_obj = datetime.datetime.strptime(simp_str, '%b %d %Y')
-            date_list.append(date_time_obj)
+            date = datetime.datetime(int(year), MONTH_NUMBERS[m.group(0)[:3].lower()], int(day))
         except ValueError:
-            print("Datetime had an issue extracting Date for " + str(simp_str))
+            continue
+        hits.append(DateHit(start, end, date))
+        last_end = end
 
-    return date_list
+    return hits
 
 
 def dates_to_list(text: str):
@@ -128,11 +88,14 @@ def dates_to_list(text: str):
     Formats currently supported:
     %B %d %Y
     %d %B %Y
+    %b %d %Y
+    %d %b %Y
 
     Examples:
     31 september 1998
     31 August, 2000
     August 31, 1984
+    Sept. 4, 2012
 
      Args:
         text: date to be extracted
@@ -140,23 +103,34 @@ def dates_to_list(text: str):
     Returns: extracted date in form of list
 
     """
-
-    date_list = []
-
-    date_list += extract_d_B_Y(text)
-    date_list += extract_B_d_Y_short(text)
-    date_list += extract_B_d_Y(text)
-    date_list += extract_B_d_Y_short(text)
-
-    return date_list
-
-
-def add_dates_list(doc_dict):
-    doc_dict["date_list"] = dates_to_list(doc_dict["text"])
-    doc_dict["date_list"] = [str(d) for d in doc_dict["date_list"]]
+    return [hit.date for hit in find_dates(text)]
+
+
+def page_date_hits(doc_dict) -> typing.List[typing.Tuple[int, DateHit]]:
+    """(page number, hit) for every date in the document, offsets are into that page's raw text.
+    Falls back to the document text as page 0 when there are no pages."""
+    pages = doc_dict.get("pages")
+    if not pages:
+        return [(0, hit) for hit in find_dates(doc_dict.get("text", ""))]
+
+    return [
+        (page["p_page"], hit)
+        for page in pages
+        for hit in find_dates(page["p_raw_text"])
+    ]
+
+
+def add_dates_list(doc_dict, keep_offsets=False):
+    hits = page_date_hits(doc_dict)
+    doc_dict["date_list"] = [str(hit.date) for _, hit in hits]
+    if keep_offsets:
+        doc_dict["date_hits"] = [
+            {"page": page_num, "start": hit.start, "end": hit.end, "date": str(hit.date)}
+            for page_num, hit in hits
+        ]
     return doc_dict
 
 
-def process(doc_dict):
-    dates_dict = add_dates_list(doc_dict)
+def process(doc_dict, keep_offsets=False):
+    dates_dict = add_dates_list(doc_dict, keep_offsets=keep_offsets)
     return dates_dict
@@ -1,4 +1,5 @@
 from os.path import join
+from bisect import bisect_right
 from collections import Counter
 from itertools import chain
 from flashtext import KeywordProcessor
@@ -8,8 +9,9 @@ from gamechangerml.src.utilities.text_utils import simple_clean
 
 from common.document_parser.lib.document import Document, FieldNames
 from common.document_parser.lib.entities_utils import (
+    NonAlphaDeleteTable,
+    collapse_whitespace,
     remove_overlapping_ents,
-    replace_nonalpha_chars,
     make_entities_lookup_dict,
 )
 
@@ -35,6 +37,47 @@ ENTITY_RENAME_DICT = {
     "PERSON": "PERSON_s",
 }
 
+# Joins the paragraphs of a document so they can be searched at once. It is
+# neither whitespace nor a word character, so whitespace is never collapsed
+# across it and keywords can't match across it.
+PARAGRAPH_SEPARATOR = "\x00"
+_SEARCH_TABLE = NonAlphaDeleteTable(keep=PARAGRAPH_SEPARATOR)
+
+
+def clean_paragraphs_text(texts):
+    """Clean paragraphs' texts the way entities are searched for, as one
+    string.
+
+    Each text goes through simple_clean() and then has its non-alphanumeric
+    characters removed, as replace_nonalpha_chars(text, "") would, but that
+    is done once for all texts joined by PARAGRAPH_SEPARATOR.
+
+    Args:
+        texts (list of str): The paragraphs' texts.
+
+    Returns:
+        tuple:
+            str: The cleaned texts joined by PARAGRAPH_SEPARATOR.
+            list of int: The start index of each text in the joined string.
+    """
+    texts = [simple_clean(text) for text in texts]
+    joined = PARAGRAPH_SEPARATOR.join(texts)
+    if joined.count(PARAGRAPH_SEPARATOR) != max(len(texts) - 1, 0):
+        # The separator is deleted like any other non-alphanumeric character
+        # when it is part of the text itself.
+        joined = PARAGRAPH_SEPARATOR.join(
+            text.replace(PARAGRAPH_SEPARATOR, "") for text in texts
+        )
+    joined = collapse_whitespace(joined.translate(_SEARCH_TABLE))
+
+    starts = [0]
+    index = joined.find(PARAGRAPH_SEPARATOR)
+    while index != -1:
+        starts.append(index + 1)
+        index = joined.find(PARAGRAPH_SEPARATOR, index + 1)
+
+    return joined, starts
+
 
 def extract_entities(doc_dict):
     """Extract entities from a document's text.
@@ -70,45 +113,52 @@ def extract_entities(doc_dict):
     """
     doc = Document(doc_dict)
     paragraphs = doc.get_field(FieldNames.PARAGRAPHS)
-    all_ents = []
+    ent_types = list(ENTITY_RENAME_DICT.values())
 
+    searched = []
     for par in paragraphs:
-        ents_by_type = dict(
-            zip(
-                list(ENTITY_RENAME_DICT.values()),
-                [set() for _ in range(len(ENTITY_RENAME_DICT))],
-            )
-        )
+        if par.get(FieldNames.PAR_RAW_TEXT) is None:
+            par[FieldNames.ENTITIES] = {ent_type: set() for ent_type in ent_types}
+        else:
+            searched.append(par)
 
-        text = par.get(FieldNames.PAR_RAW_TEXT)
-        if text is None:
-            par[FieldNames.ENTITIES] = ents_by_type
-            continue
-        text = simple_clean(text)
-        # Remove non-alphanumeric characters in the paragraph's text since we
-        # search for entities using the keys of ENTITIES_LOOKUP_DICT which also
-        # have non-alphanumeric characters removed.
-        text = replace_nonalpha_chars(text, "")
-
-        # The flashtext KeywordProcessor (inspired by the Aho-Corasick
-        # algorithm and Trie data structure) is MUCH faster than re.finditer()
-        # in this case.
-        ents = [
+    text, starts = clean_paragraphs_text(
+        [par[FieldNames.PAR_RAW_TEXT] for par in searched]
+    )
+
+    # The flashtext KeywordProcessor (inspired by the Aho-Corasick
+    # algorithm and Trie data structure) is MUCH faster than re.finditer()
+    # in this case. It runs once over all paragraphs, offsets are unique across
+    # paragraphs so overlaps are removed once as well, and each entity is then
+    # assigned to its paragraph by its start index.
+    ents = remove_overlapping_ents(
+        [
             (
-                e[1],
-                e[2],
-                ENTITIES_LOOKUP_DICT[e[0]]["raw_ent"],
-                ENTITIES_LOOKUP_DICT[e[0]]["ent_type"],
+                start,
+                end,
+                ENTITIES_LOOKUP_DICT[keyword]["raw_ent"],
+                ENTITIES_LOOKUP_DICT[keyword]["ent_type"],
+            )
+            for keyword, start, end in PROCESSOR.extract_keywords(
+                text, span_info=True
             )
-            for e in PROCESSOR.extract_keywords(text, span_info=True)
         ]
-        ents = remove_overlapping_ents(ents)
-        for ent in ents:
-            ents_by_type[ENTITY_RENAME_DICT[ent[3]]].add(ent[2])
-        ents_by_type = {k: list(v) for k, v in ents_by_type.items()}
+    )
+    ents_by_par = {}
+    for ent in ents:
+        i = bisect_right(starts, ent[0]) - 1
+        if i not in ents_by_par:
+            ents_by_par[i] = {ent_type: set() for ent_type in ent_types}
+        ents_by_par[i][ENTITY_RENAME_DICT[ent[3]]].add(ent[2])
 
+    all_ents = []
+    for i, par in enumerate(searched):
+        if i in ents_by_par:
+            ents_by_type = {k: list(v) for k, v in ents_by_par[i].items()}
+            all_ents.extend(chain.from_iterable(ents_by_type.values()))
+        else:
+            ents_by_type = {ent_type: [] for ent_type in ent_types}
         doc.set_paragraph_entities(par, ents_by_type)
-        all_ents += list(chain.from_iterable(ents_by_type.values()))
 
     doc.set_field(FieldNames.ENTITIES, (list(set(all_ents))))
     doc.set_field(
@@ -1,8 +1,36 @@
 from pandas import read_excel
-from re import sub
+from re import compile as re_compile, sub
 from collections import Counter
 from operator import itemgetter
 
+_ALPHANUMERIC = frozenset(
+    "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+)
+_MULTIPLE_WHITESPACE = re_compile("\\s{2,}")
+
+
+class NonAlphaDeleteTable(dict):
+    """str.translate() table that deletes the characters matched by
+    "[^a-zA-Z0-9\\s]", i.e. everything except ASCII letters, digits and
+    whitespace. Entries are filled in as characters are first seen.
+
+    Args:
+        keep (str, optional): Characters to keep even though they would
+            otherwise be deleted. Defaults to "".
+    """
+
+    def __init__(self, keep=""):
+        super().__init__((ord(c), ord(c)) for c in keep)
+
+    def __missing__(self, codepoint):
+        char = chr(codepoint)
+        value = codepoint if char in _ALPHANUMERIC or char.isspace() else None
+        self[codepoint] = value
+        return value
+
+
+NONALPHA_DELETE_TABLE = NonAlphaDeleteTable()
+
 
 def make_entities_lookup_dict(
     entities_path,
@@ -164,9 +192,24 @@ def replace_nonalpha_chars(text, replace_char=""):
     Returns:
         str: The text with non-alphanumeric characters replaced.
     """
-    text = sub("[^a-zA-Z0-9\s]+", replace_char, text)
-    
-    return sub("\\s{2,}", " ", text)
+    if replace_char == "":
+        text = text.translate(NONALPHA_DELETE_TABLE)
+    else:
+        text = sub("[^a-zA-Z0-9\s]+", replace_char, text)
+
+    return collapse_whitespace(text)
+
+
+def collapse_whitespace(text):
+    """Replace each run of 2 or more whitespace characters with a space.
+
+    Args:
+        text (str)
+
+    Returns:
+        str
+    """
+    return _MULTIPLE_WHITESPACE.sub(" ", text)
 
 
 def sort_by_str_len(strs, descending=True):
@@ -1,17 +1,48 @@
 from pathlib import Path
 from typing import Union
 
-from common.document_parser.lib.html_utils import convert_html_file_to_pdf, convert_html_to_pdf, convert_text_to_html
+from common.document_parser.lib.html_utils import (
+    convert_html_file_to_pdf,
+    convert_html_to_pdf,
+    convert_text_to_html,
+    extract_text_from_html,
+)
 from common.document_parser.lib.reading_in import read_plain_text
 
 
+NATIVE_TEXT_FILETYPES = ('.html', '.txt')
+"""Filetypes whose text can be read directly, without rendering them to pdf first."""
+
+
+def is_native_text_file(filepath: Union[Path, str]) -> bool:
+    return Path(filepath).suffix in NATIVE_TEXT_FILETYPES
+
+
+def read_native_text(filepath: Union[Path, str]) -> str:
+    """Returns the text of an html or plain text file as it would read once rendered."""
+    filepath = Path(filepath)
+    filetype = filepath.suffix
+    if filetype == '.html':
+        with open(filepath, 'rb') as html_file:
+            return extract_text_from_html(html_file)
+    elif filetype == '.txt':
+        return read_plain_text(filepath)
+    else:
+        raise ValueError(f'unsupported filetype {filetype}')
+
+
 def coerce_file_to_pdf(filepath: Union[Path, str]) -> str:
-    """Attempts to convert the given file to a pdf and returns the pdf filepath."""
+    """Attempts to convert the given file to a pdf and returns the pdf filepath.
+
+    A pdf already rendered from the same file (and newer than it) is reused as is."""
     filepath = Path(filepath)
     filetype = filepath.suffix
     if filetype == '.pdf' or filetype == '.PDF':
         return str(filepath)
-    elif filetype == '.html':
+    pdf_path = filepath.with_suffix('.pdf')
+    if pdf_path.exists() and pdf_path.stat().st_mtime >= filepath.stat().st_mtime:
+        return str(pdf_path)
+    if filetype == '.html':
         return convert_html_file_to_pdf(filepath)
     elif filetype == '.txt':
         text = read_plain_text(filepath)
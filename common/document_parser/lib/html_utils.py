@@ -1,4 +1,5 @@
 import mimetypes
+import re
 from pathlib import Path
 from typing import IO, AnyStr, Union
 
@@ -116,6 +117,48 @@ def clean_html_for_pdf(markup: Union[IO, AnyStr]) -> str:
 
     return str(soup)
 
+_NON_TEXT_TAGS = ('head', 'script', 'style', 'noscript', 'template', 'iframe', 'object', 'svg')
+"""Tags whose contents never show up as text in a rendered page."""
+
+_BLOCK_TAGS = (
+    'address', 'article', 'aside', 'blockquote', 'caption', 'dd', 'div', 'dl', 'dt', 'fieldset',
+    'figcaption', 'figure', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li',
+    'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'tbody', 'thead', 'tfoot', 'tr', 'ul',
+)
+"""Tags that start a new line when rendered."""
+
+_CELL_TAGS = ('td', 'th')
+
+_INLINE_WHITESPACE = re.compile(r'[ \t\f\v\xa0]+')
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+
+def extract_text_from_html(markup: Union[IO, AnyStr]) -> str:
+    """Returns the visible text of an html document, laid out the way it reads when rendered.
+
+    This drops the same navigation chrome as clean_html_for_pdf but never builds a pdf, block
+    elements and <br> become line breaks and table cells on a row are separated by spaces.
+    """
+    soup = bs4.BeautifulSoup(markup, 'html5lib')
+
+    _remove_nav_bar(soup)
+    _remove_header_href(soup)
+
+    for tag in soup.find_all(_NON_TEXT_TAGS):
+        tag.decompose()
+    for tag in soup.find_all('br'):
+        tag.replace_with('\n')
+    for tag in soup.find_all(_CELL_TAGS):
+        tag.append(' ')
+    for tag in soup.find_all(_BLOCK_TAGS):
+        tag.insert_before('\n')
+        tag.append('\n')
+
+    root = soup.body or soup
+    lines = (_INLINE_WHITESPACE.sub(' ', line).strip() for line in root.get_text().split('\n'))
+    text = '\n'.join(lines)
+    return _BLANK_LINES.sub('\n\n', text).strip() + '\n'
+
 def convert_html_to_pdf(filepath: Union[Path, str], html: str) -> str:
     """Creates pdf file for parsing from an html string."""
     filepath = Path(filepath)
@@ -1,12 +1,133 @@
+import re
 from collections import defaultdict
 
+import numpy as np
+from gensim.parsing.preprocessing import STOPWORDS
+
+
+# Keywords kept per page before they are counted across the document.
+KEYWORDS_PER_PAGE = 2
+# Longest phrase (in words) that can be a keyword.
+MAX_PHRASE_WORDS = 2
+TOP_N = 10
+
+# One scan over the whole document: words, and everything that ends a phrase
+# (punctuation, numbers, the page separator).
+PAGE_SEPARATOR = "\x00"
+TOKEN_PATTERN = re.compile(r"[a-z][a-z'\-]*[a-z]|[^a-z\s]+|[a-z]")
+STOPWORDS_SET = frozenset(STOPWORDS)
+MIN_WORD_LEN = 3
+
+# Word -> id, shared by every document parsed in the process. Built once and
+# inherited by forked parser workers; cleared between documents once it grows
+# past the limit.
+VOCABULARY_LIMIT = 500000
+_VOCABULARY = {}
+_WORDS = []
+
+
+def word_id(word):
+    i = _VOCABULARY.get(word)
+    if i is None:
+        i = len(_WORDS)
+        _VOCABULARY[word] = i
+        _WORDS.append(word)
+    return i
+
+
+def candidate_phrases(page_texts):
+    """Tokenize all pages in one pass into runs of content words (split at
+    stopwords, punctuation and numbers), cut into candidate phrases of at most
+    MAX_PHRASE_WORDS words.
+
+    Returns:
+        (pages, words, phrase_lens, phrase_keys, phrase_occs): page, word id and
+        phrase length of every content word occurrence, the (page, word ids,
+        -1 padded) key of every candidate phrase, and the occurrence indices of
+        its words (-1 padded).
+    """
+    if len(_WORDS) >= VOCABULARY_LIMIT:
+        _VOCABULARY.clear()
+        _WORDS.clear()
+    text = PAGE_SEPARATOR.join(page_texts).lower()
+
+    occ_pages, occ_words, occ_lens = [], [], []
+    phrase_keys, phrase_occs = [], []
+    page = 0
+    run = []
+
+    def close_run():
+        for start in range(0, len(run), MAX_PHRASE_WORDS):
+            phrase = run[start:start + MAX_PHRASE_WORDS]
+            first = len(occ_words)
+            pad = [-1] * (MAX_PHRASE_WORDS - len(phrase))
+            phrase_keys.append((page, *phrase, *pad))
+            phrase_occs.append([*range(first, first + len(phrase)), *pad])
+            for w in phrase:
+                occ_pages.append(page)
+                occ_words.append(w)
+                occ_lens.append(len(phrase))
+        run.clear()
+
+    for token in TOKEN_PATTERN.findall(text):
+        if len(token) >= MIN_WORD_LEN and token[0].isalpha() and token not in STOPWORDS_SET:
+            run.append(word_id(token))
+            continue
+        close_run()
+        if PAGE_SEPARATOR in token:
+            page += token.count(PAGE_SEPARATOR)
+    close_run()
+
+    return (
+        np.asarray(occ_pages, dtype=np.int64),
+        np.asarray(occ_words, dtype=np.int64),
+        np.asarray(occ_lens, dtype=np.float64),
+        phrase_keys,
+        np.asarray(phrase_occs, dtype=np.int64).reshape(-1, MAX_PHRASE_WORDS),
+    )
+
+
+def extract_page_keywords(page_texts, per_page=KEYWORDS_PER_PAGE):
+    """Top keywords of every page, scored RAKE style (word degree / frequency
+    within the page, summed over the phrase) for all pages at once.
+
+    Returns:
+        list of list of str, one list per page.
+    """
+    page_keywords = [[] for _ in page_texts]
+    pages, words, phrase_lens, phrase_keys, phrase_occs = candidate_phrases(page_texts)
+    if not phrase_keys:
+        return page_keywords
+
+    # per (page, word): frequency and degree, then score = degree / frequency
+    _, inverse = np.unique(pages * len(_WORDS) + words, return_inverse=True)
+    word_scores = np.bincount(inverse, weights=phrase_lens) / np.bincount(inverse)
+    occ_scores = np.append(word_scores[inverse], 0.0)  # index -1 (padding) scores 0
+    phrase_scores = occ_scores[phrase_occs].sum(axis=1)
+
+    # repeated phrases on a page are one candidate
+    keys = np.asarray(phrase_keys, dtype=np.int64)
+    _, first = np.unique(keys, axis=0, return_index=True)
+    # best score first within each page, earliest occurrence breaks ties
+    order = first[np.lexsort((first, -phrase_scores[first], keys[first, 0]))]
+
+    for i in order:
+        page = phrase_keys[i][0]
+        if len(page_keywords[page]) < per_page:
+            page_keywords[page].append(" ".join(_WORDS[w] for w in phrase_keys[i][1:] if w >= 0))
+
+    return page_keywords
+
 
 def add_keyw_5(doc_dict):
+    """Set doc_dict["keyw_5"] to the TOP_N keywords that are top keywords on the
+    most pages."""
+    page_texts = [page["p_raw_text"] for page in doc_dict.get("pages") or []]
     keyword_counts = defaultdict(int)
-    for l in doc_dict["keyw_5"]:
+    for l in extract_page_keywords(page_texts):
         for kw in l:
             keyword_counts[kw] += 1
     kw_list = list(zip(keyword_counts.values(), keyword_counts.keys()))
     kw_list.sort(reverse=True)
-    doc_dict["keyw_5"] = [x[1] for x in kw_list[:10]]
-    return doc_dict
\ No newline at end of file
+    doc_dict["keyw_5"] = [x[1] for x in kw_list[:TOP_N]]
+    return doc_dict
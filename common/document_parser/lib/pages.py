@@ -1,5 +1,4 @@
 from gamechangerml.src.utilities.text_utils import utf8_pass, clean_text
-from gamechangerml.src.featurization.keywords.extract_keywords import get_keywords
 
 
 def create_page_dict(page_num, page_text, doc_dict):
@@ -8,7 +7,6 @@ def create_page_dict(page_num, page_text, doc_dict):
     page_dict = {}
     page_dict["type"] = "page"
     page_dict["p_text"] = utf8_ptext
-    doc_dict["keyw_5"].append(get_keywords(page_text))
     page_dict["p_raw_text"] = page_text
     page_dict["p_page"] = page_num
     page_dict["filename"] = doc_dict["filename"]
@@ -31,3 +29,42 @@ def handle_pages(doc_obj, doc_dict):
         page_text = page.getText()
         doc_dict["text"] = doc_dict["text"] + page_text
         handle_page(page_num, page_text, doc_dict)
+
+
+DEFAULT_VIRTUAL_PAGE_CHARS = 3000
+
+
+def split_virtual_pages(text, page_chars=DEFAULT_VIRTUAL_PAGE_CHARS):
+    """Split text with no physical layout into pages of about page_chars characters.
+
+    Pages end on a line break, so page boundaries (and page numbers) only depend on the
+    text and page_chars. A single line longer than a page gets a page to itself.
+    """
+    if page_chars < 1:
+        raise ValueError(f"page_chars must be positive, got {page_chars}")
+
+    page_texts = []
+    current = []
+    current_len = 0
+    for line in text.splitlines(keepends=True):
+        if current and current_len + len(line) > page_chars:
+            page_texts.append("".join(current))
+            current = []
+            current_len = 0
+        current.append(line)
+        current_len += len(line)
+    if current or not page_texts:
+        page_texts.append("".join(current))
+    return page_texts
+
+
+def handle_text_pages(text, doc_dict, page_chars=DEFAULT_VIRTUAL_PAGE_CHARS):
+    """Same fields as handle_pages, for text extracted without a pdf (see split_virtual_pages)"""
+    doc_dict["text"] = ""
+    doc_dict["page_count"] = 0
+    doc_dict["pages"] = []
+    doc_dict["keyw_5"] = []
+    page_texts = split_virtual_pages(text, page_chars)
+    doc_dict["text"] = "".join(page_texts)
+    for page_num, page_text in enumerate(page_texts):
+        handle_page(page_num, page_text, doc_dict)
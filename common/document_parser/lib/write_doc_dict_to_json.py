@@ -1,15 +1,19 @@
 from pathlib import Path
-import json
+
+from common.document_parser import validators
+from common.utils import parsed_json
 
 
 def write(out_dir="./", ex_dict={}):
-    outname = Path(ex_dict["filename"]).stem + '.json'
+    """Atomically write the doc dict to out_dir, compressed if PARSED_JSON_COMPRESSION is set"""
+    stem = Path(ex_dict["filename"]).stem
+    compression = parsed_json.get_compression_from_env()
 
     p = Path(out_dir)
     if not p.exists():
-        p.mkdir()
+        p.mkdir(parents=True)
 
-    with open(p.joinpath(outname), "w") as fp:
-        json.dump(ex_dict, fp)
+    validators.check_before_write(ex_dict, p.joinpath(stem + parsed_json.COMPRESSION_SUFFIXES[compression]))
+    parsed_json.dump_parsed_json(ex_dict, p, stem, compression=compression)
 
     return True
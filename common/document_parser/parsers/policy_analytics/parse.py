@@ -7,6 +7,7 @@ from common.document_parser.lib import (
     topics,
     ref_list,
     abbreviations,
+    dates,
     summary,
     keywords,
     text_length,
@@ -19,6 +20,7 @@ from common.document_parser.lib import (
 )
 
 from common.document_parser.lib.section_parse import add_sections
+from common.document_parser import instrumentation
 from . import init_doc
 from common.document_parser.lib.ml_features import (
     add_pagerank_r,
@@ -27,6 +29,30 @@ from common.document_parser.lib.ml_features import (
 from gamechangerml.src.utilities.text_utils import utf8_pass, clean_text
 
 
+# Run in order on the doc dict once its pages and paragraphs are in place. A function that
+# raises is reported and skipped, the rest still run.
+ENRICHMENT_FUNCS = [
+    ref_list.add_ref_list,
+    entities.extract_entities,
+    topics.extract_topics,
+    keywords.add_keyw_5,
+    abbreviations.add_abbreviations_n,
+    summary.add_summary,
+    add_pagerank_r,
+    add_popscore_r,
+    text_length.add_word_count,
+    add_sections,
+    dates.process,
+]
+
+
+def _env_flag(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
 def parse(
     f_name,
     meta_data=None,
@@ -34,8 +60,22 @@ def parse(
     num_ocr_threads=2,
     force_ocr=False,
     out_dir="./",
+    render_pdf=None,
+    virtual_page_chars=None,
 ):
+    """
+    html and txt files are read directly, their pages are virtual pages of about
+    virtual_page_chars characters (env PARSER_VIRTUAL_PAGE_CHARS). They are only rendered to pdf,
+    and the doc's filename changed to the .pdf, when render_pdf is set (env PARSER_RENDER_PDF, off
+    by default). Ingest pipelines set it because their thumbnails and archived raw docs come from
+    that pdf, the parsed text never does.
+    """
     print("running policy_analyics.parse on", f_name)
+    if render_pdf is None:
+        render_pdf = _env_flag("PARSER_RENDER_PDF", False)
+    if virtual_page_chars is None:
+        virtual_page_chars = int(os.environ.get(
+            "PARSER_VIRTUAL_PAGE_CHARS", pages.DEFAULT_VIRTUAL_PAGE_CHARS))
     try:
         meta_dict = read_meta.read_metadata(meta_data)
         doc_dict = init_doc.create_doc_dict_with_meta(meta_dict)
@@ -44,45 +84,47 @@ def parse(
         init_doc.assign_other_fields(doc_dict)
         should_delete = False
         if ocr_missing_doc or force_ocr:
-            f_name = ocr.get_ocr_filename(f_name, num_ocr_threads, force_ocr)
-        if not str(f_name).endswith(".pdf"):
-            f_name = file_utils.coerce_file_to_pdf(f_name)
+            with instrumentation.stage("ocr.get_ocr_filename"):
+                f_name = ocr.get_ocr_filename(f_name, num_ocr_threads, force_ocr)
+        native_text = None
+        if file_utils.is_native_text_file(f_name):
+            with instrumentation.stage("file_utils.read_native_text"):
+                native_text = file_utils.read_native_text(f_name)
+        if not str(f_name).endswith(".pdf") and (render_pdf or native_text is None):
+            with instrumentation.stage("file_utils.coerce_file_to_pdf"):
+                f_name = file_utils.coerce_file_to_pdf(f_name)
             doc_dict['filename'] = re.sub(r'\.[^.]+$', '.pdf', doc_dict['filename'])
             should_delete = False
-        funcs = [
-            ref_list.add_ref_list,
-            entities.extract_entities,
-            topics.extract_topics,
-            keywords.add_keyw_5,
-            abbreviations.add_abbreviations_n,
-            summary.add_summary,
-            add_pagerank_r,
-            add_popscore_r,
-            text_length.add_word_count,
-            add_sections,
-        ]
-
-        doc_obj = pdf_reader.get_fitz_doc_obj(f_name)
-        pages.handle_pages(doc_obj, doc_dict)
-        doc_obj.close()
-
-        paragraphs.add_paragraphs(doc_dict)
-
-        for func in funcs:
+        if native_text is not None:
+            with instrumentation.stage("pages.handle_text_pages"):
+                pages.handle_text_pages(native_text, doc_dict, virtual_page_chars)
+        else:
+            with instrumentation.stage("pages.handle_pages"):
+                doc_obj = pdf_reader.get_fitz_doc_obj(f_name)
+                pages.handle_pages(doc_obj, doc_dict)
+                doc_obj.close()
+
+        with instrumentation.stage("paragraphs.add_paragraphs"):
+            paragraphs.add_paragraphs(doc_dict)
+
+        for func in ENRICHMENT_FUNCS:
             try:
-                func(doc_dict)
+                with instrumentation.stage(instrumentation.stage_name(func)):
+                    func(doc_dict)
             except Exception as e:
                 print(e)
                 print("Could not run %s on document dict" % func)
-        # TODO: ADD DATES ? ## Unsure what this note is referring to
-        # doc_dict = dates.process(doc_dict) 
-        doc_dict = post_process(doc_dict)
-        doc_dict = process_ingest_date(doc_dict)
-        
+        with instrumentation.stage("parse.post_process"):
+            doc_dict = post_process(doc_dict)
+        with instrumentation.stage("parse.process_ingest_date"):
+            doc_dict = process_ingest_date(doc_dict)
+
         ## NEW
-        doc_dict = crawler_info(doc_dict)
+        with instrumentation.stage("parse.crawler_info"):
+            doc_dict = crawler_info(doc_dict)
 
-        write_doc_dict_to_json.write(out_dir=out_dir, ex_dict=doc_dict)
+        with instrumentation.stage("write_doc_dict_to_json.write"):
+            write_doc_dict_to_json.write(out_dir=out_dir, ex_dict=doc_dict)
     except Exception as e:
         print("ERROR in policy_analytics.parse:", e)
     finally:
@@ -1,12 +1,12 @@
 import multiprocessing
 import typing
 import os
+from contextlib import ExitStack
 from datetime import datetime
 from pathlib import Path
-import filetype
 from collections import namedtuple
 
-from . import get_default_logger
+from . import get_default_logger, validators, instrumentation
 
 from dataPipelines.gc_ocr.utils import OCRError
 from .lib.pdf_reader import PageCountParse
@@ -17,6 +17,7 @@ import importlib
 # Added for missed page fix
 import concurrent.futures
 from tqdm import tqdm
+from common.utils.metadata_catalog import get_catalog, RAW
 from common.utils.file_utils import is_pdf, is_ocr_pdf, is_encrypted_pdf, check_ocr_status_job_type
 from ocrmypdf import SubprocessOutputError
 from dataPipelines.gc_ocr.utils import PDFOCR, OCRJobType
@@ -30,6 +31,13 @@ class PageCountCheck(Exception):
     """Could not parse the doc, failed page count check"""
     pass
 
+
+class SingleProcessResult(typing.NamedTuple):
+    # (output file, schema errors) for each written doc that failed validation, empty unless verifying
+    validation_failures: typing.List[typing.Tuple[str, typing.List[str]]]
+    # the doc's stage metrics (see instrumentation.instrument_document), None unless instrumenting
+    metrics: typing.Optional[dict]
+
 def resolve_dynamic_func(func_path: str) -> typing.Callable[[dict], dict]:
     if '::' not in func_path:
         raise Exception(
@@ -71,11 +79,12 @@ def resolve_dynamic_parser(parser_path: str) -> typing.Callable:
         raise Exception(e)
 
 
-def single_process(data_inputs: typing.Tuple[typing.Callable, str, str, bool, int, bool, str]) -> None:
+def single_process(data_inputs: typing.Tuple[typing.Callable, str, str, bool, int, bool, str, bool, bool]) -> SingleProcessResult:
     """
     Args:
         data_inputs: named tuple of kind "parser_input", the necessary data inputs
-    Returns:
+    Returns: validation failures of the written docs when verify is set, and the doc's
+        per stage metrics when instrument (last input) is set
     """
 
     (parse_func,
@@ -84,9 +93,20 @@ def single_process(data_inputs: typing.Tuple[typing.Callable, str, str, bool, in
      ocr_missing_doc,
      num_ocr_threads,
      force_ocr,
-     out_dir
+     out_dir,
+     verify,
+     instrument
      ) = data_inputs
 
+    with ExitStack() as stack:
+        failures = stack.enter_context(validators.collect_in_memory_failures()) if verify else []
+        metrics = stack.enter_context(instrumentation.instrument_document(Path(f_name).name)) if instrument else None
+        _single_process(parse_func, f_name, meta_data, ocr_missing_doc, num_ocr_threads, force_ocr, out_dir)
+    return SingleProcessResult(failures, metrics)
+
+
+def _single_process(parse_func, f_name, meta_data, ocr_missing_doc, num_ocr_threads, force_ocr, out_dir) -> None:
+
     # Logging is not safe in multiprocessing thread. Especially if its going to a file
     # Directly printing to screen is a temporary solution here
     m_id = multiprocessing.current_process()
@@ -149,8 +169,11 @@ def process_dir(
         ocr_missing_doc: bool = False,
         force_ocr: bool = False,
         num_ocr_threads: int = 2,
-        batch_size: int = 100
-):
+        batch_size: int = 100,
+        verify: bool = False,
+        metrics_out: str = None,
+        prometheus_textfile: str = None
+) -> typing.List[typing.Tuple[str, typing.List[str]]]:
     """
     Processes a directory of pdf files, returns corresponding Json files
     Args:
@@ -161,13 +184,25 @@ def process_dir(
         multiprocess: Multiprocessing. Will take integer for number of cores
         ocr_missing_doc: OCR non-ocr'ed docs in place
         num_ocr_threads: Number of threads used for OCR (per doc)
+        verify: Validate each doc dict against the output schema before it is written
+        metrics_out: Record per stage timings and memory of every doc, and write the run's summary
+            (p50/p95/max per stage, slowest docs) to this json file
+        prometheus_textfile: Same as metrics_out, written in the Prometheus textfile collector format
+    Returns: (output file, schema errors) for every doc that failed validation
     """
 
-    p = Path(dir_path).glob("**/*")
-    files = [x for x in p if x.is_file() and (x.suffix.lower() in (".pdf", ".html", ".txt")
-        or (filetype.guess(str(x)) is not None and (filetype.guess(str(x)).mime == "pdf" or filetype.guess(str(x)).mime == "application/pdf")))]
+    # pdf/html/txt files, and pdfs without an extension, sniffed once per file version by the catalog
+    catalog = get_catalog()
+    catalog.refresh(dir_path, recursive=True)
+    files = [Path(e.path) for e in catalog.files(dir_path, kind=RAW, recursive=True)]
+    instrument = bool(metrics_out or prometheus_textfile)
     data_inputs = [(parse_func, f_name, str(f_name)+'.metadata', ocr_missing_doc,
-                    num_ocr_threads, force_ocr, out_dir) for f_name in files]
+                    num_ocr_threads, force_ocr, out_dir, verify, instrument) for f_name in files]
+    if verify:
+        # built once here, forked workers inherit it
+        validators.get_validator()
+    validation_failures = []
+    doc_metrics = []
 
     doc_logger = get_default_logger()
     doc_logger.info("Parsing Multiple Documents: %i", len(data_inputs))
@@ -238,7 +273,10 @@ def process_dir(
             print("Total OCR Time:", total_ocr_time)
             print(f"Count of documents reOCRed / total: {reocr_count} / {total_num_files}")
         # Process files
-        pool.map(single_process, data_inputs, batch_size)
+        for result in pool.map(single_process, data_inputs, batch_size):
+            validation_failures.extend(result.validation_failures)
+            if result.metrics is not None:
+                doc_metrics.append(result.metrics)
         # diff = time.time() - begin
         # print('MP total: ', diff)
         # print('MP avg', diff / (len(data_inputs) + 0.0001))
@@ -246,7 +284,10 @@ def process_dir(
         # times = []
         for item in data_inputs:
             # start = time.time()
-            single_process(item)
+            result = single_process(item)
+            validation_failures.extend(result.validation_failures)
+            if result.metrics is not None:
+                doc_metrics.append(result.metrics)
             # end = time.time()
             # diff = end - start
             # print('single runtime: ', diff)
@@ -262,4 +303,7 @@ def process_dir(
     print("Current Time =", current_time)
 
     # TODO: actually track how many were successfully processed
-    doc_logger.info("Documents parsed (or attempted): %i", len(data_inputs))
\ No newline at end of file
+    doc_logger.info("Documents parsed (or attempted): %i", len(data_inputs))
+    if instrument:
+        instrumentation.write_run_metrics(doc_metrics, metrics_out, prometheus_textfile)
+    return validation_failures
@@ -1,10 +1,71 @@
 import json
 import jsonschema
-import traceback
+import typing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
 from common import PACKAGE_DOCUMENT_PARSER_PATH
+from common.utils.parsed_json import iter_parsed_json_files, load_parsed_json
 import os
 
+SCHEMA_PATH = os.path.join(PACKAGE_DOCUMENT_PARSER_PATH, 'output_schema.json')
+
+# (output file, error messages) for docs that failed in-memory validation, None when not collecting
+_collected_failures: typing.Optional[typing.List[typing.Tuple[str, typing.List[str]]]] = None
+
+
+@lru_cache(maxsize=None)
+def get_validator():
+    """
+    Load and check the output schema once per process and build a validator for it.
+    Parent processes that call this before forking workers hand it down to them.
+    """
+    with open(SCHEMA_PATH, 'r') as f:
+        schema_dict = json.load(f)
+    validator_cls = jsonschema.validators.validator_for(schema_dict)
+    validator_cls.check_schema(schema_dict)
+    return validator_cls(schema_dict)
+
+
+def validate_doc_dict(doc_dict: dict) -> typing.List[str]:
+    """
+    Validate a parsed doc dict against the output schema
+    Args:
+        doc_dict: parsed document
+
+    Returns: one message per schema violation, prefixed with the path to the offending value, empty if valid
+    """
+    return [
+        f"{'/'.join(str(p) for p in error.absolute_path) or '<root>'}: {error.message}"
+        for error in sorted(get_validator().iter_errors(doc_dict), key=lambda e: list(map(str, e.absolute_path)))
+    ]
+
+
+def validate_file(json_file: str) -> typing.Tuple[str, typing.List[str]]:
+    """
+    Args:
+        json_file: location of the json file
+
+    Returns: (json_file, error messages), no messages if valid
+    """
+    try:
+        input_json_dict = load_parsed_json(json_file)
+    except ValueError as e:
+        return json_file, [f"not a json: {e}"]
+    return json_file, validate_doc_dict(input_json_dict)
+
+
+def report_failures(failures: typing.Iterable[typing.Tuple[str, typing.List[str]]]) -> int:
+    """Print every failure with its file, returns how many files failed"""
+    count = 0
+    for json_file, errors in failures:
+        count += 1
+        print("Validation Failed - " + str(json_file))
+        for error in errors:
+            print("\t" + error)
+    return count
+
 
 def verify_file(json_file:str) -> bool:
     """
@@ -14,47 +75,39 @@ def verify_file(json_file:str) -> bool:
 
     Returns: True if valid
     """
-    schema_path = os.path.join(PACKAGE_DOCUMENT_PARSER_PATH,'output_schema.json')
-    try:
-        with open(schema_path, 'r') as f:
-            schema_dict = json.load(f)
-        with open(json_file, 'r') as f:
-            input_json_dict = json.load(f)
-        jsonschema.validate(input_json_dict, schema_dict)
-    except jsonschema.exceptions.ValidationError as e:
-        print("well formed but invalid json")
-        print(e)
-        is_valid_json = False
-        return is_valid_json
-    except json.decoder.JSONDecodeError as e:
-        print("not a json")
-        is_valid_json = False
-        traceback.print_exec()
-        return is_valid_json
-    else:
-        is_valid_json = True
-    return is_valid_json
+    _, errors = validate_file(str(json_file))
+    if errors:
+        report_failures([(json_file, errors)])
+        return False
+    return True
 
 
-def verify_directory(json_directory:str)->bool:
+def verify_directory(json_directory:str, max_workers: typing.Optional[int] = None)->bool:
     """
-    take in a Json directory and compare them vs a json schema to verify it
+    take in a Json directory and compare them vs a json schema to verify it,
+    files are validated in parallel and every failure is reported
     Args:
         json_directory: location of the json files
+        max_workers: number of worker processes, defaults to the cpu count
 
     Returns: True if valid
 
     """
-    p = Path(json_directory).glob("*.json")
-    files = [x for x in p if x.is_file()]
-    is_valid = False
-    for m_file in files:
-        is_valid = verify_file(str(m_file))
-        print("Validation OK - " + str(m_file))
-        if is_valid is False:
-            print("Validation Failed - " + str(m_file))
-            break
-    return is_valid
+    files = [str(x) for x in iter_parsed_json_files(json_directory)]
+    if not files:
+        return False
+
+    get_validator()
+    max_workers = min(max_workers or os.cpu_count() or 1, len(files))
+    if max_workers == 1:
+        results = [validate_file(f) for f in files]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(validate_file, files, chunksize=max(1, len(files) // (max_workers * 4))))
+
+    failed = report_failures((f, errors) for f, errors in results if errors)
+    print(f"Validation OK - {len(files) - failed} of {len(files)} files in {json_directory}")
+    return failed == 0
 
 
 def verify(source:str) -> bool:
@@ -71,3 +124,27 @@ def verify(source:str) -> bool:
     else:
         result = verify_directory(source)
     return result
+
+
+@contextmanager
+def collect_in_memory_failures():
+    """
+    Validate every doc dict written (see check_before_write) while inside this context,
+    yields the list the failures are appended to
+    """
+    global _collected_failures
+    previous = _collected_failures
+    _collected_failures = []
+    try:
+        yield _collected_failures
+    finally:
+        _collected_failures = previous
+
+
+def check_before_write(doc_dict: dict, out_path: typing.Union[str, Path]) -> None:
+    """Called by writers with the doc dict about to be written, no-op unless failures are being collected"""
+    if _collected_failures is None:
+        return
+    errors = validate_doc_dict(doc_dict)
+    if errors:
+        _collected_failures.append((str(out_path), errors))
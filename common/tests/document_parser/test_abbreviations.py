@@ -0,0 +1,68 @@
+import time
+
+from common.document_parser.lib.abbreviations import add_abbreviations_n, find_abbreviations
+
+
+def test_find_abbreviations_in_tokenized_text():
+    text = (
+        "Federal  Voting  Assistance  Program  ( FVAP )  applies .  "
+        "In  accordance  with  DoD  Directive  ( Do DD )  5124.02  and  Executive  Order  ( E.O . )  12642 ."
+    )
+    assert find_abbreviations(text) == [
+        ("FVAP", "Federal Voting Assistance Program"),
+        ("DoDD", "DoD Directive"),
+        ("E.O.", "Executive Order"),
+    ]
+
+
+def test_find_abbreviations_scans_past_bad_first_words():
+    text = "the  Office  of  the  Secretary  of  Defense  ( OSD )  and  Acquisition  and  Sustainment  ( A&S ) ."
+    assert find_abbreviations(text) == [
+        ("OSD", "Office of the Secretary of Defense"),
+        ("A&S", "Acquisition and Sustainment"),
+    ]
+
+
+def test_find_abbreviations_with_nested_short_forms():
+    text = (
+        "the  Under  Secretary  of  Defense  for  Acquisition  and  Sustainment  ( USD ( A&S ) )  and  "
+        "as  noted  ( see  ( DHA ) ) ."
+    )
+    assert find_abbreviations(text) == [
+        ("USD(A&S)", "Under Secretary of Defense for Acquisition and Sustainment"),
+    ]
+
+
+def test_find_abbreviations_skips_non_abbreviations():
+    assert find_abbreviations("as listed in paragraph ( 1 ) ( see below ) .") == []
+
+
+def test_add_abbreviations_n_dedupes_across_paragraphs():
+    doc_dict = {
+        "filename": "test.pdf",
+        "paragraphs": [
+            {"par_raw_text_t": "the  Defense  Health  Agency  ( DHA ) ."},
+            {"par_raw_text_t": "no  definitions  here ."},
+            {"par_raw_text_t": "the  Defense  Health  Agency  ( DHA )  again ."},
+        ],
+    }
+    add_abbreviations_n(doc_dict)
+    assert doc_dict["abbreviations_n"] == [{"abbr_s": "DHA", "description_s": "Defense Health Agency"}]
+
+
+def test_find_abbreviations_scales_linearly_with_paragraph_length():
+    sentence = "the  Defense  Health  Agency  ( DHA )  and  some  other  words  here .  "
+
+    def timed(repeats):
+        text = sentence * repeats
+        best = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            found = find_abbreviations(text)
+            best = min(best, time.perf_counter() - start)
+        assert len(found) == repeats
+        return best
+
+    small, large = timed(2000), timed(16000)
+    # 8x the text: ~8x the time when linear, ~64x when every match rescans the prefix
+    assert large < 24 * small
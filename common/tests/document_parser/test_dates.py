@@ -0,0 +1,28 @@
+import datetime
+
+from common.document_parser.lib.dates import find_dates, add_dates_list
+
+
+def test_find_dates_all_formats():
+    text = "Signed 31 August, 2000; August 31, 1984; Sept. 4, 2012 and 4 DEC 2019."
+    assert [hit.date for hit in find_dates(text)] == [
+        datetime.datetime(2000, 8, 31),
+        datetime.datetime(1984, 8, 31),
+        datetime.datetime(2012, 9, 4),
+        datetime.datetime(2019, 12, 4),
+    ]
+    assert [text[hit.start:hit.end] for hit in find_dates(text)][0] == "31 August, 2000"
+
+
+def test_find_dates_skips_invalid_and_non_dates():
+    assert find_dates("31 September 1998, the summary 12, 2020 and May 2021") == []
+
+
+def test_add_dates_list_keeps_page_offsets():
+    doc_dict = {"pages": [
+        {"p_page": 0, "p_raw_text": "no dates here"},
+        {"p_page": 1, "p_raw_text": "effective May 5, 2020"},
+    ]}
+    add_dates_list(doc_dict, keep_offsets=True)
+    assert doc_dict["date_list"] == ["2020-05-05 00:00:00"]
+    assert doc_dict["date_hits"] == [{"page": 1, "start": 10, "end": 21, "date": "2020-05-05 00:00:00"}]
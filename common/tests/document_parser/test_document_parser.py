@@ -101,6 +101,33 @@ def test_single_process_html_text_dir(input_dir_with_html_text_non_ocr_raw_docs,
     assert None not in out_dicts
 
 
+def test_html_text_rendered_to_pdf_only_when_asked(input_dir_with_html_text_non_ocr_raw_docs,
+                                                   parsed_doc_output_dir):
+    parser_path = "common.document_parser.parsers.policy_analytics.parse::parse"
+    html_pdf = os.path.join(input_dir_with_html_text_non_ocr_raw_docs, "FAR Part 1.pdf")
+
+    pdf_to_json(
+        parser_path=parser_path,
+        source=input_dir_with_html_text_non_ocr_raw_docs,
+        metadata=input_dir_with_html_text_non_ocr_raw_docs,
+        destination=parsed_doc_output_dir,
+    )
+    with open(f"{parsed_doc_output_dir}/{EXPECTED_OUTPUT_FILES['non_ocr_html_json_file']}") as f:
+        assert json.load(f)["filename"] == "FAR Part 1.html"
+    assert not os.path.exists(html_pdf)
+
+    pdf_to_json(
+        parser_path=parser_path,
+        source=input_dir_with_html_text_non_ocr_raw_docs,
+        metadata=input_dir_with_html_text_non_ocr_raw_docs,
+        destination=parsed_doc_output_dir,
+        render_pdf=True,
+    )
+    with open(f"{parsed_doc_output_dir}/{EXPECTED_OUTPUT_FILES['non_ocr_html_json_file']}") as f:
+        assert json.load(f)["filename"] == "FAR Part 1.pdf"
+    assert os.path.exists(html_pdf)
+
+
 def test_single_process_ocr_doc(input_dir_with_one_ocr_raw_doc,
                                 parsed_doc_output_dir):
     parser_path = "common.document_parser.parsers.policy_analytics.parse::parse"
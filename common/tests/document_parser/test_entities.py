@@ -0,0 +1,41 @@
+from gamechangerml.src.utilities.text_utils import simple_clean
+
+from common.document_parser.lib.entities import (
+    ENTITIES_LOOKUP_DICT,
+    PARAGRAPH_SEPARATOR,
+    clean_paragraphs_text,
+    extract_entities,
+)
+from common.document_parser.lib.entities_utils import replace_nonalpha_chars
+
+PARAGRAPHS = [
+    "The DoD, i.e. the Department   of Defense, (DoD) and the U.S. Army.",
+    "Department of",
+    "Defense DoD",
+    "",
+    "D\x00oD\tand\n\nthe   DOD",
+]
+
+
+def test_clean_paragraphs_text_matches_cleaning_each_paragraph():
+    text, starts = clean_paragraphs_text(PARAGRAPHS)
+    expected = [replace_nonalpha_chars(simple_clean(par), "") for par in PARAGRAPHS]
+    assert text.split(PARAGRAPH_SEPARATOR) == expected
+    assert starts == [sum(len(par) + 1 for par in expected[:i]) for i in range(len(expected))]
+
+
+def test_clean_paragraphs_text_without_paragraphs():
+    assert clean_paragraphs_text([]) == ("", [0])
+
+
+def test_extract_entities_per_paragraph_matches_extracting_alone():
+    doc_dict = {"paragraphs": [{"par_raw_text_t": par} for par in PARAGRAPHS] + [{}]}
+    extract_entities(doc_dict)
+
+    for par, par_dict in zip(PARAGRAPHS, doc_dict["paragraphs"]):
+        alone = extract_entities({"paragraphs": [{"par_raw_text_t": par}]})
+        assert par_dict["entities"] == alone["paragraphs"][0]["entities"]
+
+    assert ENTITIES_LOOKUP_DICT["DoD"]["raw_ent"] in doc_dict["paragraphs"][0]["entities"]["ORG_s"]
+    assert all(not ents for ents in doc_dict["paragraphs"][-1]["entities"].values())
+    assert doc_dict["top_entities_t"][0] == ENTITIES_LOOKUP_DICT["DoD"]["raw_ent"]
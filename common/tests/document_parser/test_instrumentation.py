@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from common.document_parser import instrumentation
+
+
+def test_stage_is_noop_unless_instrumenting():
+    with instrumentation.stage("pages.handle_pages"):
+        pass
+    assert instrumentation._current_stages is None
+
+
+def test_instrument_document_records_stages():
+    with instrumentation.instrument_document("DoDI 1000.01.pdf") as record:
+        with instrumentation.stage("pages.handle_pages"):
+            sum(range(10000))
+        with pytest.raises(ValueError):
+            with instrumentation.stage("dates.process"):
+                raise ValueError("bad date")
+
+    assert record["filename"] == "DoDI 1000.01.pdf"
+    assert [(s["stage"], s["failed"]) for s in record["stages"]] == [
+        ("pages.handle_pages", False), ("dates.process", True)]
+    assert record["wall_s"] >= sum(s["wall_s"] for s in record["stages"])
+    assert record["peak_rss_mb"] > 0
+    assert instrumentation._current_stages is None
+
+
+def make_record(filename, seconds):
+    stages = [
+        {"stage": name, "wall_s": s, "cpu_s": s, "peak_rss_mb": 100.0, "rss_growth_mb": 0.0, "failed": False}
+        for name, s in seconds.items()
+    ]
+    return {"filename": filename, "stages": stages, "wall_s": sum(seconds.values()),
+            "cpu_s": sum(seconds.values()), "peak_rss_mb": 100.0, "rss_growth_mb": 0.0}
+
+
+def test_summarize_run_and_prometheus(tmp_path):
+    records = [make_record(f"doc {i}.pdf", {"pages.handle_pages": 0.1, "entities.extract_entities": i})
+               for i in range(1, 21)]
+    summary = instrumentation.write_run_metrics(
+        records, tmp_path / "metrics.json", tmp_path / "parser.prom")
+
+    entities = summary["stages"]["entities.extract_entities"]
+    assert entities["count"] == 20
+    assert (entities["wall_s"]["p50"], entities["wall_s"]["p95"], entities["wall_s"]["max"]) == (10, 19, 20)
+    assert list(summary["stages"]) == ["pages.handle_pages", "entities.extract_entities"]
+    assert summary["slowest_docs"][0]["filename"] == "doc 20.pdf"
+    assert summary["slowest_docs"][0]["slowest_stage"] == "entities.extract_entities"
+    assert json.loads((tmp_path / "metrics.json").read_text()) == summary
+
+    prom = (tmp_path / "parser.prom").read_text().splitlines()
+    assert 'gc_parser_stage_wall_seconds{stage="entities.extract_entities",quantile="0.95"} 19' in prom
+    assert 'gc_parser_stage_wall_seconds_count{stage="entities.extract_entities"} 20' in prom
@@ -0,0 +1,23 @@
+from common.document_parser.lib.keywords import add_keyw_5, extract_page_keywords
+
+
+def test_extract_page_keywords_per_page():
+    page_keywords = extract_page_keywords([
+        "The voting assistance officer shall report. Voting assistance is required.",
+        "",
+        "Installation commanders provide support.",
+    ])
+    assert len(page_keywords) == 3
+    assert page_keywords[0][0] == "voting assistance"
+    assert page_keywords[1] == []
+    assert len(page_keywords[2]) == 2
+
+
+def test_add_keyw_5_counts_pages():
+    doc_dict = {"pages": [
+        {"p_raw_text": "Voting assistance officers. Voting assistance."},
+        {"p_raw_text": "Provide voting assistance to members."},
+    ]}
+    add_keyw_5(doc_dict)
+    assert doc_dict["keyw_5"][0] == "voting assistance"
+    assert len(doc_dict["keyw_5"]) <= 10
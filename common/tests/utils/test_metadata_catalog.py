@@ -0,0 +1,84 @@
+import json
+import os
+import shutil
+
+from common.utils.metadata_catalog import MetadataCatalog, RAW, METADATA, PARSED, THUMBNAIL, _get_catalog
+
+
+def write_doc(directory, name, crawler="us_code"):
+    (directory / name).write_bytes(b"%PDF-1.4\n")
+    (directory / (name + ".metadata")).write_text(json.dumps(
+        {"doc_name": name.rsplit(".", 1)[0].upper(), "crawler_used": crawler, "version_hash": "abc"}))
+
+
+def test_refresh_and_lookups(tmp_path):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    write_doc(raw, "Title 1.pdf")
+    write_doc(raw, "Title 2.pdf", crawler="dha_pubs")
+    (raw / "no_extension").write_bytes(b"%PDF-1.4\n" + b"\0" * 300)
+    (raw / "Title 1.json.gz").write_bytes(b"")
+    (raw / "Title 1.png").write_bytes(b"")
+
+    catalog = MetadataCatalog()
+    assert catalog.refresh(raw) == (7, 7, 0)
+
+    assert [e.name for e in catalog.files(raw, kind=RAW)] == ["Title 1.pdf", "Title 2.pdf", "no_extension"]
+    entry = catalog.find_metadata(raw, "Title 2.pdf")
+    assert (entry.doc_name, entry.crawler_used, entry.version_hash) == ("TITLE 2", "dha_pubs", "abc")
+    assert entry.get_metadata()["crawler_used"] == "dha_pubs"
+    assert [e.base_name for e in catalog.metadata_by_crawler(raw, "us_code")] == ["Title 1.pdf"]
+    assert catalog.find_sibling(raw, "Title 1", PARSED).name == "Title 1.json.gz"
+    assert catalog.find_sibling(raw, "Title 1", THUMBNAIL).name == "Title 1.png"
+    assert catalog.find_sibling(raw, "Title 2", PARSED) is None
+
+
+def test_refresh_is_incremental(tmp_path):
+    write_doc(tmp_path, "Title 1.pdf")
+    write_doc(tmp_path, "Title 2.pdf")
+    catalog = MetadataCatalog(tmp_path / "catalog" / "catalog.sqlite")
+    catalog.refresh(tmp_path)
+    assert catalog.refresh(tmp_path) == (4, 0, 0)
+
+    meta = tmp_path / "Title 1.pdf.metadata"
+    meta.write_text(json.dumps({"doc_name": "Renamed", "crawler_used": "us_code"}))
+    os.utime(meta, ns=(0, 10 ** 18))
+    os.remove(tmp_path / "Title 2.pdf")
+    assert catalog.refresh(tmp_path) == (3, 1, 1)
+    assert catalog.find_metadata(tmp_path, "Title 1.pdf").doc_name == "Renamed"
+    assert [e.name for e in catalog.files(tmp_path, kind=METADATA)] == ["Title 1.pdf.metadata", "Title 2.pdf.metadata"]
+
+
+def test_recursive(tmp_path):
+    sub_dir = tmp_path / "2021-01-01T110000"
+    sub_dir.mkdir()
+    write_doc(sub_dir, "Title 1.pdf")
+    write_doc(tmp_path, "Title 2.pdf")
+    catalog = MetadataCatalog()
+    catalog.refresh(tmp_path, recursive=True)
+    assert len(catalog.files(tmp_path, kind=RAW, recursive=True)) == 2
+    assert len(catalog.files(tmp_path, kind=RAW)) == 1
+
+
+def test_rows_of_removed_dirs_are_pruned(tmp_path):
+    jobs = [tmp_path / "job1", tmp_path / "job2"]
+    db_path = tmp_path / "catalog.sqlite"
+    catalog = MetadataCatalog(db_path)
+    for job in jobs:
+        (job / "sub").mkdir(parents=True)
+        write_doc(job / "sub", "Title 1.pdf")
+        catalog.refresh(job, recursive=True)
+
+    shutil.rmtree(jobs[0])
+    assert catalog.prune_missing_dirs() == 2
+    assert catalog.prune_missing_dirs() == 0
+    assert catalog.files(jobs[0], recursive=True) == []
+    assert len(catalog.files(jobs[1], recursive=True)) == 2
+    catalog.close()
+
+    shutil.rmtree(jobs[1])
+    # opening the shared catalog prunes
+    reopened = _get_catalog(str(db_path))
+    assert reopened.files(jobs[1], recursive=True) == []
+    reopened.close()
+    _get_catalog.cache_clear()
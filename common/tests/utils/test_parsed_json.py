@@ -0,0 +1,38 @@
+from common.utils import parsed_json
+
+
+DOC = {"filename": "DoDI 1000.01.pdf", "text": "café \ud83d", "page_count": 2}
+
+
+def test_round_trip_plain_and_gzip(tmp_path):
+    plain = parsed_json.dump_parsed_json(DOC, tmp_path, "DoDI 1000.01")
+    assert plain.name == "DoDI 1000.01.json"
+    assert parsed_json.load_parsed_json(plain) == DOC
+
+    gzipped = parsed_json.dump_parsed_json(DOC, tmp_path, "DoDI 1000.01", compression="gzip")
+    assert gzipped.name == "DoDI 1000.01.json.gz"
+    assert parsed_json.load_parsed_json(gzipped) == DOC
+    # only one form of a doc is kept, and no temp files are left behind
+    assert [p.name for p in tmp_path.iterdir()] == ["DoDI 1000.01.json.gz"]
+
+
+def test_find_and_stem(tmp_path):
+    parsed_json.dump_parsed_json(DOC, tmp_path, "a.b", compression="gzip")
+    (tmp_path / "notes.txt").write_text("x")
+
+    found = parsed_json.find_parsed_json(tmp_path, "a.b")
+    assert found == tmp_path / "a.b.json.gz"
+    assert parsed_json.get_parsed_json_stem(found) == "a.b"
+    assert list(parsed_json.iter_parsed_json_files(tmp_path)) == [found]
+    assert parsed_json.find_parsed_json(tmp_path, "missing") is None
+
+
+def test_write_atomic_follows_umask_then_keeps_existing_mode(tmp_path):
+    path = tmp_path / "run_metrics.prom"
+    parsed_json.write_atomic(path, b"a")
+    assert path.stat().st_mode & 0o777 == 0o666 & ~parsed_json._UMASK
+
+    path.chmod(0o640)
+    parsed_json.write_atomic(path, b"b")
+    assert path.stat().st_mode & 0o777 == 0o640
+    assert path.read_bytes() == b"b"
@@ -0,0 +1,264 @@
+"""Local SQLite catalog of raw document directories
+
+Rows are keyed by file path and refreshed only for files whose mtime or size changed, so
+sniffing file types and reading .metadata files happens once per file version instead of
+once per run. Raw docs, their .metadata, parsed jsons and thumbnails are all cataloged and
+matched up by indexed lookups. Pipelines work in fresh per-job directories, so rows of
+directories that are gone are pruned whenever a process opens the shared catalog.
+"""
+import json
+import os
+import sqlite3
+import typing as t
+from functools import lru_cache
+from pathlib import Path
+
+import filetype
+
+from common.utils.parsed_json import PARSED_JSON_SUFFIXES, get_parsed_json_stem, is_parsed_json
+
+# env var with the catalog's sqlite file, ":memory:" for a per-process catalog
+CATALOG_PATH_ENV_VAR = 'METADATA_CATALOG_PATH'
+DEFAULT_CATALOG_PATH = Path.home() / '.cache' / 'gamechanger' / 'metadata_catalog.sqlite'
+
+RAW_SUFFIXES = frozenset({'.pdf', '.html', '.txt'})
+METADATA_SUFFIX = '.metadata'
+THUMBNAIL_SUFFIX = '.png'
+PDF_MIME_TYPES = frozenset({'pdf', 'application/pdf'})
+
+RAW = 'raw'
+METADATA = 'metadata'
+PARSED = 'parsed'
+THUMBNAIL = 'thumbnail'
+OTHER = 'other'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    dir TEXT NOT NULL,
+    name TEXT NOT NULL,
+    -- raw file name the entry belongs to: its own name for raw docs, the name without .metadata for metadata
+    base_name TEXT,
+    stem TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mime TEXT,
+    doc_name TEXT,
+    crawler_used TEXT,
+    version_hash TEXT,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS files_dir_stem_kind ON files (dir, stem, kind);
+CREATE INDEX IF NOT EXISTS files_dir_base_name_kind ON files (dir, base_name, kind);
+CREATE INDEX IF NOT EXISTS files_crawler_used ON files (crawler_used);
+CREATE INDEX IF NOT EXISTS files_doc_name ON files (doc_name);
+"""
+
+COLUMNS = ('path', 'dir', 'name', 'base_name', 'stem', 'kind', 'mtime_ns', 'size',
+           'mime', 'doc_name', 'crawler_used', 'version_hash', 'metadata')
+
+
+class CatalogEntry(t.NamedTuple):
+    path: str
+    dir: str
+    name: str
+    base_name: t.Optional[str]
+    stem: str
+    kind: str
+    mtime_ns: int
+    size: int
+    mime: t.Optional[str]
+    doc_name: t.Optional[str]
+    crawler_used: t.Optional[str]
+    version_hash: t.Optional[str]
+    metadata: t.Optional[str]
+
+    def get_metadata(self) -> t.Optional[dict]:
+        """The .metadata file's contents, None for other kinds of files or unreadable metadata"""
+        return json.loads(self.metadata) if self.metadata is not None else None
+
+
+class RefreshStats(t.NamedTuple):
+    scanned: int
+    updated: int
+    removed: int
+
+
+def _escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _sniff_mime(path: str) -> t.Optional[str]:
+    try:
+        kind = filetype.guess(path)
+    except OSError:
+        return None
+    return kind.mime if kind is not None else None
+
+
+def describe_file(path: str, mtime_ns: int, size: int) -> tuple:
+    """Catalog row for a file: its kind, and for .metadata files the fields tools look up"""
+    p = Path(path)
+    name = p.name
+    base_name, mime, doc_name, crawler_used, version_hash, metadata = None, None, None, None, None, None
+
+    if name.endswith(METADATA_SUFFIX):
+        kind = METADATA
+        base_name = name[:-len(METADATA_SUFFIX)]
+        stem = Path(base_name).stem
+        try:
+            with open(path, 'r') as f:
+                metadata = f.read()
+            data = json.loads(metadata)
+        except (OSError, UnicodeDecodeError, json.JSONDecodeError):
+            metadata, data = None, None
+        if isinstance(data, dict):
+            doc_name, crawler_used, version_hash = data.get('doc_name'), data.get('crawler_used'), data.get('version_hash')
+    elif is_parsed_json(name):
+        kind, stem = PARSED, get_parsed_json_stem(name)
+    elif p.suffix.lower() == THUMBNAIL_SUFFIX:
+        kind, stem = THUMBNAIL, p.stem
+    elif p.suffix.lower() in RAW_SUFFIXES:
+        kind, stem, base_name = RAW, p.stem, name
+    else:
+        # e.g. pdfs saved without an extension, only their content tells
+        mime = _sniff_mime(path)
+        kind = RAW if mime in PDF_MIME_TYPES else OTHER
+        stem = p.stem
+        base_name = name if kind == RAW else None
+
+    return (path, str(p.parent), name, base_name, stem, kind, mtime_ns, size,
+            mime, doc_name, crawler_used, version_hash, metadata)
+
+
+class MetadataCatalog:
+    """SQLite index of files in raw/metadata/parsed/thumbnail directories, keyed by absolute path"""
+
+    def __init__(self, db_path: t.Union[str, Path] = ':memory:'):
+        self.db_path = str(db_path)
+        if self.db_path != ':memory:':
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.db_path, timeout=30)
+        if self.db_path != ':memory:':
+            # concurrent readers while another tool refreshes
+            self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def _under(self, directory: Path, recursive: bool) -> t.Tuple[str, list]:
+        if not recursive:
+            return 'dir = ?', [str(directory)]
+        return "(dir = ? OR dir LIKE ? ESCAPE '\\')", [str(directory), _escape_like(str(directory) + os.sep) + '%']
+
+    def refresh(self, directory: t.Union[str, Path], recursive: bool = False) -> RefreshStats:
+        """
+        Bring the catalog up to date with directory: new or changed (mtime/size) files are
+        (re)described, rows of files that are gone are dropped, the rest are left alone
+        :param directory: directory to scan
+        :param recursive: include subdirectories
+        :return: counts of files scanned, updated and removed
+        """
+        directory = Path(directory).resolve()
+        where, params = self._under(directory, recursive)
+        known = {
+            path: (mtime_ns, size)
+            for path, mtime_ns, size in self.connection.execute(
+                f'SELECT path, mtime_ns, size FROM files WHERE {where}', params)
+        }
+
+        updates = []
+        seen = set()
+        pending = [str(directory)]
+        while pending:
+            with os.scandir(pending.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            pending.append(entry.path)
+                        continue
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                    seen.add(entry.path)
+                    if known.get(entry.path) != (st.st_mtime_ns, st.st_size):
+                        updates.append(describe_file(entry.path, st.st_mtime_ns, st.st_size))
+
+        removed = [(path,) for path in known.keys() - seen]
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO files ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                updates)
+            self.connection.executemany('DELETE FROM files WHERE path = ?', removed)
+
+        return RefreshStats(scanned=len(seen), updated=len(updates), removed=len(removed))
+
+    def prune_missing_dirs(self) -> int:
+        """Drop rows of directories that no longer exist, e.g. earlier jobs' working dirs
+        :return: number of rows removed
+        """
+        missing = [
+            (directory,) for (directory,) in self.connection.execute('SELECT DISTINCT dir FROM files')
+            if not os.path.isdir(directory)
+        ]
+        if not missing:
+            return 0
+        with self.connection:
+            return self.connection.executemany('DELETE FROM files WHERE dir = ?', missing).rowcount
+
+    def _select(self, where: str, params: t.Sequence[t.Any]) -> t.List[CatalogEntry]:
+        return [
+            CatalogEntry(*row) for row in self.connection.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM files WHERE {where} ORDER BY path", params)
+        ]
+
+    def files(self, directory: t.Union[str, Path], kind: t.Optional[str] = None,
+              recursive: bool = False) -> t.List[CatalogEntry]:
+        """Cataloged files in directory (as of its last refresh), optionally only those of one kind"""
+        where, params = self._under(Path(directory).resolve(), recursive)
+        if kind is not None:
+            where, params = f'{where} AND kind = ?', params + [kind]
+        return self._select(where, params)
+
+    def find_metadata(self, directory: t.Union[str, Path], raw_name: str) -> t.Optional[CatalogEntry]:
+        """.metadata entry for the raw file named raw_name, looked for in directory"""
+        entries = self._select('dir = ? AND base_name = ? AND kind = ?',
+                               [str(Path(directory).resolve()), raw_name, METADATA])
+        return entries[0] if entries else None
+
+    def find_sibling(self, directory: t.Union[str, Path], stem: str, kind: str) -> t.Optional[CatalogEntry]:
+        """File of the given kind (e.g. PARSED, THUMBNAIL) named after stem in directory"""
+        entries = self._select('dir = ? AND stem = ? AND kind = ?', [str(Path(directory).resolve()), stem, kind])
+        if kind == PARSED and len(entries) > 1:
+            # same preference as parsed_json.find_parsed_json
+            entries.sort(key=lambda e: next(i for i, s in enumerate(PARSED_JSON_SUFFIXES) if e.name.endswith(s)))
+        return entries[0] if entries else None
+
+    def metadata_by_crawler(self, directory: t.Union[str, Path], crawler_used: str,
+                            recursive: bool = False) -> t.List[CatalogEntry]:
+        where, params = self._under(Path(directory).resolve(), recursive)
+        return self._select(f'{where} AND kind = ? AND crawler_used = ?', params + [METADATA, crawler_used])
+
+
+@lru_cache(maxsize=None)
+def _get_catalog(db_path: str) -> MetadataCatalog:
+    catalog = MetadataCatalog(db_path)
+    catalog.prune_missing_dirs()
+    return catalog
+
+
+def get_catalog(db_path: t.Optional[t.Union[str, Path]] = None) -> MetadataCatalog:
+    """
+    Catalog shared by everything in this process, stored at db_path, else $METADATA_CATALOG_PATH,
+    else ~/.cache/gamechanger/metadata_catalog.sqlite. Rows of directories that no longer exist
+    are pruned when it is first opened. Falls back to an in memory catalog when that location
+    isn't writable. Don't use it from forked children, open their own instead.
+    """
+    db_path = str(db_path or os.environ.get(CATALOG_PATH_ENV_VAR) or DEFAULT_CATALOG_PATH)
+    try:
+        return _get_catalog(db_path)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Metadata catalog at {db_path} unavailable ({e}), using an in memory catalog")
+        return _get_catalog(':memory:')
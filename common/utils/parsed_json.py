@@ -0,0 +1,182 @@
+"""Reading and writing parsed document jsons, plain or compressed"""
+import gzip
+import io
+import json
+import os
+import tempfile
+import typing as t
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+GZIP_SUFFIX = '.json.gz'
+ZSTD_SUFFIX = '.json.zst'
+PLAIN_SUFFIX = '.json'
+PARSED_JSON_SUFFIXES = (GZIP_SUFFIX, ZSTD_SUFFIX, PLAIN_SUFFIX)
+
+COMPRESSION_SUFFIXES = {
+    None: PLAIN_SUFFIX,
+    'gzip': GZIP_SUFFIX,
+    'zstd': ZSTD_SUFFIX,
+}
+
+# env var picking the compression parsers write with: gzip, zstd or unset/none for plain json
+COMPRESSION_ENV_VAR = 'PARSED_JSON_COMPRESSION'
+
+
+def get_compression_from_env() -> t.Optional[str]:
+    compression = os.environ.get(COMPRESSION_ENV_VAR, '').strip().lower() or None
+    if compression == 'none':
+        return None
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Invalid {COMPRESSION_ENV_VAR} value: {compression}, expected one of gzip, zstd, none")
+    return compression
+
+
+def get_parsed_json_suffix(path: t.Union[Path, str]) -> t.Optional[str]:
+    """Parsed json suffix of the file (compound for compressed files), None if it isn't one"""
+    name = Path(path).name
+    for suffix in PARSED_JSON_SUFFIXES:
+        if name.endswith(suffix):
+            return suffix
+    return None
+
+
+def is_parsed_json(path: t.Union[Path, str]) -> bool:
+    return get_parsed_json_suffix(path) is not None
+
+
+def get_parsed_json_stem(path: t.Union[Path, str]) -> str:
+    """File name without its (possibly compound) parsed json suffix"""
+    name = Path(path).name
+    suffix = get_parsed_json_suffix(name)
+    return name[:-len(suffix)] if suffix else Path(name).stem
+
+
+def iter_parsed_json_files(directory: t.Union[Path, str]) -> t.Iterable[Path]:
+    """Plain and compressed parsed jsons in directory (not recursive)"""
+    for p in Path(directory).iterdir():
+        if p.is_file() and is_parsed_json(p):
+            yield p
+
+
+def find_parsed_json(directory: t.Union[Path, str], stem: str) -> t.Optional[Path]:
+    """Parsed json named stem in any of the supported forms, None if there is none"""
+    for suffix in PARSED_JSON_SUFFIXES:
+        path = Path(directory, stem + suffix)
+        if path.is_file():
+            return path
+    return None
+
+
+def dumps(obj: t.Any) -> bytes:
+    """Serialize to utf-8 json bytes, with orjson when it is installed"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            # e.g. lone surrogates from bad pdf text, which only the escaping stdlib encoder can represent
+            pass
+    return json.dumps(obj, separators=(',', ':')).encode('ascii')
+
+
+def loads(data: t.Union[bytes, str]) -> t.Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson rejects escaped lone surrogates that the stdlib writer/reader round trips
+            pass
+    return json.loads(data)
+
+
+def _compress(data: bytes, compression: t.Optional[str]) -> bytes:
+    if compression is None:
+        return data
+    if compression == 'gzip':
+        return gzip.compress(data, compresslevel=6)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("zstd compression requested but the zstandard package is not installed")
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def _decompress(data: bytes, suffix: t.Optional[str]) -> bytes:
+    if suffix == GZIP_SUFFIX:
+        return gzip.decompress(data)
+    if suffix == ZSTD_SUFFIX:
+        if zstandard is None:
+            raise RuntimeError("Reading .json.zst files requires the zstandard package")
+        # stream it, frames written without a content size can't be decompressed in one call
+        with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)) as reader:
+            return reader.read()
+    return data
+
+
+def load_parsed_json(path: t.Union[Path, str]) -> t.Any:
+    """Load a parsed json, decompressing according to its suffix"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return loads(_decompress(data, get_parsed_json_suffix(path)))
+
+
+def _get_umask() -> int:
+    # only readable by setting it, done once at import rather than racing other threads' file creation
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+_UMASK = _get_umask()
+
+
+def write_atomic(path: t.Union[Path, str], data: bytes) -> None:
+    """Write to a temp file in the same directory and rename it over path,
+    so readers never see a partially written file. The file gets path's current
+    mode if it exists, else the usual umask based one (mkstemp's are owner only)"""
+    path = Path(path)
+    try:
+        mode = path.stat().st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            os.fchmod(f.fileno(), mode)
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def dump_parsed_json(obj: t.Any, directory: t.Union[Path, str], stem: str,
+                     compression: t.Optional[str] = None) -> Path:
+    """Atomically write obj as directory/stem.json (or .json.gz/.json.zst when compressed).
+    Other forms of the same doc are removed so readers only ever find one.
+    :returns: path written
+    """
+    suffix = COMPRESSION_SUFFIXES[compression]
+    path = Path(directory, stem + suffix)
+    write_atomic(path, _compress(dumps(obj), compression))
+
+    for other_suffix in PARSED_JSON_SUFFIXES:
+        if other_suffix != suffix:
+            try:
+                os.remove(Path(directory, stem + other_suffix))
+            except FileNotFoundError:
+                pass
+    return path
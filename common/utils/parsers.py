@@ -1,6 +1,5 @@
 import typing as t
 import datetime
-import pandas
 
 
 def parse_timestamp(ts: t.Union[str, datetime.datetime], raise_parse_error: bool = False) -> t.Optional[datetime.datetime]:
@@ -12,6 +11,8 @@ def parse_timestamp(ts: t.Union[str, datetime.datetime], raise_parse_error: bool
         if isinstance(ts, datetime.datetime):
             return ts
 
+        # deferred, pandas is slow to import and most callers never get here
+        import pandas
         try:
             ts = pandas.to_datetime(ts).to_pydatetime()
             if str(ts) == 'NaT':
@@ -1,5 +1,4 @@
 from botocore.exceptions import ClientError
-from configuration.helpers import ConnectionHelper
 from typing import Optional, Union, List, Iterable, Tuple, Dict, Any
 from pathlib import Path
 import datetime
@@ -13,6 +12,10 @@ from .text_utils import size_fmt
 import datetime as dt
 import typing as t
 
+if t.TYPE_CHECKING:
+    # pulls in every db/search client, only needed for annotations
+    from configuration.helpers import ConnectionHelper
+
 
 class TimestampedPrefix:
     """S3 prefix constructed with a particular timestamp"""
@@ -53,7 +56,7 @@ class S3Utils:
         flags=re.VERBOSE,
     )
 
-    def __init__(self, ch: ConnectionHelper, bucket: Optional[str] = None):
+    def __init__(self, ch: 'ConnectionHelper', bucket: Optional[str] = None):
         self.ch = ch
         self.bucket = bucket or self.ch.conf['aws']['bucket_name']
 
@@ -339,6 +342,43 @@ class S3Utils:
         if self.object_exists(object_path=object_path, bucket=bucket_name):
             s3_resource.Object(bucket_name, object_path).delete()
 
+    def delete_objects(self,
+                       object_paths: Iterable[str],
+                       bucket: Optional[str] = None,
+                       batch_size: int = 1000) -> Tuple[List[str], List[Dict[str, str]]]:
+        """Delete s3 objects in DeleteObjects batches (max 1000 keys per request)
+        :param object_paths: Full object keys
+        :param bucket: Bucket name
+        :param batch_size: Keys per DeleteObjects request
+        :return: (deleted object paths, errors as returned by s3 with 'Key', 'Code' and 'Message')
+        """
+        if not 1 <= batch_size <= 1000:
+            raise ValueError(f"Invalid batch_size given: ${batch_size}")
+
+        bucket_name = bucket or self.bucket
+        s3_client = self.ch.s3_client
+        deleted_object_paths: List[str] = []
+        errors: List[Dict[str, str]] = []
+
+        def _delete_batch(keys: List[str]) -> None:
+            response = s3_client.delete_objects(
+                Bucket=bucket_name,
+                Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': False}
+            )
+            deleted_object_paths.extend(d['Key'] for d in response.get('Deleted', []))
+            errors.extend(response.get('Errors', []))
+
+        batch: List[str] = []
+        for object_path in object_paths:
+            batch.append(object_path)
+            if len(batch) == batch_size:
+                _delete_batch(batch)
+                batch = []
+        if batch:
+            _delete_batch(batch)
+
+        return deleted_object_paths, errors
+
     def delete_prefix(self, prefix: str, bucket: Optional[str] = None, max_threads: int = 1) -> List[str]:
         """Delete all S3 objects with given prefix
         :param prefix: S3 obj prefix
@@ -1,16 +1,16 @@
 from time import perf_counter
+import typing as t
 import click
-import csv
-from elasticsearch import helpers
 from .conf import Conf
 from collections import OrderedDict
 import pandas as pd
-import numpy as np
-import tempfile
 import re
 import datetime
+from dataPipelines.gc_elasticsearch_publisher.csv_loader import DEFAULT_CHUNK_ROWS, load_csv_files
 
 coauth_re = re.compile('CoAuthor(?P<kind>.*\D)(?P<num>\d+)')
+# whitespace only cells and anything mentioning "empty" are blanked before indexing
+placeholder_re = r'^\s*$|empty'
 
 
 @click.group()
@@ -32,59 +32,70 @@ def cli():
         allow_dash=False
     ),
 )
-def run(filepath: str):
+@click.option(
+    '--chunk-rows',
+    help="csv rows read and transformed at once",
+    default=DEFAULT_CHUNK_ROWS,
+    type=int,
+)
+def run(filepath: str, chunk_rows: int):
     print("Starting Gamechanger CDO Pipeline")
     start = perf_counter()
     # Download PDF and metadata files
 
-    csv_ingest(filepath)
+    csv_ingest(filepath, chunk_rows)
 
     end = perf_counter()
     print(f'Total time -- It took {end - start} seconds!')
     print("DONE!!!!!!")
 
 
-def format_gen(reader: csv.DictReader):
-    for row in reader:
-        item = OrderedDict({})
-        coauthors = [{} for _ in range(20)]
-        for key, val in row.items():
-
-            matches = coauth_re.search(key)
-            if matches:
-                num, kind = matches.group('num'), matches.group('kind')
-                coauthors[int(num)-1][kind] = val
-
-            else:
-                item[key] = val
-
-        item['CoAuthors'] = list(filter(lambda x: x['ID'], coauthors))
+def clean_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop the two leading (index) columns and blank out placeholder values"""
+    df = df[df.columns[2:]]
+    placeholders = df.apply(lambda column: column.str.contains(placeholder_re, regex=True, na=True))
+    return df.mask(placeholders, '')
+
+
+def coauthor_columns(columns: t.Sequence[str]) -> t.Tuple[t.List[str], t.List[t.Tuple[str, int, str]]]:
+    """Plain columns, and (column, coauthor number, field) for the CoAuthor<field><number> columns"""
+    plain, coauthors = [], []
+    for column in columns:
+        matches = coauth_re.search(column)
+        if matches:
+            coauthors.append((column, int(matches.group('num')), matches.group('kind')))
+        else:
+            plain.append(column)
+    return plain, coauthors
+
+
+def format_chunk(df: pd.DataFrame) -> t.Iterator[OrderedDict]:
+    """Docs of a cleaned chunk, with the CoAuthor columns folded into a CoAuthors list"""
+    plain, coauthors = coauthor_columns(list(df.columns))
+    count = max((num for _, num, _ in coauthors), default=0)
+    plain_df, coauthor_df = df[plain], df[[column for column, _, _ in coauthors]]
+    for item_row, coauthor_row in zip(plain_df.itertuples(index=False, name=None),
+                                      coauthor_df.itertuples(index=False, name=None)):
+        item = OrderedDict(zip(plain, item_row))
+        authors = [{} for _ in range(count)]
+        for (_, num, kind), val in zip(coauthors, coauthor_row):
+            authors[num - 1][kind] = val
+        item['CoAuthors'] = [author for author in authors if author.get('ID')]
         yield item
 
 
-def csv_ingest(filepath: str):
+def csv_ingest(filepath: str, chunk_rows: int = DEFAULT_CHUNK_ROWS):
     es = Conf.ch.es_client
-    df = pd.read_csv(filepath, encoding="ISO-8859-1")
-    df = df[df.columns[2:]]
-    # NaN space only values
-    df.replace(r'^\s*$', np.nan, regex=True, inplace=True)
-    # NaN "empty" string values
-    df.replace("empty", np.nan, regex=True, inplace=True)
-
-    with tempfile.TemporaryFile(mode="r+") as f:
-        df.to_csv(f, index=False)
-        f.seek(0)
-
-        reader = csv.DictReader(f)
-        formatted = format_gen(reader)
-
-        ts = datetime.datetime.now().strftime('%Y%m%d')
-        index = f'gc-cdo_{ts}'
-        helpers.bulk(es, formatted, index=index)
-        body = {
-            "actions": [
-                {"remove": {"index": 'gc-cdo_*', "alias": 'gc-cdo'}},
-                {"add": {"index": index, "alias": 'gc-cdo'}}
-            ]
-        }
-        es.indices.update_aliases(body)
+    ts = datetime.datetime.now().strftime('%Y%m%d')
+    index = f'gc-cdo_{ts}'
+    totals = load_csv_files(
+        es,
+        [filepath],
+        index=index,
+        alias='gc-cdo',
+        transform=clean_chunk,
+        build_docs=format_chunk,
+        chunk_rows=chunk_rows,
+        read_csv_kwargs={'encoding': "ISO-8859-1"},
+    )
+    print(f"Indexed {totals['indexed']} docs into {index}")
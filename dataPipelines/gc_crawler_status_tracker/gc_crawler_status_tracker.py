@@ -8,7 +8,7 @@ from typing import Union
 from sqlalchemy import case, cast, func, JSON
 
 from dataPipelines.gc_db_utils.orch.models import CrawlerStatusEntry, Publication, VersionedDoc
-from dataPipelines.gc_neo4j_publisher.neo4j_publisher import process_query
+from dataPipelines.gc_neo4j_publisher.utils import Neo4jJobManager
 
 from .config import Config
 
@@ -209,14 +209,13 @@ class CrawlerStatusTracker:
         
     def _update_revocations_neo4j(self, docs):
         print(f'Updating Neo4j revocation statuses')
-        for doc in docs:
-            process_query(
-                'MATCH (a:Document { name: $name, crawler_used_s: $crawler_used })'
-                'SET a.is_revoked_b = $is_revoked',
-                name=doc.name,
-                crawler_used=doc.json_metadata['crawler_used'],
-                is_revoked=doc.is_revoked,
-            )
+        summary = Neo4jJobManager.update_revocations_batch(
+            (doc.name, doc.json_metadata['crawler_used'], doc.is_revoked) for doc in docs
+        )
+        print(f"Neo4j revocation statuses: {summary['updated']} of {summary['requested']} documents updated "
+              f"in {summary['batches']} batches")
+        for error in summary.get('errors', []):
+            print(f"Failed Neo4j revocation batch: {error}")
 
     def handle_revocations(self, index_name: str, update_es: bool, update_db: bool, update_neo4j: bool):
         if not self._dbs_initiated:
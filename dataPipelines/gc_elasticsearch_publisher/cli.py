@@ -107,7 +107,7 @@ def remove_docs_from_index(index_name: str, removal_list: list) -> None:
         ingest_dir=""
     )
     records = [r.stem for r in removal_list]
-    publisher.delete_record(records=records)
+    return publisher.bulk_delete_records(records=records)
 
 
 @cli.command(name='remove-docs-from-es')
@@ -0,0 +1,144 @@
+"""Streaming CSV -> Elasticsearch loading shared by the CSV based pipelines (Hermes, CDO)
+
+Files are read in chunks of rows, each chunk goes through the pipeline's transform as a whole
+DataFrame, and the resulting docs are sent in _bulk requests capped by doc count and bytes.
+Several files are indexed at once, one thread each, and the alias is moved to the new index in
+a single update_aliases call once everything went in.
+"""
+import sys
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+from elasticsearch import helpers
+
+if t.TYPE_CHECKING:
+    from elasticsearch import Elasticsearch
+
+DEFAULT_CHUNK_ROWS = 5000
+DEFAULT_BULK_CHUNK_SIZE = 500
+DEFAULT_MAX_CHUNK_BYTES = 10 * 1024 * 1024
+DEFAULT_MAX_WORKERS = 4
+# failed docs printed per load, the rest are only counted
+MAX_REPORTED_ERRORS = 10
+
+ChunkTransform = t.Callable[[pd.DataFrame], pd.DataFrame]
+DocBuilder = t.Callable[[pd.DataFrame], t.Iterable[dict]]
+
+
+def find_csv_files(location: t.Union[str, Path]) -> t.List[Path]:
+    """location itself if it is a csv file, else every csv file under it"""
+    location = Path(location)
+    if location.is_dir():
+        return sorted(location.rglob('*.csv'))
+    return [location]
+
+
+def frame_records(df: pd.DataFrame) -> t.Iterator[dict]:
+    """Rows of df as {column: value} dicts, missing values as None"""
+    columns = list(df.columns)
+    df = df.astype(object).where(df.notna(), None)
+    for row in df.itertuples(index=False, name=None):
+        yield dict(zip(columns, row))
+
+
+def iter_csv_docs(path: t.Union[str, Path],
+                  transform: t.Optional[ChunkTransform] = None,
+                  build_docs: DocBuilder = frame_records,
+                  chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                  read_csv_kwargs: t.Optional[dict] = None) -> t.Iterator[dict]:
+    """
+    Docs of a csv file, read chunk_rows rows at a time
+    :param path: csv file
+    :param transform: applied to every chunk, e.g. dropping columns or blanking placeholder values
+    :param build_docs: turns a transformed chunk into docs, one dict per row by default
+    :param chunk_rows: rows held in memory at once
+    :param read_csv_kwargs: passed on to pandas.read_csv, everything is read as str by default
+    """
+    kwargs = {'dtype': str}
+    kwargs.update(read_csv_kwargs or {})
+    for chunk in pd.read_csv(path, chunksize=chunk_rows, **kwargs):
+        if transform is not None:
+            chunk = transform(chunk)
+        yield from build_docs(chunk)
+
+
+def index_csv_file(es: 'Elasticsearch',
+                   path: t.Union[str, Path],
+                   index: str,
+                   bulk_chunk_size: int = DEFAULT_BULK_CHUNK_SIZE,
+                   max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+                   **doc_kwargs) -> dict:
+    """
+    Index one csv file, see iter_csv_docs for doc_kwargs
+    :return: {'file', 'indexed', 'failed', 'errors'} where errors holds the first MAX_REPORTED_ERRORS failures
+    """
+    summary = {'file': str(path), 'indexed': 0, 'failed': 0, 'errors': []}
+    for success, info in helpers.streaming_bulk(
+        client=es,
+        actions=iter_csv_docs(path, **doc_kwargs),
+        index=index,
+        chunk_size=bulk_chunk_size,
+        max_chunk_bytes=max_chunk_bytes,
+        raise_on_error=False,
+        raise_on_exception=False,
+    ):
+        if success:
+            summary['indexed'] += 1
+        else:
+            summary['failed'] += 1
+            if len(summary['errors']) < MAX_REPORTED_ERRORS:
+                summary['errors'].append(info)
+    return summary
+
+
+def swap_alias(es: 'Elasticsearch', index: str, alias: str) -> None:
+    """Point alias at index only, removing it from every other index in the same update_aliases call"""
+    actions = []
+    if es.indices.exists_alias(name=alias):
+        actions = [
+            {'remove': {'index': old_index, 'alias': alias}}
+            for old_index in es.indices.get_alias(name=alias)
+            if old_index != index
+        ]
+    actions.append({'add': {'index': index, 'alias': alias}})
+    es.indices.update_aliases(body={'actions': actions})
+
+
+def load_csv_files(es: 'Elasticsearch',
+                   paths: t.Iterable[t.Union[str, Path]],
+                   index: str,
+                   alias: t.Optional[str] = None,
+                   max_workers: int = DEFAULT_MAX_WORKERS,
+                   **index_kwargs) -> dict:
+    """
+    Index csv files into index, max_workers files at a time, then swap alias over to it
+    :param es: client, shared by the worker threads
+    :param paths: csv files
+    :param index: target index, created by Elasticsearch on the first write if it doesn't exist
+    :param alias: moved to index once every file loaded without failures, None to leave aliases alone
+    :param max_workers: files indexed concurrently
+    :param index_kwargs: passed on to index_csv_file
+    :return: {'files', 'indexed', 'failed'} totals
+    :raises RuntimeError: when any doc failed, the alias is left where it was
+    """
+    paths = list(paths)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(paths) or 1))) as executor:
+        summaries = list(executor.map(lambda p: index_csv_file(es, p, index, **index_kwargs), paths))
+
+    totals = {
+        'files': len(summaries),
+        'indexed': sum(s['indexed'] for s in summaries),
+        'failed': sum(s['failed'] for s in summaries),
+    }
+    for s in summaries:
+        print(f"{s['file']}: {s['indexed']} docs indexed, {s['failed']} failed")
+        for error in s['errors']:
+            print("Doc failed", error, file=sys.stderr)
+
+    if totals['failed']:
+        raise RuntimeError(f"{totals['failed']} docs failed to index into {index}, alias {alias} left unchanged")
+    if alias:
+        swap_alias(es, index, alias)
+    return totals
@@ -6,6 +6,7 @@ import hashlib
 import re
 import traceback
 from .config import Config
+from common.utils.parsed_json import iter_parsed_json_files, get_parsed_json_stem, load_parsed_json
 import json
 import typing as t
 from configuration import RENDERED_DIR
@@ -20,6 +21,46 @@ def clean_string(string):
     )
 
 
+# whitespace other than spaces at either end of a space separated word, what clean_string strips
+_WORD_EDGE_WHITESPACE = re.compile(r"(?:(?<= )|^)[^\S ]+|[^\S ]+(?= |\Z)")
+
+
+def clean_string_column(column: pd.Series) -> pd.Series:
+    """clean_string applied to every value of column, with vectorized string operations"""
+    return column.astype(str).str.replace(_WORD_EDGE_WHITESPACE, "", regex=True).str.replace('"', "'", regex=False)
+
+
+# entity csv columns run through clean_string
+ENTITY_TEXT_COLUMNS = [
+    "entity_name",
+    "Website",
+    "Address",
+    "Government_Branch",
+    "Parent_Agency",
+    "Related_Agency",
+    "information"
+]
+# entity csv column -> entity index document field
+ENTITY_DOC_FIELDS = {
+    "entity_name": "name",
+    "Website": "website",
+    "Address": "address",
+    "Government_Branch": "government_branch",
+    "Parent_Agency": "parent_agency",
+    "Related_Agency": "related_agency",
+    "entity_type": "entity_type",
+    "crawlers": "crawlers",
+    "num_mentions": "num_mentions",
+    "Agency_Aliases": "aliases",
+    "information": "information",
+    "information_source": "information_source",
+    "information_retrieved": "information_retrieved",
+}
+# csv rows cleaned at a time and documents per bulk request when indexing entities
+ENTITY_CSV_CHUNK_SIZE = 10000
+ENTITY_BULK_CHUNK_SIZE = 500
+
+
 class ElasticsearchPublisher:
     def __init__(
         self,
@@ -77,23 +118,21 @@ class ElasticsearchPublisher:
             )
 
     def get_jdicts(self):
-        for f in Path(self.ingest_dir).glob("*.json"):
-            filename = re.sub("\.json", "", os.path.basename(f))
+        for f in iter_parsed_json_files(self.ingest_dir):
+            filename = get_parsed_json_stem(f)
             print(f"ES inserting {filename}")
             # record_id = uuid.uuid1()
             record_id = hashlib.sha256(filename.encode())
-            with open(f, "r", encoding="utf-8") as file:
-                data = file.read()
-                json_data = json.loads(data)
-                if "text" in json_data:
-                    del json_data["text"]
-                if "pages" in json_data:
-                    del json_data["pages"]
-                if "raw_text" in json_data:
-                    del json_data["raw_text"]
-                json_data["_id"] = record_id.hexdigest()
-                # json_data['_id'] = record_id
-                yield json_data
+            json_data = load_parsed_json(f)
+            if "text" in json_data:
+                del json_data["text"]
+            if "pages" in json_data:
+                del json_data["pages"]
+            if "raw_text" in json_data:
+                del json_data["raw_text"]
+            json_data["_id"] = record_id.hexdigest()
+            # json_data['_id'] = record_id
+            yield json_data
 
     def get_actions(self, json_dicts):
         for json_dict in json_dicts:
@@ -184,6 +223,41 @@ class ElasticsearchPublisher:
                 else:
                     print("Missing: " + record_id.hexdigest() + "  " + filename)
 
+    def bulk_delete_records(self, records: list, chunk_size: int = 500) -> dict:
+        """Delete records in _bulk requests, missing docs are counted instead of checked for one by one"""
+        summary = {"requested": len(records), "deleted": 0, "missing": 0, "failed": 0}
+        if not self.es.indices.exists(self.index_name):
+            summary["missing"] = len(records)
+            return summary
+
+        def get_actions():
+            for record in records:
+                filename = re.sub(".xml.json|.json", "", record.strip())
+                yield {
+                    "_op_type": "delete",
+                    "_index": self.index_name,
+                    "_id": hashlib.sha256(filename.encode()).hexdigest(),
+                }
+
+        for success, info in helpers.streaming_bulk(
+            client=self.es,
+            actions=get_actions(),
+            chunk_size=chunk_size,
+            raise_on_error=False,
+            raise_on_exception=False,
+        ):
+            result = info.get("delete", {})
+            if success:
+                summary["deleted"] += 1
+            elif result.get("status") == 404:
+                summary["missing"] += 1
+            else:
+                summary["failed"] += 1
+                print("Failed deleting from ES:", info)
+
+        print(f"Deleted {summary['deleted']} docs from ES, {summary['missing']} missing, {summary['failed']} failed")
+        return summary
+
 
 class ConfiguredElasticsearchPublisher(ElasticsearchPublisher):
     """ES Publisher that leverages repo configuration"""
@@ -247,58 +321,40 @@ class ConfiguredEntityPublisher(ConfiguredElasticsearchPublisher):
         )
 
         self.entity_csv_path = entity_csv_path
-        self.agencies = self.read_agencies()
-
-    def read_agencies(self):
-
-        agencies = pd.read_csv(self.entity_csv_path)
-        agencies.fillna("", inplace=True)
-
-        keep_cols = [
-            "entity_name",
-            "Website",
-            "Address",
-            "Government_Branch",
-            "Parent_Agency",
-            "Related_Agency",
-            "information"
-        ]
-
-        for i in keep_cols:
-            agencies[i] = agencies[i].apply(lambda x: clean_string(x))
-
-        agencies["Agency_Aliases"] = agencies["Agency_Aliases"].apply(
-            lambda x: x.split(";")
-        )
 
+    @property
+    def agencies(self) -> pd.DataFrame:
+        """The whole cleaned entity csv, indexing streams it in chunks instead"""
+        if not hasattr(self, '_agencies'):
+            self._agencies = self.read_agencies()
+        return self._agencies
+
+    @staticmethod
+    def clean_agencies(agencies: pd.DataFrame) -> pd.DataFrame:
+        """clean_string the text columns and split aliases, with vectorized string operations"""
+        agencies = agencies.fillna("")
+        for col in ENTITY_TEXT_COLUMNS:
+            agencies[col] = clean_string_column(agencies[col])
+        agencies["Agency_Aliases"] = agencies["Agency_Aliases"].astype(str).str.split(";")
         return agencies
 
-    def get_docs(self):
-
-        docs = []
-        for i in self.agencies.index:
-            mydict = {}
-            mydict["name"] = self.agencies.loc[i, "entity_name"]
-            mydict["website"] = self.agencies.loc[i, "Website"]
-            mydict["address"] = self.agencies.loc[i, "Address"]
-            mydict["government_branch"] = self.agencies.loc[i, "Government_Branch"]
-            mydict["parent_agency"] = self.agencies.loc[i, "Parent_Agency"]
-            mydict["related_agency"] = self.agencies.loc[i, "Related_Agency"]
-            mydict["entity_type"] = self.agencies.loc[i, "entity_type"]
-            mydict["crawlers"] = self.agencies.loc[i, "crawlers"]
-            mydict["num_mentions"] = self.agencies.loc[i, "num_mentions"]
-            mydict["aliases"] = [
-                {"name": x} for x in self.agencies.loc[i, "Agency_Aliases"]
-            ]
-            mydict["information"] = self.agencies.loc[i, "information"]
-            mydict["information_source"] = self.agencies.loc[i, "information_source"]
-            mydict["information_retrieved"] = self.agencies.loc[i, "information_retrieved"]
-            header = {"_index": self.index_name, "_source": mydict}
-            docs.append(header)
-
-        return docs
-
-    def index_jsons(self):
+    def read_agencies(self, chunksize: t.Optional[int] = None) -> t.Union[pd.DataFrame, t.Iterator[pd.DataFrame]]:
+        """Cleaned entity csv, or an iterator of cleaned chunks of it when chunksize is given"""
+        if chunksize is None:
+            return self.clean_agencies(pd.read_csv(self.entity_csv_path))
+        return (self.clean_agencies(chunk) for chunk in pd.read_csv(self.entity_csv_path, chunksize=chunksize))
+
+    def get_docs(self, chunksize: int = ENTITY_CSV_CHUNK_SIZE) -> t.Iterator[dict]:
+        """Bulk index actions for the entity csv, built a chunk of rows at a time"""
+        columns = list(ENTITY_DOC_FIELDS.keys())
+        fields = list(ENTITY_DOC_FIELDS.values())
+        for agencies in self.read_agencies(chunksize=chunksize):
+            for row in agencies[columns].itertuples(index=False, name=None):
+                doc = dict(zip(fields, row))
+                doc["aliases"] = [{"name": x} for x in doc["aliases"]]
+                yield {"_index": self.index_name, "_source": doc}
+
+    def index_jsons(self, chunk_size: int = ENTITY_BULK_CHUNK_SIZE):
         print("Starting to index entities")
 
         count_success, error_count = 0, 0
@@ -306,10 +362,10 @@ class ConfiguredEntityPublisher(ConfiguredElasticsearchPublisher):
             for success, info in helpers.parallel_bulk(
                 client=self.es,
                 actions=self.get_docs(),
-                thread_count=10,
-                chunk_size=1,
+                thread_count=4,
+                chunk_size=chunk_size,
                 raise_on_exception=False,
-                queue_size=1,
+                queue_size=4,
             ):
                 if not success:
                     error_count += 1
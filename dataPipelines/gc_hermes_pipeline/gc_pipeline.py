@@ -3,8 +3,9 @@ import os
 from typing import Union
 from pathlib import Path
 import click
-import csv
-from elasticsearch import helpers, Elasticsearch
+from dataPipelines.gc_elasticsearch_publisher.csv_loader import (
+    DEFAULT_MAX_WORKERS, find_csv_files, load_csv_files
+)
 from .conf import Conf
 
 @click.command()
@@ -40,12 +41,19 @@ from .conf import Conf
     type=str,
     help="set alias"
 )
-def run(es_index: str, directory: str,es_host: str,es_port: str, alias: str):
+@click.option(
+    '--max-workers',
+    required=False,
+    default=DEFAULT_MAX_WORKERS,
+    type=int,
+    help="csv files indexed concurrently"
+)
+def run(es_index: str, directory: str,es_host: str,es_port: str, alias: str, max_workers: int):
     print("Starting Gamechanger Hermes Pipeline")
     start = time()
     # Download PDF and metadata files
 
-    csv_reader(directory, es_host, es_port, es_index, alias)
+    csv_reader(directory, es_host, es_port, es_index, alias, max_workers)
 
 
     end = time()
@@ -53,21 +61,19 @@ def run(es_index: str, directory: str,es_host: str,es_port: str, alias: str):
     print("DONE!!!!!!")
 
 
-def csv_reader(file_name,host,port,index,alias):
+def csv_reader(file_name,host,port,index,alias,max_workers=DEFAULT_MAX_WORKERS):
     print(index)
     es = Conf.ch.es_client
-    if (str(file_name).endswith("csv")):
-        with open(file_name, 'r') as outfile:
-             reader = csv.DictReader(outfile)
-             helpers.bulk(es, reader, index=index)
-    elif (str(file_name).endswith("/")):
-        pathlist = Path(file_name).rglob('*.csv')
-        for path in pathlist:
-             with open(path, 'r') as outfile:
-                 reader = csv.DictReader(outfile)
-                 helpers.bulk(es, reader, index=index)
-    if alias is not "None":
-        es.indices.put_alias(index=index,name=alias)
+    # values stay the strings csv.DictReader used to give, empty fields included
+    totals = load_csv_files(
+        es,
+        find_csv_files(file_name),
+        index=index,
+        alias=alias if alias != "None" else None,
+        max_workers=max_workers,
+        read_csv_kwargs={'keep_default_na': False},
+    )
+    print(f"Indexed {totals['indexed']} docs from {totals['files']} files")
 
 
 if __name__ == '__main__':
@@ -1,13 +1,15 @@
 import click
-from .tools.cli import tools_cli
-from .pipelines.cli import pipelines_cli
+from .lazy_group import LazyGroup
 
 
-@click.group(name='gci')
+@click.group(
+    name='gci',
+    cls=LazyGroup,
+    lazy_subcommands={
+        'tools': 'dataPipelines.gc_ingest.tools.cli.tools_cli',
+        'pipelines': 'dataPipelines.gc_ingest.pipelines.cli.pipelines_cli',
+    }
+)
 def cli():
     """Running stuff and things"""
     pass
-
-
-cli.add_command(tools_cli)
-cli.add_command(pipelines_cli)
\ No newline at end of file
@@ -1,5 +1,3 @@
-from configuration.utils import get_connection_helper_from_env
-from common.utils.s3 import S3Utils
 import datetime
 from enum import Enum
 
@@ -9,17 +7,36 @@ class CheckpointedJobType(Enum):
     MANUAL_UPLOAD = 'manual-upload'
 
 
+class _LazyClassAttribute:
+    """Class attribute computed on first access, then cached on the class,
+    so importing Config doesn't read configuration or open connections"""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.name = factory.__name__
+
+    def __get__(self, instance, owner):
+        value = self.factory(owner)
+        setattr(owner, self.name, value)
+        return value
+
+
 class Config:
     TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
 
-    # TODO: this should lazy load separately from the constants, else if endpoints are not availalable - things will break
-    connection_helper = get_connection_helper_from_env()
-
     default_batch_timestamp = datetime.datetime.utcnow()
     default_batch_timestamp_str = default_batch_timestamp.strftime(TIMESTAMP_FORMAT)
-    s3_bucket = connection_helper.conf['aws']['bucket_name']
 
-    # TODO: this should lazy load separately from the constants, else if endpoints are not availalable - things will break
-    s3_utils = S3Utils(connection_helper, bucket=s3_bucket)
+    @_LazyClassAttribute
+    def connection_helper(cls):
+        from configuration.utils import get_connection_helper_from_env
+        return get_connection_helper_from_env()
 
+    @_LazyClassAttribute
+    def s3_bucket(cls):
+        return cls.connection_helper.conf['aws']['bucket_name']
 
+    @_LazyClassAttribute
+    def s3_utils(cls):
+        from common.utils.s3 import S3Utils
+        return S3Utils(cls.connection_helper, bucket=cls.s3_bucket)
@@ -0,0 +1,30 @@
+import importlib
+import typing as t
+
+import click
+
+
+class LazyGroup(click.Group):
+    """Click group whose subcommands are imported the first time they're looked up,
+    so running one command doesn't import every other command's dependencies
+    :param lazy_subcommands: command name -> "module.path.attribute" of the command
+    """
+
+    def __init__(self, *args, lazy_subcommands: t.Optional[t.Dict[str, str]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def list_commands(self, ctx: click.Context) -> t.List[str]:
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_subcommands))
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> t.Optional[click.Command]:
+        if cmd_name not in self.commands and cmd_name in self.lazy_subcommands:
+            self.add_command(self._load(cmd_name), cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def _load(self, cmd_name: str) -> click.Command:
+        module_name, attribute = self.lazy_subcommands[cmd_name].rsplit('.', 1)
+        command = getattr(importlib.import_module(module_name), attribute)
+        if not isinstance(command, click.Command):
+            raise ValueError(f"Lazy subcommand {cmd_name} ({self.lazy_subcommands[cmd_name]}) is not a click command")
+        return command
@@ -1,12 +1,15 @@
 import click
-from .core.cli import core_cli
-from .clone.cli import clone_cli
+from dataPipelines.gc_ingest.lazy_group import LazyGroup
 
 
-@click.group(name='pipelines')
+@click.group(
+    name='pipelines',
+    cls=LazyGroup,
+    lazy_subcommands={
+        'core': 'dataPipelines.gc_ingest.pipelines.core.cli.core_cli',
+        'clone': 'dataPipelines.gc_ingest.pipelines.clone.cli.clone_cli',
+    }
+)
 def pipelines_cli():
     """Pipeline CLI"""
     pass
-
-pipelines_cli.add_command(core_cli)
-pipelines_cli.add_command(clone_cli)
\ No newline at end of file
@@ -6,15 +6,10 @@ from dataPipelines.gc_ingest.tools.snapshot.utils import SnapshotManager
 from dataPipelines.gc_ingest.tools.snapshot.cli import pass_core_snapshot_cli_options as pass_clone_snapshot_cli_options
 from dataPipelines.gc_ingest.tools.load.utils import LoadManager
 from dataPipelines.gc_ingest.tools.load.cli import pass_core_load_cli_options as pass_clone_load_cli_options
-from dataPipelines.gc_elasticsearch_publisher.gc_elasticsearch_publisher import ConfiguredElasticsearchPublisher
-from dataPipelines.gc_neo4j_publisher.utils import Neo4jJobManager
 from dataPipelines.gc_ingest.tools.db.utils import DBType
 from dataPipelines.gc_ingest.tools.db.utils import CoreDBManager as CloneDBManager
 from dataPipelines.gc_ingest.tools.db.cli import pass_core_db_cli_options as pass_clone_db_cli_options
 from dataPipelines.gc_ingest.common_cli_options import pass_bucket_name_option
-from dataPipelines.gc_crawler_status_tracker.gc_crawler_status_tracker import CrawlerStatusTracker
-from dataPipelines.gc_manual_metadata.gc_manual_metadata import ManualMetadata
-from dataPipelines.gc_thumbnails.utils import ThumbnailsCreator
 from pathlib import Path
 import datetime as dt
 from enum import Enum
@@ -23,6 +18,13 @@ import typing as t
 import functools
 import multiprocessing as mp
 
+if t.TYPE_CHECKING:
+    from dataPipelines.gc_elasticsearch_publisher.gc_elasticsearch_publisher import ConfiguredElasticsearchPublisher
+    from dataPipelines.gc_neo4j_publisher.utils import Neo4jJobManager
+    from dataPipelines.gc_crawler_status_tracker.gc_crawler_status_tracker import CrawlerStatusTracker
+    from dataPipelines.gc_manual_metadata.gc_manual_metadata import ManualMetadata
+    from dataPipelines.gc_thumbnails.utils import ThumbnailsCreator
+
 NonBlankString = t.NewType('NonBlankString', pyd.constr(
     strip_whitespace=True, min_length=1))
 StrippedString = t.NewType('StrippedString', pyd.constr(strip_whitespace=True))
@@ -134,10 +136,12 @@ class CloneIngestConfig(IngestConfig):
         return self._thumbnail_doc_base_dir
 
     @property
-    def es_publisher(self) -> ConfiguredElasticsearchPublisher:
+    def es_publisher(self) -> 'ConfiguredElasticsearchPublisher':
         if hasattr(self, '_es_publisher'):
             return self._es_publisher
 
+        from dataPipelines.gc_elasticsearch_publisher.gc_elasticsearch_publisher import ConfiguredElasticsearchPublisher
+
         self._es_publisher = ConfiguredElasticsearchPublisher(
             ingest_dir=self.parsed_doc_base_dir,
             index_name=self.index_name,
@@ -147,20 +151,24 @@ class CloneIngestConfig(IngestConfig):
         return self._es_publisher
 
     @property
-    def crawler_status_tracker(self) -> CrawlerStatusTracker:
+    def crawler_status_tracker(self) -> 'CrawlerStatusTracker':
         if hasattr(self, '_crawler_status_tracker'):
             return self._crawler_status_tracker
 
+        from dataPipelines.gc_crawler_status_tracker.gc_crawler_status_tracker import CrawlerStatusTracker
+
         self._crawler_status_tracker = CrawlerStatusTracker(
             input_json=self.crawler_output
         )
         return self._crawler_status_tracker
 
     @property
-    def neo4j_job_manager(self) -> Neo4jJobManager:
+    def neo4j_job_manager(self) -> 'Neo4jJobManager':
         if hasattr(self, '_neo4j_job_manager'):
             return self._neo4j_job_manager
 
+        from dataPipelines.gc_neo4j_publisher.utils import Neo4jJobManager
+
         self._neo4j_job_manager = Neo4jJobManager()
         return self._neo4j_job_manager
 
@@ -176,10 +184,12 @@ class CloneIngestConfig(IngestConfig):
         return self._clone_db_manager
 
     @property
-    def thumbnail_job_manager(self) -> ThumbnailsCreator:
+    def thumbnail_job_manager(self) -> 'ThumbnailsCreator':
         if hasattr(self, '_thumbnail_job_manager'):
             return self._thumbnail_job_manager
 
+        from dataPipelines.gc_thumbnails.utils import ThumbnailsCreator
+
         self._thumbnail_job_manager = ThumbnailsCreator(
             input_directory=self.raw_doc_base_dir,
             output_directory=self.thumbnail_doc_base_dir,
@@ -398,10 +408,11 @@ class S3IngestConfig(CloneIngestConfig):
         return wf
 
     @property
-    def metadata_creater(self) -> ManualMetadata:
+    def metadata_creater(self) -> 'ManualMetadata':
         if hasattr(self, '_metadata_creater'):
             return self._metadata_creater
         if self.metadata_creation_group:
+            from dataPipelines.gc_manual_metadata.gc_manual_metadata import ManualMetadata
             self._metadata_creater = ManualMetadata(
                 input_directory=self.raw_doc_base_dir,
                 document_group=self.metadata_creation_group
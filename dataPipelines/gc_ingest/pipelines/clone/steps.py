@@ -1,4 +1,3 @@
-from common.document_parser.cli import pdf_to_json
 from dataPipelines.gc_ingest.pipelines.utils import announce
 from .configs import CloneIngestConfig, S3IngestConfig
 from dataPipelines.gc_ingest.tools.snapshot.utils import SnapshotType
@@ -13,6 +12,7 @@ class CloneIngestSteps(PipelineSteps):
     @staticmethod
     def parse_and_ocr(c: CloneIngestConfig) -> None:
         announce(f"Parsing and OCR'ing docs from '{c.raw_doc_base_dir}' ...")
+        from common.document_parser.cli import pdf_to_json
         pdf_to_json(
             parser_path="common.document_parser.parsers.policy_analytics.parse::parse",
             source=str(c.raw_doc_base_dir),
@@ -20,7 +20,9 @@ class CloneIngestSteps(PipelineSteps):
             metadata=str(c.raw_doc_base_dir),
             ocr_missing_doc=True,
             multiprocess=c.max_threads,
-            num_ocr_threads=c.max_ocr_threads
+            num_ocr_threads=c.max_ocr_threads,
+            # thumbnails and the raw snapshot need html/txt docs as pdfs
+            render_pdf=True
         )
 
     @staticmethod
@@ -5,6 +5,7 @@ from common.utils.s3 import TimestampedPrefix
 import typing as t
 from .configs import CoreIngestConfig, S3IngestConfig, LocalIngestConfig, CheckpointIngestConfig, DeleteConfig, ManifestConfig
 from .steps import CoreIngestSteps
+from dataPipelines.gc_ingest.tools.snapshot.utils import SnapshotType
 from pathlib import Path
 import shutil
 import glob
@@ -84,33 +85,50 @@ def core_checkpoint_ingest(core_ingest_config: CoreIngestConfig, **kwargs):
     announce("Aggregating files for processing ...")
     announce(f"Aggregating files from checkpoints ...")
     last_prefix: t.Optional[TimestampedPrefix] = None
-    with cig.checkpoint_manager.checkpoint_download_manager(
+    docs_found = False
+    # the next prefix downloads while the current one is parsed and loaded,
+    # the checkpoint advances past each prefix once it's loaded
+    for dp in cig.checkpoint_manager.prefetching_downloads(
         base_download_dir=cig.download_base_dir,
         advance_checkpoint=cig.advance_checkpoint,
         limit=cig.checkpoint_limit if cig.checkpoint_limit > 0 else None,
-        max_threads=cig.max_threads
-    ) as downloaded_prefixes:
-        for dp in downloaded_prefixes:
-            last_prefix = dp.timestamped_prefix
-            for f in (p for p in dp.local_path.iterdir() if p.is_file()):
-                shutil.copy(str(f), str(Path(cig.raw_doc_base_dir, f.name)))
+        max_threads=cig.max_threads,
+        max_staged=cig.max_staged_prefixes
+    ):
+        last_prefix = dp.timestamped_prefix
+
+        announce(f"Processing checkpointed prefix {dp.timestamped_prefix.prefix_path} ...")
+        for f in (p for p in cig.raw_doc_base_dir.iterdir() if p.is_file()):
+            f.unlink()
+        for f in (p for p in dp.local_path.iterdir() if p.is_file()):
+            shutil.copy(str(f), str(Path(cig.raw_doc_base_dir, f.name)))
+        if not next((p for p in cig.raw_doc_base_dir.iterdir() if p.is_file()), None):
+            announce(f"[WARNING] No files were downloaded from {dp.timestamped_prefix.prefix_path}, skipping it.")
+            continue
+
+        # once per run, after the first prefix with files is in place (the crawler output is one of them)
+        if not docs_found:
+            CoreIngestSteps.update_crawler_status_downloaded(cig)
+            CoreIngestSteps.update_crawler_status_in_progress(cig)
+            CoreIngestSteps.backup_db(cig)
+            CoreIngestSteps.backup_snapshots(cig)
+        docs_found = True
+
+        CoreIngestSteps.update_thumbnails(cig)
+        CoreIngestSteps.parse_and_ocr(cig)
+        CoreIngestSteps.load_files(cig)
+        CoreIngestSteps.update_s3_snapshots(cig, snapshot_types=[SnapshotType.RAW])
 
     if not last_prefix:
         announce("There was nothing to do, skipping remainder of ingest ...")
         exit(0)
 
-    if not next((p for p in cig.raw_doc_base_dir.iterdir() if p.is_file()), None):
+    if not docs_found:
         announce("[WARNING] No files were downloaded for processing, exiting pipeline.")
         exit(1)
 
-    CoreIngestSteps.update_crawler_status_downloaded(cig)
-    CoreIngestSteps.update_crawler_status_in_progress(cig)
-    CoreIngestSteps.backup_db(cig)
-    CoreIngestSteps.backup_snapshots(cig)
-    CoreIngestSteps.update_thumbnails(cig)
-    CoreIngestSteps.parse_and_ocr(cig)
-    CoreIngestSteps.load_files(cig)
-    CoreIngestSteps.update_s3_snapshots(cig)
+    # parsed docs and thumbnails accumulate over all prefixes, snapshot/index them once
+    CoreIngestSteps.update_s3_snapshots(cig, snapshot_types=[SnapshotType.PARSED, SnapshotType.THUMBNAIL])
     CoreIngestSteps.refresh_materialized_tables(cig)
     CoreIngestSteps.update_es(cig)
     CoreIngestSteps.update_neo4j(cig)
@@ -283,6 +301,8 @@ def core_delete(core_ingest_config: CoreIngestConfig, **kwargs):
 
     CoreIngestSteps.delete_from_s3(dc)
 
+    CoreIngestSteps.report_deletions(dc)
+
 @core_ingest_cli.command('manifest')
 @pass_core_ingest_config
 @ManifestConfig.pass_options
@@ -326,3 +346,5 @@ def core_manifest(core_ingest_config: CoreIngestConfig, **kwargs):
     CoreIngestSteps.refresh_materialized_tables(mc)
 
     CoreIngestSteps.delete_from_s3(mc)
+
+    CoreIngestSteps.report_deletions(mc)
@@ -5,14 +5,9 @@ from dataPipelines.gc_ingest.tools.snapshot.utils import SnapshotManager
 from dataPipelines.gc_ingest.tools.snapshot.cli import pass_core_snapshot_cli_options
 from dataPipelines.gc_ingest.tools.load.utils import LoadManager
 from dataPipelines.gc_ingest.tools.load.cli import pass_core_load_cli_options
-from dataPipelines.gc_elasticsearch_publisher.gc_elasticsearch_publisher import ConfiguredElasticsearchPublisher
-from dataPipelines.gc_neo4j_publisher.utils import Neo4jJobManager
 from dataPipelines.gc_ingest.tools.db.utils import DBType, CoreDBManager
 from dataPipelines.gc_ingest.tools.db.cli import pass_core_db_cli_options
 from dataPipelines.gc_ingest.common_cli_options import pass_bucket_name_option
-from dataPipelines.gc_crawler_status_tracker.gc_crawler_status_tracker import CrawlerStatusTracker
-from dataPipelines.gc_manual_metadata.gc_manual_metadata import ManualMetadata
-from dataPipelines.gc_thumbnails.utils import ThumbnailsCreator
 from pathlib import Path
 import datetime as dt
 from enum import Enum
@@ -21,7 +16,14 @@ import typing as t
 import functools
 import multiprocessing as mp
 import json
-import pandas as pd
+
+if t.TYPE_CHECKING:
+    from dataPipelines.gc_elasticsearch_publisher.gc_elasticsearch_publisher import ConfiguredElasticsearchPublisher
+    from dataPipelines.gc_neo4j_publisher.utils import Neo4jJobManager
+    from dataPipelines.gc_crawler_status_tracker.gc_crawler_status_tracker import CrawlerStatusTracker
+    from dataPipelines.gc_manual_metadata.gc_manual_metadata import ManualMetadata
+    from dataPipelines.gc_thumbnails.utils import ThumbnailsCreator
+    from dataPipelines.gc_ingest.tools.delete.utils import DeletionEngine
 
 NonBlankString = t.NewType('NonBlankString', pyd.constr(strip_whitespace=True, min_length=1))
 StrippedString = t.NewType('StrippedString', pyd.constr(strip_whitespace=True))
@@ -135,10 +137,12 @@ class CoreIngestConfig(IngestConfig):
         return self._thumbnail_doc_base_dir
 
     @property
-    def es_publisher(self) -> ConfiguredElasticsearchPublisher:
+    def es_publisher(self) -> 'ConfiguredElasticsearchPublisher':
         if hasattr(self, '_es_publisher'):
             return self._es_publisher
 
+        from dataPipelines.gc_elasticsearch_publisher.gc_elasticsearch_publisher import ConfiguredElasticsearchPublisher
+
         self._es_publisher = ConfiguredElasticsearchPublisher(
             ingest_dir=self.parsed_doc_base_dir,
             index_name=self.index_name,
@@ -148,20 +152,24 @@ class CoreIngestConfig(IngestConfig):
         return self._es_publisher
 
     @property
-    def crawler_status_tracker(self) -> CrawlerStatusTracker:
+    def crawler_status_tracker(self) -> 'CrawlerStatusTracker':
         if hasattr(self, '_crawler_status_tracker'):
             return self._crawler_status_tracker
 
+        from dataPipelines.gc_crawler_status_tracker.gc_crawler_status_tracker import CrawlerStatusTracker
+
         self._crawler_status_tracker = CrawlerStatusTracker(
             input_json=self.crawler_output
         )
         return self._crawler_status_tracker
 
     @property
-    def neo4j_job_manager(self) -> Neo4jJobManager:
+    def neo4j_job_manager(self) -> 'Neo4jJobManager':
         if hasattr(self, '_neo4j_job_manager'):
             return self._neo4j_job_manager
 
+        from dataPipelines.gc_neo4j_publisher.utils import Neo4jJobManager
+
         self._neo4j_job_manager = Neo4jJobManager()
         return self._neo4j_job_manager
 
@@ -177,10 +185,12 @@ class CoreIngestConfig(IngestConfig):
         return self._core_db_manager
 
     @property
-    def thumbnail_job_manager(self) -> ThumbnailsCreator:
+    def thumbnail_job_manager(self) -> 'ThumbnailsCreator':
         if hasattr(self, '_thumbnail_job_manager'):
             return self._thumbnail_job_manager
 
+        from dataPipelines.gc_thumbnails.utils import ThumbnailsCreator
+
         self._thumbnail_job_manager = ThumbnailsCreator(
             input_directory=self.raw_doc_base_dir,
             output_directory=self.thumbnail_doc_base_dir,
@@ -189,6 +199,19 @@ class CoreIngestConfig(IngestConfig):
         )
         return self._thumbnail_job_manager
 
+    @property
+    def deletion_engine(self) -> 'DeletionEngine':
+        if hasattr(self, '_deletion_engine'):
+            return self._deletion_engine
+
+        from dataPipelines.gc_ingest.tools.delete.utils import DeletionEngine
+
+        self._deletion_engine = DeletionEngine(
+            removal_list=self.removal_list,
+            db_tuple_list=self.db_tuple_list
+        )
+        return self._deletion_engine
+
     @property
     def db_tuple_list(self) -> list:
         if hasattr(self, '_db_tuple_list'):
@@ -349,6 +372,7 @@ class CheckpointIngestConfig(CoreIngestConfig):
     checkpoint_ready_marker: t.Optional[StrippedString]
     advance_checkpoint: bool = False
     checkpoint_limit: int = -1
+    max_staged_prefixes: int = CheckpointManager.DEFAULT_MAX_STAGED_PREFIXES
 
     @property
     def checkpoint_manager(self) -> CheckpointManager:
@@ -372,6 +396,12 @@ class CheckpointIngestConfig(CoreIngestConfig):
             default=-1,
             help="Number of checkpoints to process this run"
         )
+        @click.option(
+            '--max-staged-prefixes',
+            type=int,
+            default=CheckpointManager.DEFAULT_MAX_STAGED_PREFIXES,
+            help="Max checkpointed prefixes on local disk at once, the next ones download while the current one is processed"
+        )
         @pass_core_checkpoint_cli_options
         @pass_advance_checkpoint_option
         @functools.wraps(f)
@@ -416,10 +446,11 @@ class S3IngestConfig(CoreIngestConfig):
         return wf
 
     @property
-    def metadata_creater(self) -> ManualMetadata:
+    def metadata_creater(self) -> 'ManualMetadata':
         if hasattr(self, '_metadata_creater'):
             return self._metadata_creater
         if self.metadata_creation_group:
+            from dataPipelines.gc_manual_metadata.gc_manual_metadata import ManualMetadata
             self._metadata_creater = ManualMetadata(
                 input_directory=self.raw_doc_base_dir,
                 document_group=self.metadata_creation_group
@@ -599,6 +630,7 @@ class ManifestConfig(CoreIngestConfig):
                  "Publication Date","Document Type Denotation","Document Number Denotation",
                  "Category of Document","Organization"]
         input_man = Path(self.raw_doc_base_dir, self.input_manifest_filename).resolve()
+        import pandas as pd
         if not input_man.exists():
             self._manifest_df = pd.DataFrame(columns=columns)
             return self._manifest_df
@@ -1,12 +1,8 @@
-from common.document_parser.cli import pdf_to_json
 from dataPipelines.gc_ingest.pipelines.utils import announce
 from .configs import CoreIngestConfig, S3IngestConfig, DeleteConfig, ManifestConfig
 from dataPipelines.gc_ingest.tools.snapshot.utils import SnapshotType
 from datetime import datetime
-from dataPipelines.gc_ingest.tools.load.cli import remove_docs_from_db
-from dataPipelines.gc_ingest.tools.snapshot.cli import remove_docs_from_current_snapshot
-from dataPipelines.gc_elasticsearch_publisher.cli import remove_docs_from_index
-from dataPipelines.gc_neo4j_publisher.cli import remove_docs_from_neo4j
+import typing as t
 from dataPipelines.gc_ingest.tools.metadata.metadata import create_metadata_from_manifest
 
 
@@ -19,6 +15,7 @@ class CoreIngestSteps(PipelineSteps):
     @staticmethod
     def parse_and_ocr(c: CoreIngestConfig) -> None:
         announce(f"Parsing and OCR'ing docs from '{c.raw_doc_base_dir}' ...")
+        from common.document_parser.cli import pdf_to_json
         pdf_to_json(
             parser_path="common.document_parser.parsers.policy_analytics.parse::parse",
             source=str(c.raw_doc_base_dir),
@@ -27,7 +24,9 @@ class CoreIngestSteps(PipelineSteps):
             ocr_missing_doc=True, 
             force_ocr=c.force_ocr,
             multiprocess=c.max_threads,
-            num_ocr_threads=c.max_ocr_threads
+            num_ocr_threads=c.max_ocr_threads,
+            # thumbnails and the raw snapshot need html/txt docs as pdfs
+            render_pdf=True
         )
 
     @staticmethod
@@ -73,28 +72,25 @@ class CoreIngestSteps(PipelineSteps):
             )
 
     @staticmethod
-    def update_s3_snapshots(c: CoreIngestConfig) -> None:
+    def update_s3_snapshots(c: CoreIngestConfig,
+                            snapshot_types: t.Iterable[SnapshotType] = (
+                                SnapshotType.RAW, SnapshotType.PARSED, SnapshotType.THUMBNAIL
+                            )) -> None:
         """Uploads s3 snapshots of the raw+parsed corpus to s3, allowing for reversion if anything gets corrupted
         in the main prefixes"""
         announce("Updating raw/parsed snapshot locations in S3")
-        c.snapshot_manager.update_current_snapshot_from_disk(
-            local_dir=c.raw_doc_base_dir,
-            snapshot_type=SnapshotType.RAW,
-            replace=False,
-            max_threads=c.max_s3_threads
-        )
-        c.snapshot_manager.update_current_snapshot_from_disk(
-            local_dir=c.parsed_doc_base_dir,
-            snapshot_type=SnapshotType.PARSED,
-            replace=False,
-            max_threads=c.max_s3_threads
-        )
-        c.snapshot_manager.update_current_snapshot_from_disk(
-            local_dir=c.thumbnail_doc_base_dir,
-            snapshot_type=SnapshotType.THUMBNAIL,
-            replace=False,
-            max_threads=c.max_s3_threads
-        )
+        local_dirs = {
+            SnapshotType.RAW: c.raw_doc_base_dir,
+            SnapshotType.PARSED: c.parsed_doc_base_dir,
+            SnapshotType.THUMBNAIL: c.thumbnail_doc_base_dir,
+        }
+        for snapshot_type in snapshot_types:
+            c.snapshot_manager.update_current_snapshot_from_disk(
+                local_dir=local_dirs[snapshot_type],
+                snapshot_type=snapshot_type,
+                replace=False,
+                max_threads=c.max_s3_threads
+            )
 
     @staticmethod
     def refresh_materialized_tables(c: CoreIngestConfig) -> None:
@@ -191,27 +187,19 @@ class CoreIngestSteps(PipelineSteps):
             return
 
         announce("Removing docs from DB ...")
-        remove_docs_from_db(
-            lm=c.load_manager,
-            removal_list=c.db_tuple_list
-        )
+        c.deletion_engine.delete_from_db(lm=c.load_manager)
 
     @staticmethod
     def delete_from_s3(c: CoreIngestConfig) -> None:
 
         announce("Removing docs from S3 ...")
-        remove_docs_from_current_snapshot(
-            sm=c.snapshot_manager,
-            removal_list=c.removal_list
-        )
+        c.deletion_engine.delete_from_s3(sm=c.snapshot_manager)
 
     @staticmethod
     def delete_from_elasticsearch(c: CoreIngestConfig) -> None:
 
         announce("Removing docs from Elasticsearch ...")
-
-        remove_docs_from_index(index_name=c.index_name,
-                               removal_list=c.removal_list)
+        c.deletion_engine.delete_from_elasticsearch(index_name=c.index_name)
 
     @staticmethod
     def delete_from_neo4j(c:CoreIngestConfig) -> None:
@@ -220,10 +208,12 @@ class CoreIngestSteps(PipelineSteps):
             announce("Skip Neo4j removal ...")
             return
         announce("Removing docs from Neo4j ...")
-        remove_docs_from_neo4j(
-            njm=c.neo4j_job_manager,
-            removal_list=c.removal_list
-        )
+        c.deletion_engine.delete_from_neo4j(njm=c.neo4j_job_manager)
+
+    @staticmethod
+    def report_deletions(c: CoreIngestConfig) -> None:
+        announce("Deletion results ...")
+        c.deletion_engine.print_summary()
 
     @staticmethod
     def create_metadata_from_manifest(mc: ManifestConfig) -> None:
@@ -1,8 +1,11 @@
 from common.utils.s3 import TimestampedPrefix, S3Utils
 from dataPipelines.gc_ingest.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from collections import deque
 from pathlib import Path
 import datetime as dt
+import shutil
 import typing as t
 
 
@@ -13,16 +16,21 @@ class DownloadedPrefix(t.NamedTuple):
 
 
 class CheckpointManager:
+    # prefixes on local disk at once while prefetching, including the one being processed
+    DEFAULT_MAX_STAGED_PREFIXES = 2
+    # free space kept on the download volume, on top of the largest prefix downloaded so far
+    DEFAULT_MIN_FREE_BYTES = 2 * 1024 ** 3
+
     def __init__(self,
                  checkpoint_file_path: str,
                  checkpointed_dir_path: str,
-                 bucket_name: str = Config.s3_bucket,
+                 bucket_name: t.Optional[str] = None,
                  checkpoint_ready_marker: t.Optional[str] = None,
                  **ignored_kwargs):
         """Utility class for dealing with checkpointed paths in S3
         :param checkpoint_file_path: Path to checkpoint file in s3 (sans bucket name)
         :param checkpointed_dir_path: Path to checkpointed base path in s3 (sans bucket name)
-        :param bucket_name: S3 Bucket name
+        :param bucket_name: S3 Bucket name, defaults to the configured bucket
         :param ready_marker: Name of the file that marks checkpointed directory as ready for processing
         """
         self.checkpoint_file_path = checkpoint_file_path
@@ -30,7 +38,7 @@ class CheckpointManager:
             checkpointed_dir_path if checkpointed_dir_path.endswith('/')
             else checkpointed_dir_path + '/'
         )
-        self.bucket_name = bucket_name
+        self.bucket_name = bucket_name or Config.s3_bucket
         self.s3u = S3Utils(Config.connection_helper, bucket=self.bucket_name)
         self.ready_marker = checkpoint_ready_marker
 
@@ -188,4 +196,70 @@ class CheckpointManager:
             ]
         finally:
             if prefixes and advance_checkpoint:
-                self.current_checkpoint_ts = prefixes[-1].timestamp
\ No newline at end of file
+                self.current_checkpoint_ts = prefixes[-1].timestamp
+
+    @staticmethod
+    def _dir_size(path: Path) -> int:
+        return sum(p.stat().st_size for p in path.rglob('*') if p.is_file())
+
+    def prefetching_downloads(self,
+                              base_download_dir: t.Union[str, Path],
+                              advance_checkpoint: bool = False,
+                              limit: t.Optional[int] = None,
+                              max_threads: int = -1,
+                              max_staged: int = DEFAULT_MAX_STAGED_PREFIXES,
+                              min_free_bytes: int = DEFAULT_MIN_FREE_BYTES,
+                              cleanup: bool = True) -> t.Iterator[DownloadedPrefix]:
+        """Yield <n=limit> checkpointed dirs one at a time, downloading the next ones in the background
+        while the caller processes the current one. A prefix counts as processed once the caller asks
+        for the next one, so the checkpoint only ever advances past prefixes whose processing didn't raise.
+        :param base_download_dir: Local base directory where checkpointed dirs will be downloaded
+        :param advance_checkpoint: Whether or not the checkpoint file should be updated after each processed prefix
+        :param limit: max number of checkpointed dirs to download
+        :param max_threads: maximum number of threads for multithreading
+        :param max_staged: max number of downloaded dirs on disk at once, including the one being processed
+        :param min_free_bytes: don't start another download unless this much disk, plus the size of the
+            largest dir so far, is free
+        :param cleanup: delete each downloaded dir once it's processed
+        :return: DownloadedPrefix tuples, in checkpoint order
+        """
+        base_download_dir = Path(base_download_dir).resolve()
+        if not base_download_dir.is_dir():
+            raise ValueError(f"Provided base_download_dir does not exist: {base_download_dir!s}")
+
+        pending = deque(self.remaining_prefixes[:limit])
+        staged = deque()
+        largest_prefix_bytes = 0
+
+        def stage_next(executor: ThreadPoolExecutor) -> None:
+            while pending and len(staged) < max(max_staged, 1):
+                # always keep one download going, else wait for processed dirs to free up space
+                if staged and shutil.disk_usage(base_download_dir).free < min_free_bytes + largest_prefix_bytes:
+                    return
+                prefix = pending.popleft()
+                download_dir = Path(base_download_dir, Path(prefix.prefix_path).name)
+                staged.append((prefix, download_dir, executor.submit(
+                    self.pull_prefix, prefix=prefix, local_dir=download_dir, max_threads=max_threads
+                )))
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            try:
+                stage_next(executor)
+                while staged:
+                    prefix, download_dir, download = staged[0]
+                    download.result()
+                    largest_prefix_bytes = max(largest_prefix_bytes, self._dir_size(download_dir))
+                    stage_next(executor)
+
+                    yield DownloadedPrefix(local_path=download_dir, timestamped_prefix=prefix)
+
+                    if advance_checkpoint:
+                        self.current_checkpoint_ts = prefix.timestamp
+                    staged.popleft()
+                    if cleanup:
+                        shutil.rmtree(download_dir, ignore_errors=True)
+                    stage_next(executor)
+            finally:
+                # downloads that haven't started yet, a running one finishes before the executor exits
+                for _, _, download in staged:
+                    download.cancel()
@@ -1,19 +1,18 @@
 import click
-from .load.cli import load_cli
-from .checkpoint.cli import checkpoint_cli
-from .snapshot.cli import snapshot_cli
-from .db.cli import db_cli
-from .metadata.cli import metadata_cli
+from dataPipelines.gc_ingest.lazy_group import LazyGroup
 
 
-@click.group(name="tools")
+@click.group(
+    name="tools",
+    cls=LazyGroup,
+    lazy_subcommands={
+        "load": "dataPipelines.gc_ingest.tools.load.cli.load_cli",
+        "snapshot": "dataPipelines.gc_ingest.tools.snapshot.cli.snapshot_cli",
+        "checkpoint": "dataPipelines.gc_ingest.tools.checkpoint.cli.checkpoint_cli",
+        "db": "dataPipelines.gc_ingest.tools.db.cli.db_cli",
+        "metadata": "dataPipelines.gc_ingest.tools.metadata.cli.metadata_cli",
+    }
+)
 def tools_cli():
     """Run individual steps"""
     pass
-
-
-tools_cli.add_command(load_cli)
-tools_cli.add_command(snapshot_cli)
-tools_cli.add_command(checkpoint_cli)
-tools_cli.add_command(db_cli)
-tools_cli.add_command(metadata_cli)
@@ -29,13 +29,13 @@ class CoreDBManager:
 
     def __init__(self,
                  db_backup_base_prefix: str,
-                 bucket_name: str = Config.s3_bucket,
+                 bucket_name: t.Optional[str] = None,
                  **ignored_kwargs):
         """ Core orch/web table tools
         :param db_backup_base_prefix: S3 base prefix for storing/restoring db backup
-        :param bucket_name: S3 bucket name
+        :param bucket_name: S3 bucket name, defaults to the configured bucket
         """
-        self.bucket_name = bucket_name
+        self.bucket_name = bucket_name or Config.s3_bucket
         self.ch = Config.connection_helper
         self.s3u = S3Utils(ch=self.ch, bucket=self.bucket_name)
         self.db_backup_base_prefix = self.s3u.format_as_prefix(db_backup_base_prefix)
@@ -0,0 +1,57 @@
+from pathlib import Path
+import sys
+import time
+import typing as t
+
+from dataPipelines.gc_ingest.tools.load.utils import LoadManager
+from dataPipelines.gc_ingest.tools.snapshot.utils import SnapshotManager
+from dataPipelines.gc_elasticsearch_publisher.gc_elasticsearch_publisher import ConfiguredElasticsearchPublisher
+from dataPipelines.gc_neo4j_publisher.utils import Neo4jJobManager
+
+
+class DeletionEngine:
+    """Removes one list of docs from every store, each store gets batched deletes"""
+
+    def __init__(self,
+                 removal_list: t.List[Path],
+                 db_tuple_list: t.List[t.Tuple[str, str]]):
+        """
+        :param removal_list: raw doc filenames to remove from ES, Neo4j and the S3 snapshot
+        :param db_tuple_list: (filename, doc_name) pairs to remove from the db
+        """
+        self.removal_list = [Path(p) for p in removal_list]
+        self.db_tuple_list = list(db_tuple_list)
+        self.summary: t.Dict[str, t.Dict[str, t.Any]] = {}
+
+    def _run_store(self, store: str, func: t.Callable[[], t.Dict[str, t.Any]]) -> t.Dict[str, t.Any]:
+        start = time.perf_counter()
+        try:
+            result = func()
+        except Exception as e:
+            self.summary[store] = {'error': f"{type(e).__name__}: {e}", 'seconds': time.perf_counter() - start}
+            self.print_summary()
+            raise
+        self.summary[store] = {**result, 'seconds': time.perf_counter() - start}
+        return self.summary[store]
+
+    def delete_from_elasticsearch(self, index_name: str) -> t.Dict[str, t.Any]:
+        publisher = ConfiguredElasticsearchPublisher(index_name=index_name, ingest_dir="")
+        records = [p.stem for p in self.removal_list]
+        return self._run_store('elasticsearch', lambda: publisher.bulk_delete_records(records=records))
+
+    def delete_from_neo4j(self, njm: Neo4jJobManager) -> t.Dict[str, t.Any]:
+        filenames = [p.name for p in self.removal_list]
+        return self._run_store('neo4j', lambda: njm.remove_batch_from_graph(filenames=filenames))
+
+    def delete_from_db(self, lm: LoadManager) -> t.Dict[str, t.Any]:
+        return self._run_store('db', lambda: lm.remove_batch_from_db(removal_list=self.db_tuple_list))
+
+    def delete_from_s3(self, sm: SnapshotManager) -> t.Dict[str, t.Any]:
+        return self._run_store('s3', lambda: sm.delete_batch_from_current_snapshot(filenames=self.removal_list))
+
+    def print_summary(self) -> None:
+        print("Deletion summary:", file=sys.stderr)
+        for store, result in self.summary.items():
+            details = ", ".join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}"
+                                for k, v in result.items() if k != 'errors')
+            print(f"\t{store}: {details}", file=sys.stderr)
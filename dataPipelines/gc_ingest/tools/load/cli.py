@@ -111,8 +111,7 @@ def local(lm: LoadManager,
 
 
 def remove_docs_from_db(lm: LoadManager, removal_list: list):
-    for (filename, doc_name) in removal_list:
-        lm.remove_from_db(filename=filename, doc_name=doc_name)
+    return lm.remove_batch_from_db(removal_list=removal_list)
 
 
 @load_cli.command("remove-from-db")
@@ -4,11 +4,13 @@ import typing as t
 import datetime as dt
 import sys
 from sqlalchemy.exc import IntegrityError, InvalidRequestError
+import sqlalchemy as sa
 
 from dataPipelines.gc_ingest.config import Config
 from dataPipelines.gc_db_utils.orch.models import VersionedDoc, Publication
 from common.utils.s3 import S3Utils
 from common.utils.parsers import parse_timestamp
+from common.utils.metadata_catalog import get_catalog, PARSED, THUMBNAIL
 from pydantic import BaseModel
 from enum import Enum
 import multiprocessing
@@ -64,13 +66,13 @@ class LoadManager:
 
     def __init__(self,
                  load_archive_base_prefix: str,
-                 bucket_name: str = Config.s3_bucket,
+                 bucket_name: t.Optional[str] = None,
                  **ignored_kwargs):
         """Document load manager
         :param load_archive_base_prefix: base prefix for doc ingest archive
-        :param bucket_name: s3 bucket name
+        :param bucket_name: s3 bucket name, defaults to the configured bucket
         """
-        self.s3u = S3Utils(ch=Config.connection_helper, bucket=bucket_name)
+        self.s3u = S3Utils(ch=Config.connection_helper, bucket=bucket_name or Config.s3_bucket)
         self.load_archive_base_prefix = self.s3u.format_as_prefix(load_archive_base_prefix)
         Config.connection_helper.init_dbs()
 
@@ -172,46 +174,54 @@ class LoadManager:
         parsed_dir = Path(parsed_dir).resolve() if parsed_dir else None
         thumbnail_dir = Path(thumbnail_dir).resolve() if thumbnail_dir else None
 
+        # one incremental scan per directory, the per doc lookups below are catalog queries
+        catalog = get_catalog()
+        for d in {raw_dir, metadata_dir, parsed_dir, thumbnail_dir} - {None}:
+            catalog.refresh(d)
+
         def _get_corresponding_metadata_idoc(raw_doc: Path, metadata_dir: t.Optional[Path]) -> t.Optional[IngestableMetadataDoc]:
             if not metadata_dir:
                 return None
 
-            local_path = Path(metadata_dir, self.get_metadata_filename(raw_doc))
-            if not local_path.is_file():
+            entry = catalog.find_metadata(metadata_dir, raw_doc.name)
+            if not entry:
                 return None
 
+            local_path = Path(entry.path)
             return IngestableMetadataDoc(
                 local_path=local_path,
-                metadata=json.load(local_path.open("r"))
+                # unreadable metadata is re-read so it fails the way it always has
+                metadata=entry.get_metadata() if entry.metadata is not None else json.load(local_path.open("r"))
             )
 
         def _get_corresponding_parsed_idoc(raw_doc: Path, parsed_dir: t.Optional[Path]) -> t.Optional[IngestableParsedDoc]:
             if not parsed_dir:
                 return None
 
-            local_path = Path(parsed_dir, self.get_parsed_filename(raw_doc))
-            if not local_path.is_file():
+            # parsers may have written it compressed (.json.gz/.json.zst)
+            entry = catalog.find_sibling(parsed_dir, raw_doc.stem, PARSED)
+            if not entry:
                 return None
 
             return IngestableParsedDoc(
-                local_path=local_path
+                local_path=Path(entry.path)
             )
 
         def _get_corresponding_thumbnail_idoc(raw_doc: Path, thumbnail_dir: t.Optional[Path]) -> t.Optional[IngestableThumbnailDoc]:
             if not thumbnail_dir:
                 return None
 
-            local_path = Path(thumbnail_dir, self.get_thumbnail_filename(raw_doc))
-            if not local_path.is_file():
+            entry = catalog.find_sibling(thumbnail_dir, raw_doc.stem, THUMBNAIL)
+            if not entry:
                 return None
 
             return IngestableThumbnailDoc(
-                local_path=local_path
+                local_path=Path(entry.path)
             )
 
         for raw_doc_path in (
-                p for p in raw_dir.iterdir()
-                if p.is_file() and p.suffix.lower() in self.SUPPORTED_RAW_DOC_EXTENSIONS):
+                Path(e.path) for e in catalog.files(raw_dir)
+                if Path(e.name).suffix.lower() in self.SUPPORTED_RAW_DOC_EXTENSIONS):
 
             yield IngestableDocGroup(
                 raw_idoc=IngestableRawDoc(local_path=raw_doc_path),
@@ -387,4 +397,82 @@ class LoadManager:
                           " still has Versioned_Docs constrained to the pub_id.")
                     session.rollback()
                 finally:
-                    session.close()
\ No newline at end of file
+                    session.close()
+
+    def remove_batch_from_db(self,
+                             removal_list: t.Iterable[t.Tuple[t.Union[str, Path], str]],
+                             batch_size: int = 1000) -> t.Dict[str, int]:
+        """Remove versioned docs/publications for many (filename, doc_name) pairs in one session
+
+        Same rules as remove_from_db: versioned docs are matched on filename (or doc_name if there's
+        no filename) and only removed when their publication exists, publications are only removed
+        once no versioned docs reference them anymore.
+        :return: summary of requested/deleted/missing counts
+        """
+        removal_list = [(str(filename) if filename else "", doc_name) for (filename, doc_name) in removal_list]
+        summary = {'requested': len(removal_list), 'versioned_docs_deleted': 0, 'publications_deleted': 0,
+                   'missing': 0}
+
+        with Config.connection_helper.orch_db_session_scope('rw') as session:
+            for i in range(0, len(removal_list), batch_size):
+                chunk = removal_list[i:i + batch_size]
+                doc_names = {doc_name for (_, doc_name) in chunk}
+                pub_ids_by_name = dict(
+                    session.query(Publication.name, Publication.id).filter(Publication.name.in_(doc_names)).all()
+                )
+
+                by_filename = {filename: doc_name for (filename, doc_name) in chunk
+                               if filename and doc_name in pub_ids_by_name}
+                by_name = {doc_name for (filename, doc_name) in chunk
+                           if not filename and doc_name in pub_ids_by_name}
+
+                matched = session.query(VersionedDoc.id, VersionedDoc.filename, VersionedDoc.name).filter(sa.or_(
+                    VersionedDoc.filename.in_(by_filename.keys()),
+                    VersionedDoc.name.in_(by_name)
+                )).all()
+
+                vd_ids = []
+                pub_ids = set()
+                matched_filenames, matched_names = set(), set()
+                for (vd_id, vd_filename, vd_name) in matched:
+                    vd_ids.append(vd_id)
+                    if vd_filename in by_filename:
+                        matched_filenames.add(vd_filename)
+                    if vd_name in by_name:
+                        matched_names.add(vd_name)
+                    doc_name = by_filename.get(vd_filename) or (vd_name if vd_name in by_name else None)
+                    if doc_name:
+                        pub_ids.add(pub_ids_by_name[doc_name])
+
+                # requested entries without a versioned doc, several can share one publication
+                summary['missing'] += sum(
+                    1 for (filename, doc_name) in chunk
+                    if not (filename in matched_filenames if filename else doc_name in matched_names)
+                )
+                if not vd_ids:
+                    continue
+
+                print(f"Deleting {len(vd_ids)} entries from versioned_docs", file=sys.stderr)
+                summary['versioned_docs_deleted'] += session.query(VersionedDoc).filter(
+                    VersionedDoc.id.in_(vd_ids)
+                ).delete(synchronize_session=False)
+                session.commit()
+
+                # pubs that still have other versioned docs pointing at them stay
+                unreferenced_pub_ids = [
+                    pub_id for (pub_id,) in session.query(Publication.id).filter(
+                        Publication.id.in_(pub_ids),
+                        ~sa.exists().where(VersionedDoc.pub_id == Publication.id)
+                    ).all()
+                ]
+                if len(unreferenced_pub_ids) < len(pub_ids):
+                    print(f"{len(pub_ids) - len(unreferenced_pub_ids)} publications still have versioned_docs "
+                          f"constrained to them and were not deleted", file=sys.stderr)
+                if unreferenced_pub_ids:
+                    print(f"Deleting {len(unreferenced_pub_ids)} entries from publications", file=sys.stderr)
+                    summary['publications_deleted'] += session.query(Publication).filter(
+                        Publication.id.in_(unreferenced_pub_ids)
+                    ).delete(synchronize_session=False)
+                    session.commit()
+
+        return summary
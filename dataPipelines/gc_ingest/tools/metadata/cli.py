@@ -1,6 +1,5 @@
 import click
 from .metadata import create_metadata_from_manifest
-import pandas as pd
 import typing as t
 from dataPipelines.gc_ingest.config import Config
 from dataPipelines.gc_ingest.common_cli_options import pass_bucket_name_option
@@ -29,6 +28,7 @@ def metadata_cli(manifest: str, local_dir: str):
     input = Path(local_dir, manifest).resolve()
     if not input.exists():
         return
+    import pandas as pd
     df = pd.read_csv(input)
     insert_manifest = df[df['Process']=="Insert"].to_dict()
     create_metadata_from_manifest(manifest_dict=insert_manifest, output_dir=output)
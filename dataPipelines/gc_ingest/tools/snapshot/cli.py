@@ -165,8 +165,7 @@ def recreate_web_snapshot(sm: SnapshotManager):
 
 def remove_docs_from_current_snapshot(sm: SnapshotManager, removal_list: list ):
 
-    for filename in removal_list:
-        sm.delete_from_current_snapshot(filename=filename)
+    return sm.delete_batch_from_current_snapshot(filenames=removal_list)
 
 @snapshot_cli.command()
 @pass_sm
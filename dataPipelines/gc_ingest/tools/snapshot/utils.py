@@ -3,6 +3,7 @@ import json
 import sys
 from common.utils.s3 import S3Utils
 from common.utils.parsers import parse_timestamp
+from common.utils.parsed_json import PARSED_JSON_SUFFIXES
 import typing as t
 import datetime as dt
 import shutil
@@ -26,15 +27,15 @@ class SnapshotManager:
     def __init__(self,
                  current_doc_snapshot_prefix: str,
                  backup_doc_snapshot_prefix: str,
-                 bucket_name: str = Config.s3_bucket,
+                 bucket_name: t.Optional[str] = None,
                  **ignored_kwargs):
         """Utils for managing raw/parsed data snapshots
         :param current_doc_snapshot_prefix: S3 prefix to where raw/parsed doc prefixes are located
         :param backup_doc_snapshot_prefix: S3 prefix to where backup raw/parsed doc prefixes are located
-        :param bucket_name: S3 bucket name
+        :param bucket_name: S3 bucket name, defaults to the configured bucket
         """
         self.s3u = S3Utils(ch=Config.connection_helper, bucket=Config.s3_bucket)
-        self.bucket_name = bucket_name
+        self.bucket_name = bucket_name or Config.s3_bucket
         self.current_doc_snapshot_prefix = self.s3u.format_as_prefix(current_doc_snapshot_prefix)
         self.backup_doc_snapshot_prefix = self.s3u.format_as_prefix(backup_doc_snapshot_prefix)
         Config.connection_helper.init_dbs()
@@ -270,16 +271,47 @@ class SnapshotManager:
         print(f"Deleting {metadata_path!s} from S3 bucket {self.bucket_name!s} ... ", file=sys.stderr)
         self.s3u.delete_object(object_path=metadata_path, bucket=self.bucket_name)
 
-        # Delete parsed file from s3
-        parsed_filename = Path(filename.stem + ".json")
-        parsed_path = self.s3u.path_join(self.get_current_prefix(SnapshotType.PARSED),
-                                         parsed_filename.name)
-        print(f"Deleting {parsed_path!s} from S3 bucket {self.bucket_name!s} ... ", file=sys.stderr)
-        self.s3u.delete_object(object_path=parsed_path, bucket=self.bucket_name)
+        # Delete parsed file from s3, in whichever form (plain or compressed) it was uploaded
+        for suffix in PARSED_JSON_SUFFIXES:
+            parsed_path = self.s3u.path_join(self.get_current_prefix(SnapshotType.PARSED),
+                                             filename.stem + suffix)
+            print(f"Deleting {parsed_path!s} from S3 bucket {self.bucket_name!s} ... ", file=sys.stderr)
+            self.s3u.delete_object(object_path=parsed_path, bucket=self.bucket_name)
 
         # Delete thumbnail file from s3
         thumbnail_filename = Path(filename.stem + ".png")
         thumbnail_path = self.s3u.path_join(self.get_current_prefix(SnapshotType.THUMBNAIL),
                                             thumbnail_filename.name)
         print(f"Deleting {thumbnail_path!s} from S3 bucket {self.bucket_name!s} ... ", file=sys.stderr)
-        self.s3u.delete_object(object_path=thumbnail_path, bucket=self.bucket_name)
\ No newline at end of file
+        self.s3u.delete_object(object_path=thumbnail_path, bucket=self.bucket_name)
+
+    def get_current_snapshot_paths(self, filename: t.Union[str, Path]) -> t.List[str]:
+        """S3 paths of the raw, metadata, parsed and thumbnail files for a doc in the current snapshot,
+        the parsed json under every suffix it may have been uploaded with (plain or compressed)"""
+        filename = Path(filename)
+        return [
+            self.s3u.path_join(self.get_current_prefix(SnapshotType.RAW), filename.name),
+            self.s3u.path_join(self.get_current_prefix(SnapshotType.RAW), filename.name + ".metadata"),
+            *(self.s3u.path_join(self.get_current_prefix(SnapshotType.PARSED), filename.stem + suffix)
+              for suffix in PARSED_JSON_SUFFIXES),
+            self.s3u.path_join(self.get_current_prefix(SnapshotType.THUMBNAIL), filename.stem + ".png"),
+        ]
+
+    def delete_batch_from_current_snapshot(self, filenames: t.Iterable[t.Union[str, Path]]) -> t.Dict[str, t.Any]:
+        """Delete raw/metadata/parsed/thumbnail files for all given docs with batched DeleteObjects calls
+        :param filenames: raw doc filenames
+        :return: summary of requested/deleted/failed object counts and the errors returned by s3
+        """
+        object_paths = [path for filename in filenames for path in self.get_current_snapshot_paths(filename)]
+        print(f"Deleting {len(object_paths)} objects from S3 bucket {self.bucket_name!s} ... ", file=sys.stderr)
+        deleted, errors = self.s3u.delete_objects(object_paths=object_paths, bucket=self.bucket_name)
+        for error in errors:
+            print(f"Failed deleting {error.get('Key')!s} from S3: {error.get('Code')} {error.get('Message')}",
+                  file=sys.stderr)
+
+        return {
+            'requested': len(object_paths),
+            'deleted': len(deleted),
+            'failed': len(errors),
+            'errors': errors
+        }
@@ -1,10 +1,10 @@
 from pathlib import Path
-import filetype
 import typing as t
 import json
 from datetime import datetime
 from hashlib import sha256
 from functools import reduce
+from common.utils.metadata_catalog import get_catalog, RAW, METADATA
 
 def str_to_sha256_hex_digest(_str: str) -> str:
     """Converts string to sha256 hex digest"""
@@ -32,12 +32,12 @@ class ManualMetadata:
     def __init__(self, input_directory, document_group):
         self.input_directory = input_directory
         self.document_group = document_group
-        p = Path(self.input_directory).glob("**/*")
-        self.files = [x for x in p if x.is_file() and (x.suffix.lower() in (".pdf", ".html", ".txt")
-                                                       or (filetype.guess(str(x)) is not None and (
-                                                           filetype.guess(str(x)).mime == "pdf" or filetype.guess(str(x)).mime == "application/pdf")))]
-        self.metadata_files = [Path(x).stem for x in p if x.is_file() and filetype.guess(str(x)) is not None and (
-            filetype.guess(str(x)).mime == "metadata")]
+        # file types and existing metadata come from the catalog, only new/changed files are sniffed
+        catalog = get_catalog()
+        catalog.refresh(self.input_directory, recursive=True)
+        self.files = [Path(e.path) for e in catalog.files(self.input_directory, kind=RAW, recursive=True)]
+        self.metadata_files = [Path(e.base_name).stem
+                               for e in catalog.files(self.input_directory, kind=METADATA, recursive=True)]
 
     def create_document(self, file) -> t.Optional[t.Dict[str, t.Any]]:
         doc = None
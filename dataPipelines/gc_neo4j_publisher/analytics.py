@@ -0,0 +1,74 @@
+"""Choosing between incremental and full graph analytics runs
+
+Documents written by the publisher are flagged with PENDING_PROPERTY. Incremental runs only
+place those documents in the existing embedding/similarity/community structure, full runs
+recompute node2vec, similarity, communities and betweenness over the whole graph. Full runs
+happen on a schedule or once enough of the graph changed since the last one.
+"""
+import time
+import typing as t
+
+import numpy as np
+
+AUTO = 'auto'
+FULL = 'full'
+INCREMENTAL = 'incremental'
+ANALYTICS_MODES = (AUTO, FULL, INCREMENTAL)
+
+# Document property set on every write, cleared once analytics have accounted for it
+PENDING_PROPERTY = 'analytics_pending'
+# name of the (:AnalyticsState) node tracking the last full recompute
+STATE_NAME = 'graph_analytics'
+
+DEFAULT_FULL_RECOMPUTE_DAYS = 7.0
+# share of all Documents changed since the last full recompute that triggers the next one
+DEFAULT_FULL_RECOMPUTE_FRACTION = 0.1
+
+# relationships node2vec walks, incremental vectors are built from the same neighborhood
+EMBEDDING_RELATIONSHIPS = ['REFERENCES', 'REFERENCES_UKN', 'CHILD_OF', 'CONTAINS', 'MENTIONS', 'IS_IN', 'HAS_HEAD',
+                           'HAS_ROLE', 'TYPE_OF']
+# relationships of the recGraph projection communities are computed on
+COMMUNITY_RELATIONSHIPS = ['REFERENCES', 'MENTIONS', 'IS_IN', 'CONTAINS', 'CHILD_OF']
+COMMUNITY_PROPERTIES = ['louvain_community', 'lp_community']
+
+
+class AnalyticsState(t.NamedTuple):
+    last_full_run: t.Optional[float]
+    changes_since_full: int
+
+
+def choose_mode(requested: str,
+                pending_docs: int,
+                total_docs: int,
+                state: AnalyticsState,
+                full_every_days: float = DEFAULT_FULL_RECOMPUTE_DAYS,
+                full_fraction: float = DEFAULT_FULL_RECOMPUTE_FRACTION,
+                now: t.Optional[float] = None) -> str:
+    """
+    FULL or INCREMENTAL, for AUTO: full when there never was a full run, the last one is older
+    than full_every_days, or the Documents changed since then reach full_fraction of the graph
+    :param requested: one of ANALYTICS_MODES
+    :param pending_docs: Documents changed since the last analytics run
+    :param total_docs: all Documents
+    :param state: what the graph's AnalyticsState node recorded
+    """
+    if requested not in ANALYTICS_MODES:
+        raise ValueError(f"Invalid analytics mode: {requested}, expected one of {', '.join(ANALYTICS_MODES)}")
+    if requested != AUTO:
+        return requested
+
+    now = time.time() if now is None else now
+    if state.last_full_run is None or now - state.last_full_run >= full_every_days * 24 * 60 * 60:
+        return FULL
+    if total_docs and (state.changes_since_full + pending_docs) / total_docs >= full_fraction:
+        return FULL
+    return INCREMENTAL
+
+
+def mean_unit_vector(vectors: t.Sequence[t.Sequence[float]]) -> t.Optional[t.List[float]]:
+    """Normalized mean of the neighbors' embeddings, None without any"""
+    if not len(vectors):
+        return None
+    mean = np.mean(np.asarray(vectors, dtype=np.float32), axis=0)
+    norm = np.linalg.norm(mean)
+    return (mean / norm if norm else mean).tolist()
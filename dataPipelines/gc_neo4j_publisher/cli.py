@@ -1,6 +1,8 @@
 import click
 from .utils import Neo4jJobManager
 from .utils import only_write_infobox
+from .similarity import DEFAULT_TOP_K, DEFAULT_CUTOFF
+from .analytics import ANALYTICS_MODES, AUTO, DEFAULT_FULL_RECOMPUTE_DAYS, DEFAULT_FULL_RECOMPUTE_FRACTION
 from pathlib import Path
 import json
 
@@ -61,20 +63,57 @@ def scrape(csv_file_path: str, infobox_dir: str) -> None:
     type=click.Path(resolve_path=True, exists=True, dir_okay=True, file_okay=False),
     required=False
 )
+@click.option(
+    '--similarity-top-k',
+    help='SIMILAR_TO relationships kept per document, 0 keeps every pair above the cutoff',
+    type=int,
+    default=DEFAULT_TOP_K
+)
+@click.option(
+    '--similarity-cutoff',
+    help='Minimum cosine similarity between the node2vec embeddings of SIMILAR_TO documents',
+    type=float,
+    default=DEFAULT_CUTOFF
+)
+@click.option(
+    '--analytics',
+    help='Graph analytics to run after the update: full recompute, incremental (only place changed documents) '
+         'or auto (incremental unless a full recompute is due)',
+    type=click.Choice(ANALYTICS_MODES),
+    default=AUTO
+)
+@click.option(
+    '--full-recompute-days',
+    help='With auto analytics, run a full recompute when the last one is older than this many days',
+    type=float,
+    default=DEFAULT_FULL_RECOMPUTE_DAYS
+)
+@click.option(
+    '--full-recompute-fraction',
+    help='With auto analytics, run a full recompute once this share of documents changed since the last one',
+    type=float,
+    default=DEFAULT_FULL_RECOMPUTE_FRACTION
+)
 @pass_njm
-def run(njm: Neo4jJobManager, source: str, clear: bool, max_threads: int, without_web_scraping: bool, infobox_dir: str) -> None:
+def run(njm: Neo4jJobManager, source: str, clear: bool, max_threads: int, without_web_scraping: bool, infobox_dir: str,
+        similarity_top_k: int, similarity_cutoff: float, analytics: str, full_recompute_days: float,
+        full_recompute_fraction: float) -> None:
     njm.run_update(
         source=source,
         clear=clear,
         max_threads=max_threads,
         without_web_scraping=without_web_scraping,
         scrape_wiki=(without_web_scraping == False),
-        infobox_dir=infobox_dir
+        infobox_dir=infobox_dir,
+        similarity_top_k=similarity_top_k,
+        similarity_cutoff=similarity_cutoff,
+        analytics=analytics,
+        full_recompute_days=full_recompute_days,
+        full_recompute_fraction=full_recompute_fraction
     )
 
 def remove_docs_from_neo4j(njm: Neo4jJobManager, removal_list: list):
-    for filename in removal_list:
-        njm.remove_from_graph(filename=filename.name)
+    return njm.remove_batch_from_graph(filenames=[filename.name for filename in removal_list])
 
 
 
@@ -0,0 +1,64 @@
+"""Bounded memo of raw entity mention -> resolved entity name
+
+The same few thousand entity strings repeat across every paragraph of every document, so
+normalizing them and expanding abbreviations once per distinct string saves most of the work.
+The cache is a plain object so it travels with the publisher into worker processes, where
+each worker keeps its own copy and reports its stats back when done.
+"""
+import typing as t
+from collections import OrderedDict
+
+DEFAULT_MAXSIZE = 200000
+
+
+class EntityCache:
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str, compute: t.Callable[[str], str]) -> str:
+        """Cached value for key, computed (and evicting the least recently used entry if full) on a miss"""
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            value = compute(key)
+            self._data[key] = value
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return value
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def prewarm(self, keys: t.Iterable[str], compute: t.Callable[[str], str]) -> None:
+        """Fill in keys without counting them as hits or misses"""
+        for key in keys:
+            if key not in self._data:
+                self._data[key] = compute(key)
+                if len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> t.Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+
+def merge_stats(stats: t.Iterable[t.Dict[str, int]]) -> t.Dict[str, float]:
+    """Totals of several caches' stats (e.g. one per worker) with the overall hit rate"""
+    merged = {"hits": 0, "misses": 0, "size": 0}
+    for s in stats:
+        for key in merged:
+            merged[key] += s.get(key, 0)
+    lookups = merged["hits"] + merged["misses"]
+    merged["hit_rate"] = merged["hits"] / lookups if lookups else 0.0
+    return merged
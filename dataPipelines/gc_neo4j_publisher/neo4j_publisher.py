@@ -8,7 +8,7 @@ from pathlib import Path
 import pandas as pd
 from joblib._multiprocessing_helpers import mp
 from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from gamechangerml.src.featurization.abbreviation import expand_abbreviations_no_context
 from gamechangerml.src.featurization.responsibilities import get_responsibilities
@@ -16,8 +16,11 @@ from dataPipelines.gc_neo4j_publisher.config import Config
 from dataPipelines.gc_neo4j_publisher import wiki_utils as wu
 from neo4j import exceptions
 import common.utils.text_utils as tu
+from common.utils.parsed_json import is_parsed_json, load_parsed_json
 import re
 from .config import Config as MainConfig
+from .analytics import PENDING_PROPERTY
+from .entity_cache import EntityCache
 from functools import lru_cache
 
 
@@ -113,60 +116,119 @@ def process_query(query: str, parameters: t.Dict[str, t.Any] = None, **kwparamet
                 print("Error with query: {0}. Error: {1}".format(query, e))
 
 
+# errors worth retrying a chunk for: deadlocks, leader switches, dropped connections
+RETRYABLE_ERRORS = (exceptions.TransientError, exceptions.ServiceUnavailable, exceptions.SessionExpired)
+
+
+def _run_unwind_chunk(query: str, chunk: t.List[t.Any], max_retries: int, backoff: float) -> int:
+    for attempt in range(max_retries + 1):
+        try:
+            with MainConfig.connection_helper.neo4j_session_scope() as session:
+                record = session.run(query, rows=chunk).single()
+                return record["count"] if record else 0
+        except RETRYABLE_ERRORS:
+            if attempt == max_retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+
+def run_unwind_batches(query: str,
+                       rows: t.Sequence[t.Any],
+                       batch_size: int = 1000,
+                       max_workers: int = 4,
+                       max_retries: int = 5,
+                       backoff: float = 0.5) -> t.Dict[str, t.Any]:
+    """
+    Run an UNWIND $rows query once per chunk of rows, chunks in parallel over pooled sessions
+    and each retried with exponential backoff on transient errors
+    :param query: cypher taking the chunk as $rows and returning a single count(...) AS count
+    :param rows: parameters, one per UNWIND row
+    :return: {'batches': chunks run, 'count': sum of counts, 'errors': chunks that failed for good}
+    """
+    chunks = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+    summary = {'batches': len(chunks), 'count': 0, 'errors': []}
+    if not chunks:
+        return summary
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as ex:
+        futures = {ex.submit(_run_unwind_chunk, query, list(chunk), max_retries, backoff): i
+                   for i, chunk in enumerate(chunks)}
+        for future in as_completed(futures):
+            try:
+                summary['count'] += future.result()
+            except Exception as e:
+                i = futures[future]
+                summary['errors'].append(f"rows {i * batch_size}-{i * batch_size + len(chunks[i]) - 1}: {e}")
+                print(f"Error with batch query: {query}. Error: {e}", file=sys.stderr)
+    return summary
+
+
 class Neo4jPublisher:
+    # hierarchy nodes/relationships resolved and written per UNWIND statement
+    HIERARCHY_BATCH_SIZE = 1000
+
     def __init__(self):
         self.entEntRelationsStmt = []
         self.verified_entities_list, self.alias_mapping_dict = get_all_entities_and_aliases()
+        # upper cased name -> first verified entity with that name
+        self.verified_entities_upper = {
+            ent.upper(): ent for ent in reversed(self.verified_entities_list) if isinstance(ent, str)
+        }
         self.crowdsourcedEnts = set()
-
-    def process_json(self, filepath: str, q: mp.Queue) -> str:
-        with open(filepath) as f:
-            j = json.load(f)
-            o = {}
-
-            o["id"] = j.get("id", "")
-            o["doc_num"] = j.get("doc_num", "")
-            o["doc_type"] = j.get("doc_type", "")
-            o["display_title_s"] = j.get("display_title_s", "")
-            o["display_org_s"] = j.get("display_org_s", "")
-            o["display_doc_type_s"] = j.get("display_doc_type_s", "")
-            o["ref_list"] = [s.replace("'", '\"') for s in j.get("ref_list", [])]
-            o["access_timestamp_dt"] = j.get("access_timestamp_dt", "")
-            o["publication_date_dt"] = (j.get("publication_date_dt", "") or "")
-            o["crawler_used_s"] = j.get("crawler_used_s", "")
-            o["source_fqdn_s"] = j.get("source_fqdn_s", "")
-            o["source_page_url_s"] = j.get("source_page_url_s", "")
-            o["download_url_s"] = j.get("download_url_s", '')
-            o["cac_login_required_b"] = j.get("cac_login_required_b", False)
-            o["title"] = j.get("title", "").replace('"', "\'")
-            o["keyw_5"] = [s.encode('ascii', 'ignore').decode('utf-8') for s in j.get("keyw_5", [])]
-            o["filename"] = j.get("filename", "")
-            o["summary_30"] = j.get("summary_30", "")
-            o["type"] = j.get("type", "")
-            o["page_count"] = j.get("page_count", 0)
-            o["topics_rs"] = j.get("topics_s", [])
-            o["init_date"] = j.get("init_date", "")
-            o["change_date"] = j.get("change_date", "")
-            o["author"] = j.get("author", "")
-            o["signature"] = j.get("signature", "")
-            o["subject"] = j.get("subject", "")
-            o["classification"] = j.get("classification", "")
-            o["group_s"] = j.get("group_s", "")
-            o["pagerank_r"] = j.get("pagerank_r", 0)
-            o["kw_doc_score_r"] = j.get("kw_doc_score_r", 0)
-            o["version_hash_s"] = j.get("version_hash_s", "")
-            o["is_revoked_b"] = j.get("is_revoked_b", False)
-            o["entities"] = self.process_entity_list(j, "entities")
-            o["orgs"] = self.process_entity_list(j, "orgs")
-            o["roles"] = self.process_entity_list(j, "roles")
-            process_query('CALL policy.createDocumentNodesFromJson(' + json.dumps(json.dumps(o)) + ')')
-
-            # # TODO responsibilities
-            # text = j["text"]
-            # self.process_responsibilities(text)
-
-            # TODO paragraphs
-            # self.process_paragraphs(j, doc_id)
+        self.entity_cache = EntityCache()
+
+    # pending flags set per UNWIND statement once a worker's files are written
+    PENDING_BATCH_SIZE = 1000
+
+    def process_json(self, filepath: str, q: mp.Queue, pending_filenames: t.Optional[t.List[str]] = None) -> str:
+        j = load_parsed_json(filepath)
+        o = {}
+
+        o["id"] = j.get("id", "")
+        o["doc_num"] = j.get("doc_num", "")
+        o["doc_type"] = j.get("doc_type", "")
+        o["display_title_s"] = j.get("display_title_s", "")
+        o["display_org_s"] = j.get("display_org_s", "")
+        o["display_doc_type_s"] = j.get("display_doc_type_s", "")
+        o["ref_list"] = [s.replace("'", '\"') for s in j.get("ref_list", [])]
+        o["access_timestamp_dt"] = j.get("access_timestamp_dt", "")
+        o["publication_date_dt"] = (j.get("publication_date_dt", "") or "")
+        o["crawler_used_s"] = j.get("crawler_used_s", "")
+        o["source_fqdn_s"] = j.get("source_fqdn_s", "")
+        o["source_page_url_s"] = j.get("source_page_url_s", "")
+        o["download_url_s"] = j.get("download_url_s", '')
+        o["cac_login_required_b"] = j.get("cac_login_required_b", False)
+        o["title"] = j.get("title", "").replace('"', "\'")
+        o["keyw_5"] = [s.encode('ascii', 'ignore').decode('utf-8') for s in j.get("keyw_5", [])]
+        o["filename"] = j.get("filename", "")
+        o["summary_30"] = j.get("summary_30", "")
+        o["type"] = j.get("type", "")
+        o["page_count"] = j.get("page_count", 0)
+        o["topics_rs"] = j.get("topics_s", [])
+        o["init_date"] = j.get("init_date", "")
+        o["change_date"] = j.get("change_date", "")
+        o["author"] = j.get("author", "")
+        o["signature"] = j.get("signature", "")
+        o["subject"] = j.get("subject", "")
+        o["classification"] = j.get("classification", "")
+        o["group_s"] = j.get("group_s", "")
+        o["pagerank_r"] = j.get("pagerank_r", 0)
+        o["kw_doc_score_r"] = j.get("kw_doc_score_r", 0)
+        o["version_hash_s"] = j.get("version_hash_s", "")
+        o["is_revoked_b"] = j.get("is_revoked_b", False)
+        o["entities"] = self.process_entity_list(j, "entities")
+        o["orgs"] = self.process_entity_list(j, "orgs")
+        o["roles"] = self.process_entity_list(j, "roles")
+        process_query('CALL policy.createDocumentNodesFromJson(' + json.dumps(json.dumps(o)) + ')')
+        if pending_filenames is not None:
+            pending_filenames.append(o["filename"])
+
+        # # TODO responsibilities
+        # text = j["text"]
+        # self.process_responsibilities(text)
+
+        # TODO paragraphs
+        # self.process_paragraphs(j, doc_id)
 
         q.put(1)
         return id
@@ -232,8 +294,8 @@ class Neo4jPublisher:
                 types = list(entities.keys())
                 for type in types:
                     entity_list = entities[type]
-                    for ent in (self._normalize_string(e) for e in entity_list):
-                        ans = self.filter_ents(ent)
+                    for ent in entity_list:
+                        ans = self.resolve_entity(ent)
                         if len(ans) > 0:
                             if ans not in entity_dict:
                                 entity_dict[ans] = []
@@ -265,6 +327,8 @@ class Neo4jPublisher:
                 upper_set.add(new_ent.upper())
                 processed_set.add(new_ent)
         self.crowdsourcedEnts = processed_set
+        # resolutions made before depended on the old crowdsourced entities
+        self.entity_cache.clear()
 
     def process_orgs(self) -> None:
         orgs_df = get_orgs_df()
@@ -319,66 +383,115 @@ class Neo4jPublisher:
 
         all_hierarchy_nodes, authority_relationships = self._get_nodes_and_relations(hierarchy_dict)
 
+        # names and aliases are both resolved through indexes: Entity.name and Alias.name
+        self.sync_entity_aliases()
+
         # check to see if the nodes are currently in the graph, for those that aren't (e.g., `United States Constitution`)
         # create a new node for those
         hierarchy_nodes_created = 0
-        for hierarchy_node in all_hierarchy_nodes:
-            match_cypher = "OPTIONAL MATCH (n:Entity) " \
-                           "WHERE n.name='" + hierarchy_node + "' OR '" + hierarchy_node + "' in split(n.aliases,';') "\
-                           "RETURN n IS NOT NULL AS Exists"
-            # result = process_query(match_cypher)
-
-            # create the node if the match_cypher above does not match on an existing node
-            if not process_query(match_cypher)[0]['Exists']:
-                create_cypher = "CREATE (n:Entity {name: '" + hierarchy_node + "'})"
-                process_query(create_cypher)
-                hierarchy_nodes_created += 1
+        for batch in self._batches(all_hierarchy_nodes, self.HIERARCHY_BATCH_SIZE):
+            result = process_query(
+                "UNWIND $names AS name "
+                "OPTIONAL MATCH (n:Entity {name: name}) "
+                "OPTIONAL MATCH (:Alias {name: name})-[:ALIAS_OF]->(m:Entity) "
+                "WITH name, count(n) + count(m) AS matches "
+                "WHERE matches = 0 "
+                "CREATE (:Entity {name: name}) "
+                "RETURN count(*) AS created",
+                {"names": batch})
+            hierarchy_nodes_created += result[0]["created"]
         print(f"Inserted {hierarchy_nodes_created} hierarchy nodes (entity node type)")
 
-        cypher_list = []
-        for authority, subordinate in authority_relationships:
-            # list join is to trying to find a way to make it more readable in code
-            cypher_parts = [
-                "MATCH (a:Entity), (b:Entity)",
-                f"WHERE (a.name = '{authority}' OR '{authority}' in split(a.aliases, ';')) AND (b.name = '{subordinate}' OR '{subordinate}' in split(b.aliases, ';'))",
-                "MERGE (a)-[r:HAS_AUTHORITY_OVER]->(b)"]
+        print(f"Inserting {len(authority_relationships)} hierarchy relationships ...")
 
-            cypher_string = " ".join(cypher_parts)
-            cypher_list.append(cypher_string)
+        # an authority/subordinate matches every entity named or aliased that way
+        for batch in self._batches(authority_relationships, self.HIERARCHY_BATCH_SIZE):
+            process_query(
+                "UNWIND $relationships AS rel "
+                "OPTIONAL MATCH (a1:Entity {name: rel.authority}) "
+                "OPTIONAL MATCH (:Alias {name: rel.authority})-[:ALIAS_OF]->(a2:Entity) "
+                "WITH rel, collect(a1) + collect(a2) AS authorities "
+                "OPTIONAL MATCH (b1:Entity {name: rel.subordinate}) "
+                "OPTIONAL MATCH (:Alias {name: rel.subordinate})-[:ALIAS_OF]->(b2:Entity) "
+                "WITH rel, authorities, collect(b1) + collect(b2) AS subordinates "
+                "UNWIND authorities AS a "
+                "UNWIND subordinates AS b "
+                "WITH DISTINCT a, b "
+                "MERGE (a)-[:HAS_AUTHORITY_OVER]->(b)",
+                {"relationships": [{"authority": a, "subordinate": s} for a, s in batch]})
 
-        print(f"Inserting {len(cypher_list)} hierarchy relationships ...")
+    @staticmethod
+    def sync_entity_aliases() -> None:
+        """
+        Rebuild (:Alias {name})-[:ALIAS_OF]->(:Entity) from the ';' delimited Entity.aliases strings,
+        so alias lookups hit the unique_aliases index instead of splitting every entity's aliases
+        """
+        process_query("CREATE CONSTRAINT unique_aliases IF NOT EXISTS ON (a:Alias) ASSERT a.name IS UNIQUE")
+        process_query("MATCH (a:Alias) DETACH DELETE a")
+        process_query(
+            "MATCH (n:Entity) WHERE n.aliases IS NOT NULL "
+            "UNWIND split(n.aliases, ';') AS alias "
+            "WITH n, alias WHERE alias <> '' "
+            "MERGE (a:Alias {name: alias}) "
+            "MERGE (a)-[:ALIAS_OF]->(n)")
 
-        # Execute all of the `HAS_AUTHORITY_OVER` cypher commands
-        for cypher in cypher_list:
-            process_query(cypher)
+    @staticmethod
+    def _batches(items: t.List[t.Any], batch_size: int) -> t.Iterable[t.List[t.Any]]:
+        for i in range(0, len(items), batch_size):
+            yield items[i:i + batch_size]
 
     def process_dir(self, files: t.List[str], file_dir: str, q: mp.Queue, max_threads: int) -> None:
         if not files:
             return
 
+        pending_filenames = []
         with ThreadPoolExecutor(max_workers=min(max_threads, 16)) as ex:
             futures = []
             for filename in files:
                 try:
-                    if filename.endswith('.json'):
-                        futures.append(ex.submit(self.process_json(os.path.join(file_dir, filename), q)))
+                    if is_parsed_json(filename):
+                        futures.append(ex.submit(self.process_json(os.path.join(file_dir, filename), q,
+                                                                   pending_filenames)))
                 except Exception as err:
                     print('RuntimeError in: ' + filename + ' Error: ' + str(err), file=sys.stderr)
                     q.put(1)
+        self.flag_pending_analytics(pending_filenames)
         return
 
+    def flag_pending_analytics(self, filenames: t.List[str]) -> None:
+        """Flag written documents for the next incremental analytics run, matched through document_filename_index"""
+        run_unwind_batches(
+            f"UNWIND $rows AS filename MATCH (d:Document {{filename: filename}}) "
+            f"SET d.{PENDING_PROPERTY} = true RETURN count(d) AS count",
+            filenames,
+            batch_size=self.PENDING_BATCH_SIZE,
+            max_workers=1
+        )
+
     def filter_ents(self, ent: str) -> str:
         new_ent = process_ent(ent)
-        try:
-            match_idx = [ent.upper() for ent in self.verified_entities_list].index(new_ent.upper())
-            return self.verified_entities_list[match_idx]
-        except:
-            if new_ent in self.alias_mapping_dict:
-                return self.alias_mapping_dict[new_ent]
-            if new_ent in self.crowdsourcedEnts:
-                return new_ent
-            else:
-                return ""
+        if new_ent.upper() in self.verified_entities_upper:
+            return self.verified_entities_upper[new_ent.upper()]
+        if new_ent in self.alias_mapping_dict:
+            return self.alias_mapping_dict[new_ent]
+        if new_ent in self.crowdsourcedEnts:
+            return new_ent
+        else:
+            return ""
+
+    def _resolve_entity(self, ent: str) -> str:
+        return self.filter_ents(self._normalize_string(ent))
+
+    def resolve_entity(self, ent: str) -> str:
+        """Entity name a raw paragraph entity mention refers to, "" if it isn't a known entity"""
+        return self.entity_cache.get(ent, self._resolve_entity)
+
+    def prewarm_entity_cache(self) -> None:
+        """Resolve the GraphRelations names and aliases and the crowdsourced entities ahead of the workers"""
+        names = [ent for ent in self.verified_entities_list if isinstance(ent, str)]
+        names += list(self.alias_mapping_dict.keys()) + list(self.crowdsourcedEnts)
+        self.entity_cache.prewarm(names, self._resolve_entity)
+        print(f"Prewarmed entity cache with {len(self.entity_cache)} entries", file=sys.stderr)
 
     def process_crowdsourced_ents(self, without_web_scraping: bool, infobox_dir: t.Optional[str] = None):
         # check that if no web scraping, we have infobox-dir defined.
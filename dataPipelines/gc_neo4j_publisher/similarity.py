@@ -0,0 +1,95 @@
+"""Top-k cosine similarity between document embeddings (e.g. node2vec vectors), computed
+locally with blocked matrix products instead of all pairs in the database"""
+import typing as t
+
+import numpy as np
+
+# neighbors kept per document, 0 keeps every pair above the cutoff
+DEFAULT_TOP_K = 10
+DEFAULT_CUTOFF = 0.5
+# rows compared against the whole matrix at once, memory is ~ block size * n floats
+DEFAULT_BLOCK_SIZE = 2048
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Unit length rows as float32, all zero rows stay zero"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def top_k_similar(vectors: np.ndarray,
+                  k: int = DEFAULT_TOP_K,
+                  cutoff: float = DEFAULT_CUTOFF,
+                  block_size: int = DEFAULT_BLOCK_SIZE,
+                  rows: t.Optional[t.Sequence[int]] = None) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    For every row, the k other rows with the highest cosine similarity that is at least cutoff
+    :param vectors: n x d embeddings
+    :param k: neighbors per row, 0 for every row above the cutoff
+    :param cutoff: minimum similarity
+    :param block_size: rows per matrix product
+    :param rows: only find neighbors of these rows (still searched among all rows), default all
+    :return: (source rows, target rows, similarities), each row's neighbors in descending similarity
+    """
+    unit = normalize_rows(vectors)
+    n = len(unit)
+    source_rows = np.arange(n) if rows is None else np.asarray(rows, dtype=np.int64)
+    keep_all = k <= 0 or k >= n - 1
+    sources, targets, similarities = [], [], []
+
+    for start in range(0, len(source_rows), block_size):
+        block = source_rows[start:start + block_size]
+        sims = unit[block] @ unit.T
+        block_index = np.arange(len(block))
+        sims[block_index, block] = -np.inf
+
+        if keep_all:
+            block_rows, cols = np.nonzero(sims >= cutoff)
+            top = sims[block_rows, cols]
+            # descending similarity within each row
+            order = np.lexsort((-top, block_rows))
+            block_rows, cols, top = block_rows[order], cols[order], top[order]
+        else:
+            cols = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+            top = np.take_along_axis(sims, cols, axis=1)
+            order = np.argsort(-top, axis=1, kind="stable")
+            cols = np.take_along_axis(cols, order, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            keep = top >= cutoff
+            block_rows = np.broadcast_to(block_index[:, None], keep.shape)[keep]
+            cols, top = cols[keep], top[keep]
+
+        sources.append(block[block_rows])
+        targets.append(cols)
+        similarities.append(top)
+
+    if not sources:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    return np.concatenate(sources), np.concatenate(targets), np.concatenate(similarities)
+
+
+def reverse_neighbor_rows(vectors: np.ndarray,
+                          rows: t.Sequence[int],
+                          entry_similarity: np.ndarray,
+                          block_size: int = DEFAULT_BLOCK_SIZE) -> np.ndarray:
+    """
+    Rows whose top k one of rows would now enter, i.e. that are at least entry_similarity[row]
+    similar to any of rows. Similarity isn't symmetric in top k terms, a row can belong in the top k
+    of rows that aren't in its own top k.
+    :param vectors: n x d embeddings
+    :param rows: rows whose vectors changed
+    :param entry_similarity: per row, the similarity a new neighbor has to reach to enter its top k
+        (its k-th neighbor's similarity, or the cutoff while it has fewer than k)
+    :param block_size: changed rows per matrix product
+    :return: sorted rows, not including rows themselves
+    """
+    unit = normalize_rows(vectors)
+    rows = np.asarray(rows, dtype=np.int64)
+    best = np.full(len(unit), -np.inf, dtype=np.float32)
+    for start in range(0, len(rows), block_size):
+        block = rows[start:start + block_size]
+        best = np.maximum(best, (unit[block] @ unit.T).max(axis=0))
+    best[rows] = -np.inf
+    return np.flatnonzero(best >= entry_similarity)
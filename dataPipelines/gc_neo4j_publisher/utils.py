@@ -3,14 +3,21 @@ from .config import Config
 import multiprocessing as mp
 
 from tqdm import tqdm
-from .neo4j_publisher import Neo4jPublisher
+from .neo4j_publisher import Neo4jPublisher, process_query, run_unwind_batches
 import os
 import sys
 import math
+import time
 from pathlib import Path
 import pandas as pd
 from dataPipelines.gc_neo4j_publisher import wiki_utils as wu
 import json
+import numpy as np
+from .entity_cache import merge_stats
+from .similarity import top_k_similar, reverse_neighbor_rows, DEFAULT_TOP_K, DEFAULT_CUTOFF
+from .analytics import (AnalyticsState, choose_mode, mean_unit_vector, AUTO, FULL, PENDING_PROPERTY, STATE_NAME,
+                        DEFAULT_FULL_RECOMPUTE_DAYS, DEFAULT_FULL_RECOMPUTE_FRACTION, EMBEDDING_RELATIONSHIPS,
+                        COMMUNITY_RELATIONSHIPS, COMMUNITY_PROPERTIES)
 
 
 def only_write_infobox(csv_file_path, infobox_dir):
@@ -54,8 +61,13 @@ class Neo4jJobManager:
             pbar.update()
 
     @staticmethod
-    def process_files(files: t.List[str], file_dir: str, q: mp.Queue, publisher: Neo4jPublisher, max_threads: int) -> None:
-        publisher.process_dir(files, file_dir, q, max_threads)
+    def process_files(files: t.List[str], file_dir: str, q: mp.Queue, publisher: Neo4jPublisher, max_threads: int,
+                      stats_q: t.Optional[mp.Queue] = None) -> None:
+        try:
+            publisher.process_dir(files, file_dir, q, max_threads)
+        finally:
+            if stats_q is not None:
+                stats_q.put(publisher.entity_cache.stats())
 
     @staticmethod
     def get_chunks(lst: t.List[t.Any], n: int) -> t.Iterable[t.List[t.Any]]:
@@ -79,7 +91,12 @@ class Neo4jJobManager:
                    max_threads: int,
                    scrape_wiki: bool,
                    without_web_scraping: bool,
-                   infobox_dir: t.Union[str, Path]) -> None:
+                   infobox_dir: t.Union[str, Path],
+                   similarity_top_k: int = DEFAULT_TOP_K,
+                   similarity_cutoff: float = DEFAULT_CUTOFF,
+                   analytics: str = AUTO,
+                   full_recompute_days: float = DEFAULT_FULL_RECOMPUTE_DAYS,
+                   full_recompute_fraction: float = DEFAULT_FULL_RECOMPUTE_FRACTION) -> None:
         """Run Neo4j Update Job
         :param source: Path to source directory
         :param clear: Clear out all old entities first (care, can stall db if not enough RAM)
@@ -87,6 +104,12 @@ class Neo4jJobManager:
         :param scrape_wiki: whether to scrape the wiki when running the update
         :param without_web_scraping: designates if being run in environment without internet access
         :param infobox_dir: where the infobox jsons are saved if no web scraping
+        :param similarity_top_k: SIMILAR_TO edges per document, 0 for every pair above the cutoff
+        :param similarity_cutoff: minimum cosine similarity of SIMILAR_TO documents
+        :param analytics: full, incremental (only place changed documents in the existing analytics)
+            or auto (incremental unless a full recompute is due)
+        :param full_recompute_days: auto runs a full recompute when the last one is older than this
+        :param full_recompute_fraction: auto runs a full recompute once this share of documents changed since the last
         """
         source = str(Path(source).resolve())
         max_theoretical_threads = mp.cpu_count() - 1 if mp.cpu_count() - 1 > 0 else 1
@@ -117,8 +140,11 @@ class Neo4jJobManager:
                 session.run("DROP CONSTRAINT unique_resps IF EXISTS")
                 session.run("DROP CONSTRAINT unique_roles IF EXISTS")
                 session.run("DROP CONSTRAINT unique_topics IF EXISTS")
+                session.run("DROP CONSTRAINT unique_aliases IF EXISTS")
 
                 session.run("DROP INDEX document_index IF EXISTS")
+                session.run("DROP INDEX document_filename_index IF EXISTS")
+                session.run("DROP INDEX document_name_crawler_index IF EXISTS")
                 session.run("DROP INDEX ukn_document_index IF EXISTS")
                 session.run("DROP INDEX entity_index IF EXISTS")
                 session.run("DROP INDEX org_index IF EXISTS")
@@ -134,9 +160,13 @@ class Neo4jJobManager:
                 session.run(
                     "CREATE CONSTRAINT unique_resps IF NOT EXISTS ON (r:Responsibility) ASSERT r.name IS UNIQUE")
                 session.run("CREATE CONSTRAINT unique_topics IF NOT EXISTS ON (t:Topic) ASSERT t.name IS UNIQUE")
+                session.run("CREATE CONSTRAINT unique_aliases IF NOT EXISTS ON (a:Alias) ASSERT a.name IS UNIQUE")
 
                 # Create indicies
                 session.run("CREATE INDEX document_index IF NOT EXISTS FOR (d:Document) ON (d.doc_id, d.ref_name)")
+                session.run("CREATE INDEX document_filename_index IF NOT EXISTS FOR (d:Document) ON (d.filename)")
+                session.run(
+                    "CREATE INDEX document_name_crawler_index IF NOT EXISTS FOR (d:Document) ON (d.name, d.crawler_used_s)")
                 session.run(
                     "CREATE INDEX ukn_document_index IF NOT EXISTS FOR (d:UKN_Document) ON (d.doc_id, d.ref_name)")
                 session.run("CREATE INDEX entity_index IF NOT EXISTS FOR (e:Entity) ON (e.name)")
@@ -145,22 +175,31 @@ class Neo4jJobManager:
                 session.run("CREATE INDEX topic_index IF NOT EXISTS FOR (t:Topic) ON (t.name)")
                 session.run("CREATE INDEX responsibility_index IF NOT EXISTS FOR (r:Responsibility) ON (r.name)")
 
+            # written docs are flagged for analytics by filename, which mustn't scan every Document on existing graphs
+            session.run("CREATE INDEX document_filename_index IF NOT EXISTS FOR (d:Document) ON (d.filename)")
+
         publisher = Neo4jPublisher()
         publisher.populate_crowdsourced_ents()
         publisher.process_orgs()
         publisher.process_roles()
         publisher.ingest_hierarchy_information()
+        # workers start from copies of the publisher, warm its cache once here
+        publisher.prewarm_entity_cache()
 
         q = mp.Queue()
+        stats_q = mp.Queue()
         proc = mp.Process(target=self.listener, args=(q, len(files)))
         proc.start()
-        workers = [mp.Process(target=self.process_files, args=(file_chunks[i], file_dir, q, publisher, max_threads)) for i in range(n)]
+        workers = [mp.Process(target=self.process_files, args=(file_chunks[i], file_dir, q, publisher, max_threads, stats_q)) for i in range(n)]
         for worker in workers:
             worker.start()
         for worker in workers:
             worker.join()
         q.put(None)
         proc.join()
+        cache_stats = []
+        while not stats_q.empty():
+            cache_stats.append(stats_q.get())
 
         if scrape_wiki:
             publisher.process_crowdsourced_ents(without_web_scraping, infobox_dir)
@@ -171,104 +210,300 @@ class Neo4jJobManager:
                 print("Creating UKN Documents, REFERENCES, and REFERENCES_UKN links...", file=sys.stderr)
                 session.run("CALL policy.createUKNDocumentNodesAndAllReferences();")
 
-                # Create Similarity Links
-                print("Creating node2vec properties ... ", file=sys.stderr)
-
-                session.run(
-                    "CALL gds.beta.node2vec.write( " +
-                    "   { " +
-                    "       nodeProjection: ['Document', 'Entity', 'Topic', 'UKN_Document'], " +
-                    "       relationshipProjection: ['REFERENCES', 'REFERENCES_UKN', 'CHILD_OF', 'CONTAINS', 'MENTIONS', 'IS_IN', 'HAS_HEAD', 'HAS_ROLE', 'TYPE_OF'], " +
-                    "       relationshipProperties: ['count', 'relevancy'], " +
-                    "       embeddingDimension: 64, " +
-                    "       walkLength: 10, " +
-                    "       iterations: 3, " +
-                    "       writeProperty: 'nodeVec' " +
-                    "   } " +
-                    ");"
-                )
-
-                print("Creating similarity relationships ... ", file=sys.stderr)
-                try:
-                    session.run(
-                        "MATCH (d:Document) " +
-                        "WITH {item:id(d), weights: d.nodeVec} AS docData " +
-                        "WITH collect(docData) AS data " +
-                        "CALL gds.alpha.similarity.cosine.stream({ " +
-                        "  data: data, " +
-                        "  similarityCutoff: 0.5 " +
-                        "}) " +
-                        "YIELD item1, item2, similarity " +
-                        "WITH gds.util.asNode(item1) AS NODE1, gds.util.asNode(item2) AS NODE2, similarity " +
-                        "MERGE (NODE1)-[:SIMILAR_TO {similarity: similarity}]->(NODE2);"
-                    )
-                except Exception as e:
-                    print(f"Error: {e}")
-                
-                # create graph
-                print("Creating graph for making clusters ... ", file=sys.stderr)
-                try:
-                    session.run(
-                        "CALL gds.graph.create.cypher( " +
-                            "'recGraph', " +
-                            "'MATCH (n) WHERE n:Document OR n:Entity OR n:Topic OR n:Responsibility " +
-                            "RETURN id(n) AS id, labels(n) AS labels', " +
-                            "'MATCH (n)-[r:REFERENCES|MENTIONS|IS_IN|CONTAINS|CHILD_OF]->(m) " +
-                            "RETURN id(n) AS source, id(m) AS target, type(r) AS type') " +
-                        "YIELD " +
-                        "graphName AS graph, nodeQuery, nodeCount AS nodes, relationshipCount AS rels"
-                    )
-                except Exception as e:
-                    print(f"Error: {e}")
-
-                # create louvain clusters
-                print("Creating and writing Louvain cluster assignments ... ", file=sys.stderr)
-                try:
-                    session.run(
-                        "CALL gds.louvain.write('recGraph', { writeProperty: 'louvain_community' }) " + 
-                        "YIELD communityCount, modularity, modularities"
-                    )
-                except Exception as e:
-                    print(f"Error: {e}")
-
-                # make label prop clusters
-                print("Creating and writing label propagation cluster assignments ... ", file=sys.stderr)
-                try:
-                    session.run(
-                        "CALL gds.labelPropagation.write('recGraph', { writeProperty: 'lp_community' }) " +
-                        "YIELD communityCount, ranIterations, didConverge"
-                    )
-                except Exception as e:
-                    print(f"Error: {e}")
-                
-                print("Getting and writing betweenness scores ... ", file=sys.stderr)
-                try:
-                    session.run(
-                        "CALL gds.betweenness.write('recGraph', { writeProperty: 'betweenness' }) " +
-                        "YIELD centralityDistribution, nodePropertiesWritten " +
-                        "RETURN centralityDistribution.min AS minimumScore, centralityDistribution.mean AS meanScore, nodePropertiesWritten"
-                    )
-                except Exception as e:
-                    print(f"Error: {e}")
-                
-                # delete graph if exists
-                print("Deleting recGraph")
-                try:
-                    session.run(
-                        "CALL gds.graph.drop('recGraph')"
-                    )
-                except Exception as e:
-                    print(f"Error: {e}")
+                pending_docs = session.run(
+                    f"MATCH (d:Document) WHERE d.{PENDING_PROPERTY} = true RETURN count(d) AS count").single()["count"]
+                total_docs = session.run("MATCH (d:Document) RETURN count(d) AS count").single()["count"]
+                state = self.get_analytics_state(session)
+                mode = choose_mode(analytics, pending_docs, total_docs, state,
+                                   full_every_days=full_recompute_days, full_fraction=full_recompute_fraction)
+                print(f"Running {mode} graph analytics, {pending_docs} of {total_docs} documents changed ... ",
+                      file=sys.stderr)
+
+                if mode == FULL:
+                    self.run_full_analytics(session, similarity_top_k, similarity_cutoff)
+                else:
+                    self.run_incremental_analytics(session, similarity_top_k, similarity_cutoff)
+                self.record_analytics_run(session, mode, pending_docs)
 
                 # delete any entity nodes without a name
                 session.run("MATCH (e:Entity {name: ''}) detach delete (e);")
             except Exception as e:
                 print("Error: {0}".format(e))
 
+            stats = merge_stats(cache_stats)
+            print(f"Entity cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.1%} hit rate), "
+                  f"{stats['size']} entries over {len(cache_stats)} workers", file=sys.stderr)
             print('Done', file=sys.stderr)
 
+    @staticmethod
+    def get_analytics_state(session) -> AnalyticsState:
+        record = session.run(
+            "MERGE (s:AnalyticsState {name: $name}) "
+            "RETURN s.last_full_run AS last_full_run, coalesce(s.changes_since_full, 0) AS changes_since_full",
+            name=STATE_NAME).single()
+        return AnalyticsState(last_full_run=record["last_full_run"], changes_since_full=record["changes_since_full"])
+
+    @staticmethod
+    def record_analytics_run(session, mode: str, pending_docs: int, batch_size: int = 10000) -> None:
+        """Clear the pending flags analytics accounted for and track changes since the last full run"""
+        while session.run(
+                f"MATCH (d:Document) WHERE d.{PENDING_PROPERTY} = true "
+                f"WITH d LIMIT $batch_size REMOVE d.{PENDING_PROPERTY} RETURN count(d) AS cleared",
+                batch_size=batch_size).single()["cleared"]:
+            pass
+
+        if mode == FULL:
+            session.run(
+                "MERGE (s:AnalyticsState {name: $name}) SET s.last_full_run = $now, s.changes_since_full = 0",
+                name=STATE_NAME, now=time.time())
+        else:
+            session.run(
+                "MERGE (s:AnalyticsState {name: $name}) "
+                "SET s.changes_since_full = coalesce(s.changes_since_full, 0) + $pending",
+                name=STATE_NAME, pending=pending_docs)
+
+    def run_full_analytics(self, session, similarity_top_k: int, similarity_cutoff: float) -> None:
+        """node2vec embeddings, similarity, communities and betweenness over the whole graph"""
+        # Create Similarity Links
+        print("Creating node2vec properties ... ", file=sys.stderr)
+
+        session.run(
+            "CALL gds.beta.node2vec.write( " +
+            "   { " +
+            "       nodeProjection: ['Document', 'Entity', 'Topic', 'UKN_Document'], " +
+            f"       relationshipProjection: {EMBEDDING_RELATIONSHIPS}, " +
+            "       relationshipProperties: ['count', 'relevancy'], " +
+            "       embeddingDimension: 64, " +
+            "       walkLength: 10, " +
+            "       iterations: 3, " +
+            "       writeProperty: 'nodeVec' " +
+            "   } " +
+            ");"
+        )
+
+        print("Creating similarity relationships ... ", file=sys.stderr)
+        try:
+            self.create_similarity_relationships(session, top_k=similarity_top_k, cutoff=similarity_cutoff)
+        except Exception as e:
+            print(f"Error: {e}")
+
+        # create graph
+        print("Creating graph for making clusters ... ", file=sys.stderr)
+        try:
+            session.run(
+                "CALL gds.graph.create.cypher( " +
+                    "'recGraph', " +
+                    "'MATCH (n) WHERE n:Document OR n:Entity OR n:Topic OR n:Responsibility " +
+                    "RETURN id(n) AS id, labels(n) AS labels', " +
+                    f"'MATCH (n)-[r:{'|'.join(COMMUNITY_RELATIONSHIPS)}]->(m) " +
+                    "RETURN id(n) AS source, id(m) AS target, type(r) AS type') " +
+                "YIELD " +
+                "graphName AS graph, nodeQuery, nodeCount AS nodes, relationshipCount AS rels"
+            )
+        except Exception as e:
+            print(f"Error: {e}")
+
+        # create louvain clusters
+        print("Creating and writing Louvain cluster assignments ... ", file=sys.stderr)
+        try:
+            session.run(
+                "CALL gds.louvain.write('recGraph', { writeProperty: 'louvain_community' }) " +
+                "YIELD communityCount, modularity, modularities"
+            )
+        except Exception as e:
+            print(f"Error: {e}")
+
+        # make label prop clusters
+        print("Creating and writing label propagation cluster assignments ... ", file=sys.stderr)
+        try:
+            session.run(
+                "CALL gds.labelPropagation.write('recGraph', { writeProperty: 'lp_community' }) " +
+                "YIELD communityCount, ranIterations, didConverge"
+            )
+        except Exception as e:
+            print(f"Error: {e}")
+
+        print("Getting and writing betweenness scores ... ", file=sys.stderr)
+        try:
+            session.run(
+                "CALL gds.betweenness.write('recGraph', { writeProperty: 'betweenness' }) " +
+                "YIELD centralityDistribution, nodePropertiesWritten " +
+                "RETURN centralityDistribution.min AS minimumScore, centralityDistribution.mean AS meanScore, nodePropertiesWritten"
+            )
+        except Exception as e:
+            print(f"Error: {e}")
+
+        # delete graph if exists
+        print("Deleting recGraph")
+        try:
+            session.run(
+                "CALL gds.graph.drop('recGraph')"
+            )
+        except Exception as e:
+            print(f"Error: {e}")
+
+    def run_incremental_analytics(self, session, similarity_top_k: int, similarity_cutoff: float,
+                                  batch_size: int = 10000) -> None:
+        """
+        Place the pending Documents in the existing analytics without touching the rest of the graph:
+        embeddings from their already embedded neighbors, similarity for them and the documents
+        they're similar to, communities by majority vote of their neighbors. Betweenness waits
+        for the next full run.
+        """
+        print("Embedding changed documents from their neighbors ... ", file=sys.stderr)
+        rows = []
+        for record in session.run(
+                f"MATCH (d:Document) WHERE d.{PENDING_PROPERTY} = true "
+                f"OPTIONAL MATCH (d)-[:{'|'.join(EMBEDDING_RELATIONSHIPS)}]-(n) "
+                f"WHERE n.nodeVec IS NOT NULL AND NOT coalesce(n.{PENDING_PROPERTY}, false) "
+                "RETURN id(d) AS id, collect(n.nodeVec) AS vecs"):
+            vec = mean_unit_vector(record["vecs"])
+            if vec is not None:
+                rows.append({"id": record["id"], "vec": vec})
+        for i in range(0, len(rows), batch_size):
+            session.run("UNWIND $rows AS row MATCH (d) WHERE id(d) = row.id SET d.nodeVec = row.vec",
+                        rows=rows[i:i + batch_size])
+
+        print("Updating similarity relationships of changed documents ... ", file=sys.stderr)
+        try:
+            self.create_similarity_relationships(session, top_k=similarity_top_k, cutoff=similarity_cutoff,
+                                                 changed_ids=[row["id"] for row in rows])
+        except Exception as e:
+            print(f"Error: {e}")
+
+        print("Assigning changed documents to their neighbors' communities ... ", file=sys.stderr)
+        for community in COMMUNITY_PROPERTIES:
+            try:
+                session.run(
+                    f"MATCH (d:Document) WHERE d.{PENDING_PROPERTY} = true "
+                    f"MATCH (d)-[:{'|'.join(COMMUNITY_RELATIONSHIPS)}]-(n) "
+                    f"WHERE n.{community} IS NOT NULL AND NOT coalesce(n.{PENDING_PROPERTY}, false) "
+                    f"WITH d, n.{community} AS community, count(*) AS votes ORDER BY votes DESC "
+                    f"WITH d, collect(community)[0] AS community "
+                    f"SET d.{community} = community"
+                )
+            except Exception as e:
+                print(f"Error: {e}")
+
+    @staticmethod
+    def create_similarity_relationships(session,
+                                        top_k: int = DEFAULT_TOP_K,
+                                        cutoff: float = DEFAULT_CUTOFF,
+                                        batch_size: int = 10000,
+                                        changed_ids: t.Optional[t.List[int]] = None) -> int:
+        """Replace SIMILAR_TO edges with each Document's top_k most similar Documents by node2vec embedding.
+        Vectors are pulled once and compared locally in blocks, edges are written in UNWIND batches.
+        :param changed_ids: only redo the edges of these Documents and of the Documents whose top k they
+            entered or left, default all
+        :return: number of edges written
+        """
+        ids, vectors = [], []
+        for record in session.run("MATCH (d:Document) WHERE d.nodeVec IS NOT NULL RETURN id(d) AS id, d.nodeVec AS vec"):
+            ids.append(record["id"])
+            vectors.append(record["vec"])
+        if not ids:
+            return 0
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        ids = np.asarray(ids)
+        if changed_ids is None:
+            sources, targets, similarities = top_k_similar(vectors, k=top_k, cutoff=cutoff)
+
+            # edges from earlier runs, MERGE-ing on the similarity value used to pile up duplicates
+            while session.run(
+                    "MATCH (:Document)-[r:SIMILAR_TO]->(:Document) "
+                    "WITH r LIMIT $batch_size DELETE r RETURN count(r) AS deleted",
+                    batch_size=batch_size).single()["deleted"]:
+                pass
+        else:
+            changed_rows = np.flatnonzero(np.isin(ids, changed_ids))
+            if not len(changed_rows):
+                return 0
+            # top k isn't symmetric: besides the changed documents, redo every document a changed one may
+            # have entered the top k of (read off its current edges) or may have dropped out of
+            row_of = {doc_id: row for row, doc_id in enumerate(ids.tolist())}
+            entry_similarity = np.full(len(ids), cutoff, dtype=np.float32)
+            for record in session.run(
+                    "MATCH (d:Document)-[r:SIMILAR_TO]->(:Document) "
+                    "RETURN id(d) AS id, count(r) AS edges, min(r.similarity) AS min_similarity"):
+                row = row_of.get(record["id"])
+                if row is not None and 0 < top_k <= record["edges"]:
+                    entry_similarity[row] = max(cutoff, record["min_similarity"])
+            entering = reverse_neighbor_rows(vectors, changed_rows, entry_similarity)
+            leaving = [
+                row_of[record["id"]] for record in session.run(
+                    "MATCH (x:Document)-[:SIMILAR_TO]->(d:Document) WHERE id(d) IN $changed "
+                    "RETURN DISTINCT id(x) AS id", changed=ids[changed_rows].tolist())
+                if record["id"] in row_of
+            ]
+            rows = np.union1d(np.union1d(changed_rows, entering), np.asarray(leaving, dtype=np.int64))
+            sources, targets, similarities = top_k_similar(vectors, k=top_k, cutoff=cutoff, rows=rows)
+
+            stale = ids[rows].tolist()
+            for i in range(0, len(stale), batch_size):
+                session.run(
+                    "UNWIND $ids AS doc_id "
+                    "MATCH (d:Document)-[r:SIMILAR_TO]->(:Document) WHERE id(d) = doc_id DELETE r",
+                    ids=stale[i:i + batch_size])
+
+        for i in range(0, len(sources), batch_size):
+            session.run(
+                "UNWIND $rows AS row "
+                "MATCH (a) WHERE id(a) = row.source "
+                "MATCH (b) WHERE id(b) = row.target "
+                "CREATE (a)-[:SIMILAR_TO {similarity: row.similarity}]->(b)",
+                rows=[
+                    {"source": int(s), "target": int(t_), "similarity": float(sim)}
+                    for s, t_, sim in zip(ids[sources[i:i + batch_size]], ids[targets[i:i + batch_size]],
+                                          similarities[i:i + batch_size])
+                ])
+        print(f"Created {len(sources)} similarity relationships between {len(ids)} documents", file=sys.stderr)
+        return len(sources)
+
     def remove_from_graph(self, filename: str) -> None:
-        with Config.connection_helper.neo4j_session_scope() as session:
-            # if clear flag, clear all data
-                print(f"Deleting Document with filename {filename!s} from graph ... ", file=sys.stderr)
-                session.run("match (n: Document {filename:'" + str(filename) + "'}) detach delete (n);")
\ No newline at end of file
+        print(f"Deleting Document with filename {filename!s} from graph ... ", file=sys.stderr)
+        self.remove_batch_from_graph([filename])
+
+    def remove_batch_from_graph(self, filenames: t.Iterable[str], batch_size: int = 1000,
+                                max_workers: int = 4) -> t.Dict[str, t.Any]:
+        """Detach delete Documents for all given filenames with chunked UNWIND statements run in parallel"""
+        filenames = [str(filename) for filename in filenames]
+        print(f"Deleting {len(filenames)} Documents from graph ... ", file=sys.stderr)
+        process_query("CREATE INDEX document_filename_index IF NOT EXISTS FOR (d:Document) ON (d.filename)")
+        result = run_unwind_batches(
+            "UNWIND $rows AS filename "
+            "MATCH (n:Document {filename: filename}) "
+            "DETACH DELETE n "
+            "RETURN count(*) AS count",
+            filenames, batch_size=batch_size, max_workers=max_workers
+        )
+        summary = {'requested': len(filenames), 'deleted': result['count'], 'batches': result['batches']}
+        summary['missing'] = summary['requested'] - summary['deleted']
+        if result['errors']:
+            summary['errors'] = result['errors']
+        # removals count towards the next full analytics recompute
+        process_query(
+            "MERGE (s:AnalyticsState {name: $name}) "
+            "SET s.changes_since_full = coalesce(s.changes_since_full, 0) + $deleted",
+            name=STATE_NAME, deleted=summary['deleted'])
+        return summary
+
+    @staticmethod
+    def update_revocations_batch(revocations: t.Iterable[t.Tuple[str, str, bool]], batch_size: int = 1000,
+                                 max_workers: int = 4) -> t.Dict[str, t.Any]:
+        """Set is_revoked_b on Documents by (name, crawler_used, is_revoked) with chunked UNWIND statements"""
+        rows = [{'name': name, 'crawler_used': crawler_used, 'is_revoked': bool(is_revoked)}
+                for name, crawler_used, is_revoked in revocations]
+        process_query(
+            "CREATE INDEX document_name_crawler_index IF NOT EXISTS FOR (d:Document) ON (d.name, d.crawler_used_s)")
+        result = run_unwind_batches(
+            "UNWIND $rows AS row "
+            "MATCH (a:Document {name: row.name, crawler_used_s: row.crawler_used}) "
+            "SET a.is_revoked_b = row.is_revoked "
+            "RETURN count(a) AS count",
+            rows, batch_size=batch_size, max_workers=max_workers
+        )
+        summary = {'requested': len(rows), 'updated': result['count'], 'batches': result['batches']}
+        if result['errors']:
+            summary['errors'] = result['errors']
+        return summary
\ No newline at end of file
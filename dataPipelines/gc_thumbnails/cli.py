@@ -50,11 +50,19 @@ def cli():
     type=int,
     default=1
 )
+@click.option(
+    '-f',
+    '--force',
+    help="Regenerate thumbnails even if they are newer than their PDF",
+    is_flag=True,
+    default=False
+)
 def process(
         input_directory: str,
         output_directory: str,
         shrink_factor: int,
-        max_workers: int) -> None:
+        max_workers: int,
+        force: bool) -> None:
     """Run Thumbnail Retrieval"""
     input_directory = Path(input_directory).resolve()
     output_directory = Path(output_directory).resolve()
@@ -62,7 +70,8 @@ def process(
         input_directory=input_directory,
         output_directory=output_directory,
         shrink_factor=shrink_factor,
-        max_workers=max_workers
+        max_workers=max_workers,
+        force=force
     )
     result = png_generator.process_directory()
 
@@ -2,20 +2,41 @@ from pathlib import Path
 import fitz
 import typing as t
 import multiprocessing
+import time
 from concurrent.futures import ProcessPoolExecutor
 
 
+class ThumbnailResult(t.NamedTuple):
+    """Outcome of generating a single thumbnail"""
+    file: str
+    succeeded: bool
+    render_seconds: float
+    error: t.Optional[str] = None
+
+
 class ThumbnailsCreator:
     def __init__(
         self,
         input_directory: t.Union[str, Path],
         output_directory: t.Union[str, Path],
         shrink_factor: int,
-        max_workers: int
+        max_workers: int,
+        force: bool = False,
+        chunksize: t.Optional[int] = None
     ):
+        """Thumbnail generator for a directory of pdfs
+        :param input_directory: directory with the pdfs
+        :param output_directory: directory the .png thumbnails are written to
+        :param shrink_factor: thumbnails are rendered at 1/2^shrink_factor of the page's native size
+        :param max_workers: number of worker processes, < 0 for all cpus
+        :param force: regenerate thumbnails even when they are newer than their pdf
+        :param chunksize: number of pdfs sent to a worker at a time, derived from the workload if not set
+        """
         self.input_directory = Path(input_directory).absolute()
         self.output_directory = Path(output_directory).absolute()
         self.shrink_factor = shrink_factor
+        self.force = force
+        self.chunksize = chunksize
 
         # if we use all available resources
         # NOT recommended. This uses all computing power at once, will probably crash if big directory
@@ -28,20 +49,80 @@ class ThumbnailsCreator:
         else:
             raise ValueError(f"Invalid max_threads value given: ${max_workers}")
 
-    def process_directory(self):
+    def get_output_path(self, file_path: Path) -> Path:
+        return Path(self.output_directory, file_path.with_suffix('.png').name)
+
+    def is_up_to_date(self, file_path: Path) -> bool:
+        """Thumbnail exists and was written after the pdf was last modified"""
+        output = self.get_output_path(file_path)
+        return output.exists() and output.stat().st_mtime >= file_path.stat().st_mtime
+
+    def process_directory(self) -> t.Dict[str, t.Any]:
         print('\nGenerating Thumbnails\n')
         self.output_directory.mkdir(exist_ok=True)
 
+        file_paths = []
+        skipped = 0
+        for file_path in self.input_directory.glob('*.pdf'):
+            if not self.force and self.is_up_to_date(file_path):
+                skipped += 1
+            else:
+                file_paths.append(file_path)
+
+        # a few chunks per worker keeps them busy without paying IPC per file
+        chunksize = self.chunksize or max(1, len(file_paths) // (self.max_workers * 4))
+
         with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
-            executor.map(self.generate_thumbnails, (file_path for file_path in self.input_directory.glob('*.pdf')))
-
-    def generate_thumbnails(self, file_path):
-        doc = fitz.open(str(file_path))
-        page = doc.loadPage(0)  # number of page
-        pix = page.getPixmap()
-        pix.shrink(self.shrink_factor)   # reduces image size
-        output = Path(self.output_directory, file_path.with_suffix('.png').name)
-        pix.writePNG(str(output))
-        print("wrote PNG: ", output)
+            results = list(executor.map(self.generate_thumbnails, file_paths, chunksize=chunksize))
+
+        summary = self.summarize(results, skipped=skipped)
+        print(
+            f"Thumbnails - created: {summary['created']}, skipped (up to date): {summary['skipped']}, "
+            f"failed: {summary['failed']}, total render time: {summary['render_seconds_total']:.2f}s"
+        )
+        for file, error in summary['failures'].items():
+            print(f"Failed to generate thumbnail for {file}: {error}")
+
+        return summary
 
-        return True
+    @staticmethod
+    def summarize(results: t.List[ThumbnailResult], skipped: int = 0) -> t.Dict[str, t.Any]:
+        render_times = [r.render_seconds for r in results if r.succeeded]
+        return {
+            'created': len(render_times),
+            'skipped': skipped,
+            'failed': len(results) - len(render_times),
+            'failures': {r.file: r.error for r in results if not r.succeeded},
+            'render_seconds_total': sum(render_times),
+            'render_seconds_max': max(render_times, default=0.0),
+            'render_seconds_mean': (sum(render_times) / len(render_times)) if render_times else 0.0,
+            'results': [r._asdict() for r in results],
+        }
+
+    def generate_thumbnails(self, file_path) -> ThumbnailResult:
+        start = time.perf_counter()
+        try:
+            # render straight at the target size instead of rendering full size and shrinking
+            zoom = 1 / (2 ** self.shrink_factor)
+            doc = fitz.open(str(file_path))
+            try:
+                # camelCase names are the PyMuPDF < 1.19 api the requirements pin
+                load_page = getattr(doc, "load_page", None) or doc.loadPage
+                page = load_page(0)  # number of page
+                get_pixmap = getattr(page, "get_pixmap", None) or page.getPixmap
+                pix = get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+                output = self.get_output_path(Path(file_path))
+                save = getattr(pix, "save", None) or pix.writePNG
+                save(str(output))
+            finally:
+                doc.close()
+        except Exception as e:
+            return ThumbnailResult(
+                file=str(file_path),
+                succeeded=False,
+                render_seconds=time.perf_counter() - start,
+                error=f"{type(e).__name__}: {e}"
+            )
+
+        print("wrote PNG: ", output)
+        return ThumbnailResult(file=str(file_path), succeeded=True, render_seconds=time.perf_counter() - start)
@@ -10,6 +10,17 @@ import datetime as dt
 import hashlib
 import tempfile
 import logging
+import gzip
+import io
+import re
+import tarfile
+from concurrent.futures import ThreadPoolExecutor, Future
+from collections import deque
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 PACKAGE_PATH: str = os.path.dirname(os.path.abspath(__file__))
 REPO_PATH: str = os.path.abspath(os.path.join(PACKAGE_PATH, '../../'))
@@ -25,6 +36,38 @@ def get_logger() -> logging.Logger:
 l = get_logger()
 
 
+# parsed json forms written by the parsers, see common.utils.parsed_json. Kept here so the script
+# runs on its own, outside the repo
+PARSED_JSON_SUFFIXES = ('.json.gz', '.json.zst', '.json')
+
+
+def get_parsed_json_suffix(path: t.Union[str, Path]) -> t.Optional[str]:
+    name = Path(path).name
+    return next((suffix for suffix in PARSED_JSON_SUFFIXES if name.endswith(suffix)), None)
+
+
+def get_parsed_json_stem(path: t.Union[str, Path]) -> str:
+    """File name without its (possibly compound) parsed json suffix"""
+    name = Path(path).name
+    suffix = get_parsed_json_suffix(name)
+    return name[:-len(suffix)] if suffix else Path(name).stem
+
+
+def load_parsed_json(path: t.Union[str, Path]) -> t.Any:
+    """Load a parsed json, decompressing according to its suffix"""
+    suffix = get_parsed_json_suffix(path)
+    if suffix == '.json.gz':
+        with gzip.open(path, 'rb') as f:
+            return json.load(f)
+    if suffix == '.json.zst':
+        if zstandard is None:
+            raise RuntimeError("Reading .json.zst files requires the zstandard package")
+        with open(path, 'rb') as f, zstandard.ZstdDecompressor().stream_reader(f) as reader:
+            return json.load(reader)
+    with open(path, 'rb') as f:
+        return json.load(f)
+
+
 def copy_snapshots_from_s3(pdf_snapshot_prefix: str, json_snapshot_prefix: str, export_base_dir: t.Union[str, Path]) -> t.Dict[
     str, str]:
     export_base_dir = Path(export_base_dir)
@@ -91,82 +134,200 @@ def pull_revocations() -> t.Dict[str, bool]:
     return revocation_map
 
 
-def update_revocations(parsed_json_dir: t.Union[str, Path], revocation_map: t.Dict[str, bool], pdf_dir: t.Union[str, Path]) -> None:
-    l.info("*** UPDATING JSONS TO INCLUDE REVOCATIONS ***")
-    parsed_json_dir = Path(parsed_json_dir).absolute()
-    pdf_dir = Path(pdf_dir).absolute()
+def get_matching_doc_name(parsed_json_path: Path, pdf_dir: t.Union[str, Path], catalog=None) -> str:
+    """doc_name from the pdf's metadata, looked up in catalog (a refreshed MetadataCatalog of pdf_dir) if given"""
+    stem = get_parsed_json_stem(parsed_json_path)
+    if catalog is not None:
+        entry = catalog.find_metadata(pdf_dir, stem + ".pdf")
+        if entry is None or entry.doc_name is None:
+            return stem
+        return entry.doc_name
 
+    metadata_path = Path(pdf_dir, stem + ".pdf.metadata")
+    if not metadata_path.exists():
+        return stem
+    with metadata_path.open() as f:
+        return json.load(f).get("doc_name", stem)
 
-    def get_matching_doc_name(parsed_json_path: Path) -> str:
-        metadata_path = Path(pdf_dir, parsed_json_path.stem + ".pdf.metadata")
-        if not metadata_path.exists():
-            return parsed_json_path.stem
-        return json.load(metadata_path.open()).get("doc_name", parsed_json_path.stem)
 
-    for p in parsed_json_dir.glob("*.json"):
-        jdict = json.load(p.open(mode='r'))
-        jdict["is_revoked_b"] = revocation_map[get_matching_doc_name(p)]
-        json.dump(jdict, p.open("w"))
+def parse_size(size: str) -> int:
+    """Parse `split`-style sizes, e.g. 1G, 500M, 10MB, 4096"""
+    match = re.match(r"^(?P<num>\d+)(?P<unit>[KMGT]?)(?P<si>B?)$", size.strip().upper())
+    if not match:
+        raise ValueError(f"Invalid size: {size}")
+    base = 1000 if match.group("si") else 1024
+    exponent = " KMGT".index(match.group("unit") or " ")
+    return int(match.group("num")) * base ** exponent
 
 
-def zip_base_dir(export_base_dir: t.Union[str, Path], output_dir: t.Union[str, Path]) -> str:
-    output_dir = Path(output_dir).absolute()
-    export_base_dir = Path(export_base_dir).absolute()
-
-    output_dir.mkdir(exist_ok=True)
+class ChecksummedPartWriter(io.RawIOBase):
+    """Write-only stream that cuts its output into fixed-size part files, md5-ing each one as it goes
 
-    compressed_filename = "gc_data_export.tgz"
-    output_path = Path(output_dir, compressed_filename)
-
-    sub.run([
-        "tar",
-        "-cz",
-        "-f", str(output_path),
-        "-C", str(export_base_dir),
-        "."
-    ], check=True)
-    return str(output_path)
-
-
-def split_archive(output_dir: t.Union[str, Path], archive_path: t.Union[str, Path], chunk_size: str = "1G") -> t.List[str]:
-    l.info("***SPLITING ARCHIVE INTO CHUNKS***")
-    output_dir = Path(output_dir).absolute()
-    archive_path = Path(archive_path).absolute()
-
-    output_dir.mkdir(exist_ok=True)
-
-    part_name = archive_path.name + ".part_"
-    sub.run([
-        "split",
-        "-b", chunk_size,
-        "-d",
-        str(archive_path),
-        str(Path(output_dir, part_name))
-    ], check=True)
-
-    return [str(x) for x in output_dir.glob(f"{part_name}*")]
-
-
-def calculate_md5(filepath: t.Union[str, Path]) -> str:
-    filepath = Path(filepath).absolute()
-    with filepath.open("rb") as f:
-        file_hash = hashlib.md5()
-        chunk = f.read(8192)
-        while chunk:
-            file_hash.update(chunk)
-            chunk = f.read(8192)
+    Parts are named <base_name>.part_0000, <base_name>.part_0001, ... (fixed width so they sort in order)
+    """
 
-        return file_hash.hexdigest()
+    def __init__(self, output_dir: t.Union[str, Path], base_name: str, chunk_size: int):
+        super().__init__()
+        self.output_dir = Path(output_dir).absolute()
+        self.output_dir.mkdir(exist_ok=True)
+        self.base_name = base_name
+        self.chunk_size = chunk_size
+        self.checksums: t.Dict[str, str] = {}
+
+        self._part_num = -1
+        self._part_file: t.Optional[t.BinaryIO] = None
+        self._part_name = ""
+        self._part_hash = hashlib.md5()
+        self._part_written = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def _finish_part(self) -> None:
+        if self._part_file is None:
+            return
+        self._part_file.close()
+        self.checksums[self._part_name] = self._part_hash.hexdigest()
+        l.info("Finished archive part %s", self._part_name)
+        self._part_file = None
+
+    def _start_part(self) -> None:
+        self._finish_part()
+        self._part_num += 1
+        self._part_name = f"{self.base_name}.part_{self._part_num:04d}"
+        self._part_file = Path(self.output_dir, self._part_name).open("wb")
+        self._part_hash = hashlib.md5()
+        self._part_written = 0
+
+    def write(self, b) -> int:
+        view = memoryview(b)
+        total = len(view)
+        while view:
+            if self._part_file is None or self._part_written >= self.chunk_size:
+                self._start_part()
+            n = min(len(view), self.chunk_size - self._part_written)
+            chunk = view[:n]
+            self._part_file.write(chunk)
+            self._part_hash.update(chunk)
+            self._part_written += n
+            view = view[n:]
+        return total
+
+    def close(self) -> None:
+        if not self.closed:
+            self._finish_part()
+        super().close()
+
+    @property
+    def part_paths(self) -> t.List[str]:
+        return [str(Path(self.output_dir, name)) for name in sorted(self.checksums)]
+
+
+class ParallelGzipWriter(io.RawIOBase):
+    """Write-only gzip stream that compresses fixed-size blocks on a thread pool (zlib releases the GIL)
+
+    Every block becomes its own gzip member, the concatenation is still a valid gzip stream
+    that `tar -xz`/gunzip read transparently. Compressed blocks are written out in order and
+    at most 2 * threads blocks are in flight, so memory stays bounded.
+    """
 
+    def __init__(self, fileobj: t.BinaryIO, threads: int = os.cpu_count() or 1,
+                 block_size: int = 4 * 1024 * 1024, compresslevel: int = 6):
+        super().__init__()
+        self.fileobj = fileobj
+        self.block_size = block_size
+        self.compresslevel = compresslevel
+        self.max_in_flight = max(threads, 1) * 2
+        self._executor = ThreadPoolExecutor(max_workers=max(threads, 1))
+        self._pending: "deque[Future]" = deque()
+        self._buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def _drain(self, keep: int) -> None:
+        while len(self._pending) > keep:
+            self.fileobj.write(self._pending.popleft().result())
+
+    def _submit(self, block: bytes) -> None:
+        self._pending.append(self._executor.submit(gzip.compress, block, self.compresslevel))
+        self._drain(keep=self.max_in_flight)
+
+    def write(self, b) -> int:
+        self._buffer += b
+        while len(self._buffer) >= self.block_size:
+            self._submit(bytes(self._buffer[:self.block_size]))
+            del self._buffer[:self.block_size]
+        return len(b)
+
+    def close(self) -> None:
+        if not self.closed:
+            try:
+                if self._buffer:
+                    self._submit(bytes(self._buffer))
+                    self._buffer.clear()
+                self._drain(keep=0)
+            finally:
+                self._executor.shutdown(wait=True)
+        super().close()
+
+
+def write_export_archive(
+        export_base_dir: t.Union[str, Path],
+        output_dir: t.Union[str, Path],
+        revocation_map: t.Dict[str, bool],
+        chunk_size: t.Union[str, int] = "1G",
+        compress_threads: int = os.cpu_count() or 1) -> t.Dict[str, str]:
+    """Single pass over the export dir: tar -> parallel gzip -> fixed-size parts with inline md5s
+
+    Parsed jsons get their is_revoked_b flag patched on the way into the archive, so the
+    export dir itself is never rewritten. Compressed ones (.json.gz/.json.zst) are archived as
+    plain .json, the archive is compressed as a whole anyway.
+    :return: manifest dict of part filename -> md5
+    """
+    l.info("*** WRITING SPLIT, CHECKSUMMED EXPORT ARCHIVE ***")
+    export_base_dir = Path(export_base_dir).absolute()
+    json_dir = Path(export_base_dir, "json")
+    pdf_dir = Path(export_base_dir, "pdf")
+    chunk_size_bytes = chunk_size if isinstance(chunk_size, int) else parse_size(chunk_size)
 
-def create_manifest(file_list: t.List[str], manifest_path: t.Union[str, Path]) -> str:
+    try:
+        from common.utils.metadata_catalog import get_catalog
+    except ImportError:
+        # run outside the repo, doc names come from the .metadata files directly
+        catalog = None
+    else:
+        catalog = get_catalog()
+        catalog.refresh(pdf_dir)
+
+    parts = ChecksummedPartWriter(output_dir=output_dir, base_name="gc_data_export.tgz", chunk_size=chunk_size_bytes)
+    with parts:
+        with ParallelGzipWriter(parts, threads=compress_threads) as gz:
+            with tarfile.open(fileobj=gz, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+                tar.add(str(export_base_dir), arcname=".", recursive=False)
+                for path in sorted(export_base_dir.rglob("*")):
+                    arcname = "./" + path.relative_to(export_base_dir).as_posix()
+                    if path.parent == json_dir and get_parsed_json_suffix(path) and path.is_file():
+                        jdict = load_parsed_json(path)
+                        jdict["is_revoked_b"] = revocation_map[get_matching_doc_name(path, pdf_dir, catalog)]
+                        data = json.dumps(jdict).encode("utf-8")
+
+                        arcname = "./" + Path(path.relative_to(export_base_dir).parent,
+                                              get_parsed_json_stem(path) + ".json").as_posix()
+                        tarinfo = tar.gettarinfo(str(path), arcname=arcname)
+                        tarinfo.size = len(data)
+                        tar.addfile(tarinfo, io.BytesIO(data))
+                    else:
+                        tar.add(str(path), arcname=arcname, recursive=False)
+
+    return parts.checksums
+
+
+def create_manifest(checksums: t.Dict[str, str], manifest_path: t.Union[str, Path]) -> str:
     l.info("***CREATING MANIFEST OF CHECKSUMS***")
     manifest_path = Path(manifest_path).absolute()
-    manifest_dict = {}
-    for file in file_list:
-        manifest_dict[Path(file).name] = calculate_md5(file)
-
-    json.dump(manifest_dict, manifest_path.open('w'))
+    with manifest_path.open('w') as f:
+        json.dump(checksums, f)
     return str(manifest_path)
 
 
@@ -192,9 +353,20 @@ def arg_job_tmp_dir(s: str) -> str:
 
 
 def arg_chunk_size(s: str) -> str:
+    try:
+        parse_size(s)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
     return s.upper()
 
 
+def arg_int_gt_one(s: str) -> int:
+    num = abs(int(s))
+    if num < 1:
+        raise argparse.ArgumentTypeError("Invalid number, must be greater than one.")
+    return num
+
+
 def parse_args():
     parser = argparse.ArgumentParser(
         description="CLI for exporting PDF/JSON GC data",
@@ -234,11 +406,18 @@ def parse_args():
     )
     parser.add_argument(
         "--chunk-size",
-        help="number of parts the zip files will be split into",
+        help="size of each part the archive is split into, e.g. 1G or 500M",
         required=False,
         default="1G",
         type=arg_chunk_size
     )
+    parser.add_argument(
+        "--compress-threads",
+        help="number of threads used to compress the archive",
+        required=False,
+        default=os.cpu_count() or 1,
+        type=arg_int_gt_one
+    )
 
     return parser.parse_args()
 
@@ -254,51 +433,38 @@ if __name__ == "__main__":
     job_tmp_dir = args.job_tmp_dir
     manifest_filename = args.manifest_filename
     chunk_size = args.chunk_size
+    compress_threads = args.compress_threads
 
     export_base_tmp_dir = tempfile.TemporaryDirectory(dir=job_tmp_dir, prefix="export_base_dir_")
     export_base_dir = export_base_tmp_dir.name
 
-    partial_output_tmp_dir = tempfile.TemporaryDirectory(dir=job_tmp_dir, prefix="partial_output_dir_")
-    partial_output_dir = partial_output_tmp_dir.name
-
     final_output_tmp_dir = tempfile.TemporaryDirectory(dir=job_tmp_dir, prefix="final_output_dir_")
     final_output_dir = final_output_tmp_dir.name
 
     manifest_path = os.path.join(final_output_dir, manifest_filename)
 
     try:
-        snapshot_dict = copy_snapshots_from_s3(
+        copy_snapshots_from_s3(
             pdf_snapshot_prefix=pdf_snapshot_prefix,
             json_snapshot_prefix=json_snapshot_prefix,
             export_base_dir=export_base_dir
         )
-        parsed_json_dir = snapshot_dict["json_dir"]
-        pdf_dir = snapshot_dict["pdf_dir"]
 
         export_es_mappings(
             export_base_dir=export_base_dir
         )
 
         revocation_map = pull_revocations()
-        update_revocations(
-            parsed_json_dir=parsed_json_dir,
-            revocation_map=revocation_map,
-            pdf_dir=pdf_dir
-        )
-
-        compressed_path = zip_base_dir(
-            output_dir=partial_output_dir,
-            export_base_dir=export_base_dir
-        )
-
-        part_list = split_archive(
+        checksums = write_export_archive(
+            export_base_dir=export_base_dir,
             output_dir=final_output_dir,
-            archive_path=compressed_path,
-            chunk_size=chunk_size
+            revocation_map=revocation_map,
+            chunk_size=chunk_size,
+            compress_threads=compress_threads
         )
 
         manifest_path = create_manifest(
-            file_list=part_list,
+            checksums=checksums,
             manifest_path=manifest_path
         )
 
@@ -311,4 +477,3 @@ if __name__ == "__main__":
     finally:
         export_base_tmp_dir.cleanup()
         final_output_tmp_dir.cleanup()
-        partial_output_tmp_dir.cleanup()
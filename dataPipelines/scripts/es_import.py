@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import argparse
+import gzip
 import hashlib
 import json
 import logging
@@ -17,7 +18,15 @@ import csv
 import time
 import base64
 import urllib.parse as urp
-from multiprocessing.pool import ThreadPool
+import http.client
+import queue
+import threading
+from contextlib import contextmanager
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 
 def get_logger() -> logging.Logger:
@@ -50,6 +59,45 @@ def flexible_utf8_json_encoder(o: object) -> object:
         return json.JSONEncoder().default(o)
 
 
+# parsed json forms written by the parsers, see common.utils.parsed_json. Kept here so the script
+# runs on its own, outside the repo
+PARSED_JSON_SUFFIXES = ('.json.gz', '.json.zst', '.json')
+
+
+def get_parsed_json_suffix(path: t.Union[str, Path]) -> t.Optional[str]:
+    name = Path(path).name
+    return next((suffix for suffix in PARSED_JSON_SUFFIXES if name.endswith(suffix)), None)
+
+
+def get_parsed_json_stem(path: t.Union[str, Path]) -> str:
+    """File name without its (possibly compound) parsed json suffix"""
+    name = Path(path).name
+    suffix = get_parsed_json_suffix(name)
+    return name[:-len(suffix)] if suffix else Path(name).stem
+
+
+def iter_parsed_json_files(directory: t.Union[str, Path]) -> t.Iterator[Path]:
+    """Plain and compressed parsed jsons in directory (not recursive)"""
+    for p in Path(directory).iterdir():
+        if p.is_file() and get_parsed_json_suffix(p):
+            yield p
+
+
+def load_parsed_json(path: t.Union[str, Path]) -> t.Any:
+    """Load a parsed json, decompressing according to its suffix"""
+    suffix = get_parsed_json_suffix(path)
+    if suffix == '.json.gz':
+        with gzip.open(path, 'rb') as f:
+            return json.load(f)
+    if suffix == '.json.zst':
+        if zstandard is None:
+            raise RuntimeError("Reading .json.zst files requires the zstandard package")
+        with open(path, 'rb') as f, zstandard.ZstdDecompressor().stream_reader(f) as reader:
+            return json.load(reader)
+    with open(path, 'rb') as f:
+        return json.load(f)
+
+
 def calculate_md5(filepath: str) -> str:
     with open(filepath, "rb") as f:
         file_hash = hashlib.md5()
@@ -185,6 +233,285 @@ def es_request(
     )
 
 
+class EsConnectionPool:
+    """Persistent keep-alive HTTP connections to ES, one per thread"""
+
+    def __init__(self, es_conf: EsConfig, validate_ssl: bool = False, timeout: float = 120.0):
+        self.es_conf = es_conf
+        self.validate_ssl = validate_ssl
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        if self.es_conf.ssl_on:
+            return http.client.HTTPSConnection(
+                self.es_conf.host,
+                self.es_conf.port,
+                timeout=self.timeout,
+                context=NON_VALIDATING_SSL_CTX if not self.validate_ssl else None
+            )
+        return http.client.HTTPConnection(self.es_conf.host, self.es_conf.port, timeout=self.timeout)
+
+    @property
+    def connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._new_connection()
+            self._local.conn = conn
+        return conn
+
+    def reset(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+        self._local.conn = None
+
+    def request(self, url: str, method: str, body: t.Optional[bytes] = None,
+                content_type: str = "application/json") -> t.Tuple[int, bytes]:
+        headers = {"Content-Type": content_type, "Connection": "keep-alive"}
+        headers.update(self.es_conf.auth_header)
+        try:
+            self.connection.request(method.upper(), url, body=body, headers=headers)
+            resp = self.connection.getresponse()
+            # response has to be fully read before the connection can be reused
+            return resp.status, resp.read()
+        except (http.client.HTTPException, OSError):
+            self.reset()
+            raise
+
+
+def iter_bulk_batches(
+        actions: t.Iterable[t.Tuple[str, t.Dict[str, t.Any], t.Dict[str, t.Any]]],
+        max_batch_bytes: int = 10 * 1024 * 1024,
+        max_batch_docs: int = 5000) -> t.Iterator[t.Tuple[bytes, t.List[str]]]:
+    """Group (source_name, action_meta, doc) tuples into NDJSON _bulk bodies capped by size
+
+    Yields (ndjson_body, source_names) so callers can checkpoint what each batch covered.
+    """
+    lines: t.List[bytes] = []
+    sources: t.List[str] = []
+    size = 0
+    for source_name, action_meta, doc in actions:
+        entry = (
+            json.dumps(action_meta).encode("utf-8") + b"\n"
+            + json.dumps(doc, default=flexible_utf8_json_encoder).encode("utf-8") + b"\n"
+        )
+        if lines and (size + len(entry) > max_batch_bytes or len(sources) >= max_batch_docs):
+            yield b"".join(lines), sources
+            lines, sources, size = [], [], 0
+        lines.append(entry)
+        sources.append(source_name)
+        size += len(entry)
+
+    if lines:
+        yield b"".join(lines), sources
+
+
+class ImportCheckpoint:
+    """Append-only record of sources (json files, csv rows) that are already indexed
+
+    The index settings replaced by tuned_for_bulk_import are kept next to it in <path>.settings.json,
+    so a resumed import restores the settings from before the interrupted run.
+    """
+
+    def __init__(self, path: t.Optional[t.Union[str, Path]] = None):
+        self.path = Path(path).absolute() if path else None
+        self.completed: t.Set[str] = set()
+        self.original_settings: t.Optional[t.Dict[str, t.Any]] = None
+        self._lock = threading.Lock()
+        if self.settings_path and self.settings_path.exists():
+            self.original_settings = json.loads(self.settings_path.read_text(encoding="utf-8"))
+        if self.path and self.path.exists():
+            with self.path.open("r", encoding="utf-8") as f:
+                self.completed = set(line.rstrip("\n") for line in f if line.strip())
+            l.info("Resuming from checkpoint %s, %s sources already indexed", self.path, len(self.completed))
+
+    def __contains__(self, source_name: str) -> bool:
+        return source_name in self.completed
+
+    def mark_completed(self, source_names: t.Iterable[str]) -> None:
+        source_names = list(source_names)
+        with self._lock:
+            self.completed.update(source_names)
+            if self.path:
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write("".join(name + "\n" for name in source_names))
+
+    @property
+    def settings_path(self) -> t.Optional[Path]:
+        return self.path.with_name(self.path.name + ".settings.json") if self.path else None
+
+    def save_original_settings(self, settings: t.Dict[str, t.Any]) -> None:
+        self.original_settings = settings
+        if self.settings_path:
+            self.settings_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.settings_path.with_name(self.settings_path.name + ".part")
+            tmp_path.write_text(json.dumps(settings), encoding="utf-8")
+            tmp_path.replace(self.settings_path)
+
+    def clear_original_settings(self) -> None:
+        self.original_settings = None
+        if self.settings_path and self.settings_path.exists():
+            self.settings_path.unlink()
+
+
+def send_bulk(
+        pool: EsConnectionPool,
+        body: bytes,
+        retries: int = 5,
+        retry_interval: float = 1.0) -> None:
+    """Send one _bulk body, retrying with exponential backoff on connection errors, 429s and 5xx"""
+    attempt = 0
+    while True:
+        try:
+            status, resp_body = pool.request(url="/_bulk", method="POST", body=body,
+                                             content_type="application/x-ndjson")
+            if status == 429 or status >= 500:
+                raise Exception(f"Bulk request failed with status {status}")
+            if status >= 400:
+                raise ValueError(f"Bulk request rejected with status {status}: {resp_body[:1000]!r}")
+
+            resp = json.loads(resp_body)
+            if not resp.get("errors"):
+                return
+
+            item_errors = [
+                item_result
+                for item in resp.get("items", [])
+                for item_result in item.values()
+                if item_result.get("error")
+            ]
+            if all(item_result.get("status") == 429 for item_result in item_errors):
+                # only rejections from full queues, the whole batch is safe to resend since ids are fixed
+                raise Exception(f"Bulk request had {len(item_errors)} rejected items")
+            raise ValueError(f"Bulk request had {len(item_errors)} failed items, first: {item_errors[0]}")
+
+        except ValueError:
+            raise
+        except Exception as e:
+            if attempt >= retries:
+                raise
+            sleep_for = retry_interval * (2 ** attempt)
+            l.warning("Bulk request error: %s - retrying in %.1fs ...", str(e), sleep_for)
+            time.sleep(sleep_for)
+            attempt += 1
+
+
+def bulk_load(
+        actions: t.Iterable[t.Tuple[str, t.Dict[str, t.Any], t.Dict[str, t.Any]]],
+        es_conf: EsConfig,
+        max_threads: int = 10,
+        max_batch_bytes: int = 10 * 1024 * 1024,
+        checkpoint: t.Optional[ImportCheckpoint] = None) -> int:
+    """Stream actions into ES over keep-alive connections with max_threads bulk requests in flight
+
+    Batches are produced lazily and handed over through a bounded queue so memory use is
+    roughly max_threads * max_batch_bytes regardless of how much is being imported.
+    :return: number of documents indexed
+    """
+    pool = EsConnectionPool(es_conf)
+    batches: "queue.Queue[t.Optional[t.Tuple[bytes, t.List[str]]]]" = queue.Queue(maxsize=max_threads * 2)
+    errors: t.List[BaseException] = []
+    indexed = [0]
+    counter_lock = threading.Lock()
+
+    def worker() -> None:
+        while True:
+            batch = batches.get()
+            if batch is None:
+                break
+            if errors:
+                continue
+            body, source_names = batch
+            try:
+                send_bulk(pool, body)
+            except BaseException as e:
+                errors.append(e)
+                continue
+            if checkpoint:
+                checkpoint.mark_completed(source_names)
+            with counter_lock:
+                indexed[0] += len(source_names)
+                if indexed[0] % 10000 < len(source_names):
+                    l.info("Indexed %s documents ...", indexed[0])
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max_threads)]
+    for th in threads:
+        th.start()
+
+    try:
+        for batch in iter_bulk_batches(actions, max_batch_bytes=max_batch_bytes):
+            if errors:
+                break
+            batches.put(batch)
+    finally:
+        for _ in threads:
+            batches.put(None)
+        for th in threads:
+            th.join()
+
+    if errors:
+        raise errors[0]
+    return indexed[0]
+
+
+def get_index_settings(index_name: str, es_conf: EsConfig) -> t.Dict[str, t.Any]:
+    resp = es_request(
+        url=f"/{index_name}/_settings",
+        method='GET',
+        es_conf=es_conf
+    )
+    return json.loads(resp.read())[index_name]["settings"]["index"]
+
+
+def put_index_settings(index_name: str, settings: t.Dict[str, t.Any], es_conf: EsConfig) -> None:
+    resp = es_request(
+        url=f"/{index_name}/_settings",
+        method='PUT',
+        data={"index": settings},
+        es_conf=es_conf
+    )
+    l.info(resp.read().decode())
+
+
+BULK_IMPORT_SETTINGS = {"refresh_interval": "-1", "number_of_replicas": "0"}
+
+
+# disable refresh & replicas while bulk loading, restore them (and refresh) afterwards
+@contextmanager
+def tuned_for_bulk_import(
+        index_name: str,
+        es_conf: EsConfig,
+        checkpoint: t.Optional[ImportCheckpoint] = None) -> t.Iterator[None]:
+    if checkpoint and checkpoint.original_settings is not None:
+        # resuming, the index still has the bulk settings of the interrupted run
+        original = checkpoint.original_settings
+    else:
+        current = get_index_settings(index_name, es_conf=es_conf)
+        original = {
+            "refresh_interval": current.get("refresh_interval", "1s"),
+            "number_of_replicas": current.get("number_of_replicas", "1"),
+        }
+        for name, bulk_value in BULK_IMPORT_SETTINGS.items():
+            if str(original[name]) == bulk_value:
+                # left behind by an import that died before restoring, null resets to the default
+                l.warning("%s of %s is %s, it will be reset to the default afterwards",
+                          name, index_name, bulk_value)
+                original[name] = None
+        if checkpoint:
+            checkpoint.save_original_settings(original)
+
+    l.info("Tuning %s for bulk import, will restore %s afterwards ...", index_name, original)
+    put_index_settings(index_name, BULK_IMPORT_SETTINGS, es_conf=es_conf)
+    try:
+        yield
+    finally:
+        put_index_settings(index_name, original, es_conf=es_conf)
+        es_request(url=f"/{index_name}/_refresh", method='POST', es_conf=es_conf).read()
+        if checkpoint:
+            checkpoint.clear_original_settings()
+
+
 def index_exists(index_name: str, es_conf: EsConfig) -> bool:
     try:
         resp = es_request(
@@ -287,23 +614,24 @@ def insert_json(
                 raise(e)
 
 
-def insert_pub_json(index_name: str, json_path: t.Union[str, Path], es_conf: EsConfig, **insert_json_kwargs) -> None:
-    json_path = Path(json_path)
+def prep_pub_json(json_path: t.Union[str, Path]) -> t.Dict[str, t.Any]:
+    json_data = load_parsed_json(json_path)
 
-    def prep_json_data(json_path):
-        json_data = json.load(json_path.open("r", encoding="utf-8"))
+    if "text" in json_data:
+        del json_data["text"]
+    if "pages" in json_data:
+        del json_data["pages"]
+    if "raw_text" in json_data:
+        del json_data["raw_text"]
 
-        if "text" in json_data:
-            del json_data["text"]
-        if "pages" in json_data:
-            del json_data["pages"]
-        if "raw_text" in json_data:
-            del json_data["raw_text"]
+    return json_data
 
-        return json_data
 
-    json_data = prep_json_data(json_path)
-    doc_id = generate_doc_id(json_path.stem)
+def insert_pub_json(index_name: str, json_path: t.Union[str, Path], es_conf: EsConfig, **insert_json_kwargs) -> None:
+    json_path = Path(json_path)
+
+    json_data = prep_pub_json(json_path)
+    doc_id = generate_doc_id(get_parsed_json_stem(json_path))
 
     insert_json(
         index_name=index_name,
@@ -314,16 +642,38 @@ def insert_pub_json(index_name: str, json_path: t.Union[str, Path], es_conf: EsC
     )
 
 
+def iter_pub_dir_actions(
+        index_name: str,
+        json_dir: t.Union[str, Path],
+        checkpoint: t.Optional[ImportCheckpoint] = None) -> t.Iterator[t.Tuple[str, t.Dict[str, t.Any], t.Dict[str, t.Any]]]:
+    # plain and compressed (.json.gz/.json.zst) parsed jsons
+    for json_path in iter_parsed_json_files(Path(json_dir).absolute()):
+        if checkpoint and json_path.name in checkpoint:
+            continue
+        yield (
+            json_path.name,
+            {"index": {"_index": index_name, "_id": generate_doc_id(get_parsed_json_stem(json_path))}},
+            prep_pub_json(json_path)
+        )
 
 
 # insert directory of pub jsons into given index
-def index_pub_dir(index_name: str, json_dir: t.Union[str, Path], es_conf: EsConfig, max_threads: int = 10) -> None:
-    json_dir = Path(json_dir).absolute()
-
-    ThreadPool(max_threads).starmap(
-        insert_pub_json,
-        ((index_name, json_path, es_conf) for json_path in json_dir.glob("*.json"))
-    )
+def index_pub_dir(
+        index_name: str,
+        json_dir: t.Union[str, Path],
+        es_conf: EsConfig,
+        max_threads: int = 10,
+        max_batch_bytes: int = 10 * 1024 * 1024,
+        checkpoint: t.Optional[ImportCheckpoint] = None) -> None:
+    with tuned_for_bulk_import(index_name, es_conf=es_conf, checkpoint=checkpoint):
+        indexed = bulk_load(
+            actions=iter_pub_dir_actions(index_name, json_dir, checkpoint=checkpoint),
+            es_conf=es_conf,
+            max_threads=max_threads,
+            max_batch_bytes=max_batch_bytes,
+            checkpoint=checkpoint
+        )
+    l.info("Indexed %s publications into %s", indexed, index_name)
 
 
 def read_entities_csv(csv_file: t.Union[str, Path]) -> t.List[t.Dict[str, t.Any]]:
@@ -355,11 +705,32 @@ def read_entities_csv(csv_file: t.Union[str, Path]) -> t.List[t.Dict[str, t.Any]
     return entities
 
 
-def index_entities_csv(csv_file: t.Union[str, Path], index_name: str, es_conf: EsConfig, max_threads: int = 10) -> None:
-    ThreadPool(max_threads).starmap(
-        insert_json,
-        ((index_name, edata, es_conf) for edata in read_entities_csv(csv_file))
-    )
+def index_entities_csv(
+        csv_file: t.Union[str, Path],
+        index_name: str,
+        es_conf: EsConfig,
+        max_threads: int = 10,
+        max_batch_bytes: int = 10 * 1024 * 1024,
+        checkpoint: t.Optional[ImportCheckpoint] = None) -> None:
+    csv_name = Path(csv_file).name
+
+    def iter_actions() -> t.Iterator[t.Tuple[str, t.Dict[str, t.Any], t.Dict[str, t.Any]]]:
+        for row_num, edata in enumerate(read_entities_csv(csv_file)):
+            # row based ids keep re-runs of a partially imported csv from duplicating entities
+            source_name = f"{csv_name}:{row_num}"
+            if checkpoint and source_name in checkpoint:
+                continue
+            yield source_name, {"index": {"_index": index_name, "_id": generate_doc_id(source_name)}}, edata
+
+    with tuned_for_bulk_import(index_name, es_conf=es_conf, checkpoint=checkpoint):
+        indexed = bulk_load(
+            actions=iter_actions(),
+            es_conf=es_conf,
+            max_threads=max_threads,
+            max_batch_bytes=max_batch_bytes,
+            checkpoint=checkpoint
+        )
+    l.info("Indexed %s entities into %s", indexed, index_name)
 
 
 # insert entities csv into index
@@ -462,6 +833,17 @@ def parse_args() -> argparse.Namespace:
                         default=10,
                         required=False,
                         help="Number of threads to use for indexing")
+    parser.add_argument('--bulk-batch-mb',
+                        type=arg_int_gt_one,
+                        default=10,
+                        required=False,
+                        help="Max size of each bulk indexing request, in MB")
+    parser.add_argument('--checkpoint-dir',
+                        type=arg_job_tmp_dir,
+                        default=None,
+                        required=False,
+                        help="Directory for checkpoints of already indexed files, re-running with the same "
+                             "dir and --index-suffix resumes an interrupted import")
     parser.add_argument('--json-s3-prefix',
                         type=arg_s3_prefix_url,
                         required=True,
@@ -520,6 +902,8 @@ if __name__ == '__main__':
     es_password=args.es_pass
     es_ssl=args.es_ssl
     max_threads=args.threads
+    max_batch_bytes=args.bulk_batch_mb * 1024 * 1024
+    checkpoint_dir=args.checkpoint_dir
 
     json_s3_prefix = args.json_s3_prefix
     pdf_s3_prefix = args.pdf_s3_prefix
@@ -595,13 +979,19 @@ if __name__ == '__main__':
                     )
                 )
 
+            checkpoint = ImportCheckpoint(
+                Path(checkpoint_dir, f"{index_name}.checkpoint") if checkpoint_dir else None
+            )
+
             if alias_name == "entities" and alias_name not in unindexed_aliases:
                 l.info(f"Indexing entities into %s ...", index_name)
                 index_entities_csv(
                     csv_file=entities_csv,
                     index_name=index_name,
                     es_conf=es_conf,
-                    max_threads=max_threads
+                    max_threads=max_threads,
+                    max_batch_bytes=max_batch_bytes,
+                    checkpoint=checkpoint
                 )
 
             if alias_name == "gamechanger":
@@ -610,7 +1000,9 @@ if __name__ == '__main__':
                     index_name=index_name,
                     json_dir=json_dir_path,
                     es_conf=es_conf,
-                    max_threads=max_threads
+                    max_threads=max_threads,
+                    max_batch_bytes=max_batch_bytes,
+                    checkpoint=checkpoint
                 )
             if not skip_alias and alias_name not in unindexed_aliases:
                 l.info(f"Setting alias %s -> %s ...", alias_name, index_name)
@@ -17,17 +17,18 @@
 import os
 import json
 from pathlib import Path
+from common.utils.metadata_catalog import get_catalog
 
 def get_target_jsons(crawler, dir):
     """generate json file containing jsons compiled from metadata generated by a given crawler"""
-    files = [file for file in dir.glob("*.metadata")]
+    # only metadata files added or changed since the last run are read, the crawler match is an index lookup
+    catalog = get_catalog()
+    catalog.refresh(dir)
     lines = []
-    for filename in files:
-        with open(filename, 'r') as f:
-            data = json.load(f)
-            if data['crawler_used'] == crawler:
-                data['filename'] = Path(filename).stem
-                lines.append(data)
+    for entry in catalog.metadata_by_crawler(dir, crawler):
+        data = entry.get_metadata()
+        data['filename'] = Path(entry.path).stem
+        lines.append(data)
     return lines
 
 def write_output_json(lines, output_file, result_dir):
@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("elasticsearch")
+from click.testing import CliRunner
+
+try:
+    from dataPipelines.gc_cdo_pipeline import cli
+except ModuleNotFoundError as e:
+    pytest.skip(f"cdo pipeline dependencies not installed: {e}", allow_module_level=True)
+from dataPipelines.gc_elasticsearch_publisher import csv_loader
+
+CSV = (
+    "idx,row,ID,Title,CoAuthorID1,CoAuthorName1,CoAuthorID2,CoAuthorName2\n"
+    "0,0,p1,  ,a1,Ann,,\n"
+    "1,1,p2,empty title,a2,Bob,a3,Cy\n"
+)
+
+
+class FakeIndices:
+    def __init__(self):
+        self.updates = []
+
+    def exists_alias(self, name):
+        return False
+
+    def update_aliases(self, body):
+        self.updates.append(body)
+
+
+def test_run_indexes_formatted_rows_and_swaps_alias(tmp_path, monkeypatch):
+    docs = []
+
+    def fake_streaming_bulk(client, actions, index, **kwargs):
+        for action in actions:
+            docs.append((index, action))
+            yield True, action
+
+    es = SimpleNamespace(indices=FakeIndices())
+    monkeypatch.setattr(cli.Conf, "ch", SimpleNamespace(es_client=es))
+    monkeypatch.setattr(csv_loader.helpers, "streaming_bulk", fake_streaming_bulk)
+    path = tmp_path / "cdo.csv"
+    path.write_text(CSV, encoding="ISO-8859-1")
+
+    result = CliRunner().invoke(cli.cli, ["run", "-f", str(path), "--chunk-rows", "1"])
+
+    assert result.exit_code == 0, result.output
+    index = docs[0][0]
+    assert index.startswith("gc-cdo_")
+    assert [dict(doc) for _, doc in docs] == [
+        {"ID": "p1", "Title": "", "CoAuthors": [{"ID": "a1", "Name": "Ann"}]},
+        {"ID": "p2", "Title": "", "CoAuthors": [{"ID": "a2", "Name": "Bob"}, {"ID": "a3", "Name": "Cy"}]},
+    ]
+    assert es.indices.updates == [{"actions": [{"add": {"index": index, "alias": "gc-cdo"}}]}]
@@ -0,0 +1,85 @@
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("elasticsearch")
+
+from dataPipelines.gc_elasticsearch_publisher import csv_loader
+
+
+class FakeIndices:
+    def __init__(self, aliases):
+        self.aliases = aliases
+        self.updates = []
+
+    def exists_alias(self, name):
+        return any(name in a for a in self.aliases.values())
+
+    def get_alias(self, name):
+        return {index: {"aliases": {name: {}}} for index, a in self.aliases.items() if name in a}
+
+    def update_aliases(self, body):
+        self.updates.append(body)
+
+
+class FakeES:
+    def __init__(self, aliases=None):
+        self.indices = FakeIndices(aliases or {})
+
+
+@pytest.fixture
+def indexed(monkeypatch):
+    docs = []
+
+    def fake_streaming_bulk(client, actions, index, chunk_size, max_chunk_bytes, **kwargs):
+        for action in actions:
+            docs.append(action)
+            yield not action.get("fail"), action
+
+    monkeypatch.setattr(csv_loader.helpers, "streaming_bulk", fake_streaming_bulk)
+    return docs
+
+
+def write_csvs(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.csv").write_text("name,count\nx,1\ny,\n")
+    (tmp_path / "sub" / "b.csv").write_text("name,count\nNA,3\n")
+    (tmp_path / "notes.txt").write_text("ignored")
+
+
+def test_load_streams_every_file_and_swaps_alias(tmp_path, indexed):
+    write_csvs(tmp_path)
+    es = FakeES({"old": {"docs"}, "other": {"unrelated"}})
+    totals = csv_loader.load_csv_files(es, csv_loader.find_csv_files(tmp_path), "new", alias="docs",
+                                       chunk_rows=1, read_csv_kwargs={"keep_default_na": False})
+
+    assert totals == {"files": 2, "indexed": 3, "failed": 0}
+    assert sorted(map(tuple, (d.items() for d in indexed))) == sorted([
+        (("name", "x"), ("count", "1")), (("name", "y"), ("count", "")), (("name", "NA"), ("count", "3"))])
+    assert es.indices.updates == [{"actions": [{"remove": {"index": "old", "alias": "docs"}},
+                                               {"add": {"index": "new", "alias": "docs"}}]}]
+
+
+def test_missing_values_become_none_and_transform_runs_per_chunk(tmp_path, indexed):
+    write_csvs(tmp_path)
+    chunks = []
+
+    def transform(df):
+        chunks.append(len(df))
+        return df[["name"]]
+
+    csv_loader.load_csv_files(FakeES(), [tmp_path / "a.csv"], "new", transform=transform, chunk_rows=1)
+    assert chunks == [1, 1]
+    assert indexed == [{"name": "x"}, {"name": "y"}]
+
+    indexed.clear()
+    csv_loader.load_csv_files(FakeES(), [tmp_path / "a.csv"], "new")
+    assert indexed[1] == {"name": "y", "count": None}
+
+
+def test_failures_leave_alias_alone(tmp_path, indexed):
+    (tmp_path / "a.csv").write_text("name,fail\nx,\ny,yes\n")
+    es = FakeES({"old": {"docs"}})
+    with pytest.raises(RuntimeError):
+        csv_loader.load_csv_files(es, [tmp_path / "a.csv"], "new", alias="docs",
+                                  read_csv_kwargs={"keep_default_na": False})
+    assert es.indices.updates == []
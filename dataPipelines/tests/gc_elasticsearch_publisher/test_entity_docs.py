@@ -0,0 +1,44 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("elasticsearch")
+
+from dataPipelines.gc_elasticsearch_publisher.gc_elasticsearch_publisher import (
+    ConfiguredEntityPublisher, clean_string, clean_string_column
+)
+
+ROWS = [
+    {"entity_name": ' Department \nof "Defense"', "Website": "https://www.defense.gov", "Address": "\tThe Pentagon ",
+     "Government_Branch": "Executive", "Parent_Agency": "", "Related_Agency": "", "information": "  a\n b ",
+     "entity_type": "org", "crawlers": "dod_issuances", "num_mentions": 12, "Agency_Aliases": "DoD;DOD",
+     "information_source": "wiki", "information_retrieved": "2021-01-01"},
+    {"entity_name": "Navy", "Website": None, "Address": None, "Government_Branch": None, "Parent_Agency": "DoD",
+     "Related_Agency": None, "information": None, "entity_type": "org", "crawlers": None, "num_mentions": 3,
+     "Agency_Aliases": "USN", "information_source": None, "information_retrieved": None},
+]
+
+
+def test_clean_string_column_matches_clean_string():
+    values = ['a \t b', '\n lead', 'trail\n ', 'say "hi"', '', '   ', '\xa0x\xa0 y']
+    assert clean_string_column(pd.Series(values)).tolist() == [clean_string(v) for v in values]
+
+
+def test_get_docs_streams_chunks(tmp_path):
+    csv_path = tmp_path / "agencies.csv"
+    pd.DataFrame(ROWS).to_csv(csv_path, index=False)
+    publisher = ConfiguredEntityPublisher.__new__(ConfiguredEntityPublisher)
+    publisher.entity_csv_path = str(csv_path)
+    publisher.index_name = "entities"
+
+    docs = publisher.get_docs(chunksize=1)
+    assert not isinstance(docs, list)
+    docs = list(docs)
+    assert [d["_index"] for d in docs] == ["entities", "entities"]
+    assert docs[0]["_source"]["name"] == clean_string(ROWS[0]["entity_name"]) == " Department of 'Defense'"
+    assert docs[0]["_source"]["address"] == clean_string(ROWS[0]["Address"]) == "The Pentagon "
+    assert docs[0]["_source"]["aliases"] == [{"name": "DoD"}, {"name": "DOD"}]
+    assert docs[1]["_source"]["website"] == ""
+    assert docs[1]["_source"]["num_mentions"] == 3
+    assert list(docs[0]["_source"]) == ["name", "website", "address", "government_branch", "parent_agency",
+                                        "related_agency", "entity_type", "crawlers", "num_mentions", "aliases",
+                                        "information", "information_source", "information_retrieved"]
@@ -0,0 +1,102 @@
+import datetime as dt
+import inspect
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("botocore")
+pytest.importorskip("pydantic")
+
+from common.utils.s3 import TimestampedPrefix
+from dataPipelines.gc_ingest.pipelines.core import cli
+from dataPipelines.gc_ingest.pipelines.core.steps import CoreIngestSteps
+from dataPipelines.gc_ingest.tools.checkpoint.utils import DownloadedPrefix
+
+
+class FakeCheckpointManager:
+    """prefetching_downloads over prefix dirs already on disk"""
+
+    def __init__(self, prefix_dirs):
+        self.prefix_dirs = prefix_dirs
+
+    def prefetching_downloads(self, **kwargs):
+        for i, local_path in enumerate(self.prefix_dirs):
+            ts = dt.datetime(2021, 1, i + 1)
+            yield DownloadedPrefix(
+                local_path=local_path,
+                timestamped_prefix=TimestampedPrefix(prefix_path=f"checkpointed/{ts.isoformat()}",
+                                                     timestamp=ts, timestamp_str=ts.isoformat())
+            )
+
+
+def run_checkpoint_ingest(tmp_path, monkeypatch, prefix_files):
+    """Run core_checkpoint_ingest over prefixes holding prefix_files, returning the steps called in order"""
+    prefix_dirs = []
+    for i, files in enumerate(prefix_files):
+        prefix_dir = Path(tmp_path, "downloads", str(i))
+        prefix_dir.mkdir(parents=True)
+        for name in files:
+            Path(prefix_dir, name).write_text(name)
+        prefix_dirs.append(prefix_dir)
+    raw_doc_base_dir = Path(tmp_path, "raw_docs")
+    raw_doc_base_dir.mkdir()
+
+    cig = SimpleNamespace(
+        checkpoint_manager=FakeCheckpointManager(prefix_dirs),
+        download_base_dir=Path(tmp_path, "downloads"),
+        advance_checkpoint=True,
+        checkpoint_limit=-1,
+        max_threads=1,
+        max_staged_prefixes=2,
+        raw_doc_base_dir=raw_doc_base_dir,
+        crawler_output=Path(raw_doc_base_dir, "crawler_output.json"),
+    )
+    monkeypatch.setattr(cli.CheckpointIngestConfig, "from_core_config", lambda core_config, other_config_kwargs: cig)
+
+    calls = []
+
+    def record(name):
+        def step(c, **kwargs):
+            assert c is cig
+            if name.startswith("update_crawler_status"):
+                # the tracker reads the crawler output as soon as it's built
+                assert c.crawler_output.is_file()
+            calls.append((name, sorted(p.name for p in c.raw_doc_base_dir.iterdir())))
+        return step
+
+    for name in [n for n in vars(CoreIngestSteps) if not n.startswith("_")]:
+        monkeypatch.setattr(CoreIngestSteps, name, staticmethod(record(name)))
+
+    with pytest.raises(SystemExit) as exit_info:
+        # unwrap the click pass decorators, the core config is replaced by cig above
+        inspect.unwrap(cli.core_checkpoint_ingest.callback)(SimpleNamespace())
+        raise SystemExit(0)
+    return exit_info.value.code, calls
+
+
+def test_status_and_backups_run_once_after_first_prefix_is_copied(tmp_path, monkeypatch):
+    code, calls = run_checkpoint_ingest(
+        tmp_path, monkeypatch,
+        [[], ["a.pdf", "a.json", "crawler_output.json"], ["b.pdf", "b.json", "crawler_output.json"]]
+    )
+
+    assert code == 0
+    names = [name for name, _ in calls]
+    assert names == [
+        "update_crawler_status_downloaded", "update_crawler_status_in_progress", "backup_db", "backup_snapshots",
+        "update_thumbnails", "parse_and_ocr", "load_files", "update_s3_snapshots",
+        "update_thumbnails", "parse_and_ocr", "load_files", "update_s3_snapshots",
+        "update_s3_snapshots", "refresh_materialized_tables", "update_es", "update_neo4j",
+        "update_revocations", "update_crawler_status_completed",
+    ]
+    # each prefix is processed on its own
+    assert calls[0][1] == ["a.json", "a.pdf", "crawler_output.json"]
+    assert calls[8][1] == ["b.json", "b.pdf", "crawler_output.json"]
+
+
+def test_no_steps_run_when_every_prefix_is_empty(tmp_path, monkeypatch):
+    code, calls = run_checkpoint_ingest(tmp_path, monkeypatch, [[], []])
+
+    assert code == 1
+    assert calls == []
@@ -0,0 +1,69 @@
+import datetime as dt
+import threading
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("botocore")
+
+from common.utils.s3 import TimestampedPrefix
+from dataPipelines.gc_ingest.tools.checkpoint.utils import CheckpointManager
+
+
+class LocalCheckpointManager(CheckpointManager):
+    """Checkpointed prefixes that "download" by writing a file, with the checkpoint kept in memory"""
+
+    def __init__(self, n_prefixes: int):
+        self.prefixes = [
+            TimestampedPrefix(prefix_path=f"checkpointed/2021-01-0{i + 1}T00:00:00",
+                              timestamp=dt.datetime(2021, 1, i + 1), timestamp_str=f"2021-01-0{i + 1}T00:00:00")
+            for i in range(n_prefixes)
+        ]
+        self.checkpoint = None
+        self.pulled = []
+        self.pull_events = {p.prefix_path: threading.Event() for p in self.prefixes}
+
+    @property
+    def remaining_prefixes(self):
+        return [p for p in self.prefixes if self.checkpoint is None or p.timestamp > self.checkpoint]
+
+    @property
+    def current_checkpoint_ts(self):
+        return self.checkpoint
+
+    @current_checkpoint_ts.setter
+    def current_checkpoint_ts(self, new_value):
+        self.checkpoint = new_value
+
+    def pull_prefix(self, prefix, local_dir, max_threads=-1):
+        Path(local_dir).mkdir(exist_ok=True)
+        Path(local_dir, "doc.pdf").write_bytes(b"%PDF")
+        self.pulled.append(prefix.prefix_path)
+        self.pull_events[prefix.prefix_path].set()
+
+
+def test_prefetches_next_prefix_and_advances_per_prefix(tmp_path):
+    cpm = LocalCheckpointManager(3)
+    seen = []
+    for dp in cpm.prefetching_downloads(tmp_path, advance_checkpoint=True, max_staged=2, min_free_bytes=0):
+        seen.append(dp.timestamped_prefix.timestamp)
+        assert Path(dp.local_path, "doc.pdf").is_file()
+        # the next prefix downloads while this one is processed
+        next_index = len(seen)
+        if next_index < len(cpm.prefixes):
+            assert cpm.pull_events[cpm.prefixes[next_index].prefix_path].wait(5)
+        # processed so far, not including the current one
+        assert cpm.checkpoint == (seen[-2] if len(seen) > 1 else None)
+    assert seen == [p.timestamp for p in cpm.prefixes]
+    assert cpm.checkpoint == cpm.prefixes[-1].timestamp
+    # processed dirs are cleaned up
+    assert not any(tmp_path.iterdir())
+
+
+def test_checkpoint_stops_at_failed_prefix(tmp_path):
+    cpm = LocalCheckpointManager(3)
+    with pytest.raises(RuntimeError):
+        for dp in cpm.prefetching_downloads(tmp_path, advance_checkpoint=True, min_free_bytes=0):
+            if dp.timestamped_prefix == cpm.prefixes[1]:
+                raise RuntimeError("parse failed")
+    assert cpm.checkpoint == cpm.prefixes[0].timestamp
@@ -0,0 +1,52 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("click")
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+
+# only the commands that use them should pay for these
+HEAVY_MODULES = {"pandas", "gamechangerml", "elasticsearch", "neo4j", "common.document_parser"}
+
+
+# `python -m dataPipelines.gc_ingest <args>`, then the modules it left in sys.modules. -X importtime
+# doesn't see the lazy subcommands, importlib.import_module bypasses the import statement hook
+LIST_MODULES = """
+import runpy, sys
+sys.argv = ["gci", *sys.argv[1:]]
+try:
+    runpy.run_module("dataPipelines.gc_ingest", run_name="__main__", alter_sys=True)
+except SystemExit as e:
+    if e.code:
+        raise
+print(*sorted(sys.modules), sep="\\n", file=sys.stderr)
+"""
+
+
+def imported_modules(*args):
+    """Modules, and their top level packages, imported by `python -m dataPipelines.gc_ingest <args>`"""
+    result = subprocess.run(
+        [sys.executable, "-c", LIST_MODULES, *args],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if "ModuleNotFoundError" in result.stderr:
+        pytest.skip(f"ingest dependencies not installed: {result.stderr.strip().splitlines()[-1]}")
+    assert result.returncode == 0, result.stderr
+    modules = set()
+    for name in result.stderr.split():
+        modules.update({name, name.split(".")[0]})
+    return modules
+
+
+@pytest.mark.parametrize("args", [["--help"], ["tools", "--help"], ["tools", "db", "--help"], ["pipelines", "--help"]])
+def test_cli_help_skips_heavy_imports(args):
+    assert not HEAVY_MODULES & imported_modules(*args)
+
+
+def test_tools_db_skips_pipeline_modules():
+    modules = imported_modules("tools", "db", "--help")
+    assert "dataPipelines.gc_ingest.tools.db.cli" in modules
+    assert "dataPipelines.gc_ingest.pipelines.core.cli" not in modules
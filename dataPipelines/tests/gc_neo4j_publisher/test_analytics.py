@@ -0,0 +1,26 @@
+import pytest
+
+from dataPipelines.gc_neo4j_publisher.analytics import (AnalyticsState, choose_mode, mean_unit_vector, AUTO, FULL,
+                                                        INCREMENTAL)
+
+DAY = 24 * 60 * 60
+NOW = 100 * DAY
+
+
+def test_choose_mode():
+    recent = AnalyticsState(last_full_run=NOW - DAY, changes_since_full=0)
+    assert choose_mode(AUTO, 20, 1000, recent, now=NOW) == INCREMENTAL
+    # never ran, schedule due, change volume reached
+    assert choose_mode(AUTO, 20, 1000, AnalyticsState(None, 0), now=NOW) == FULL
+    assert choose_mode(AUTO, 20, 1000, AnalyticsState(NOW - 8 * DAY, 0), now=NOW) == FULL
+    assert choose_mode(AUTO, 20, 1000, AnalyticsState(NOW - DAY, 80), now=NOW) == FULL
+    # explicit modes win
+    assert choose_mode(FULL, 0, 1000, recent, now=NOW) == FULL
+    assert choose_mode(INCREMENTAL, 900, 1000, AnalyticsState(None, 0), now=NOW) == INCREMENTAL
+    with pytest.raises(ValueError):
+        choose_mode('partial', 0, 1000, recent, now=NOW)
+
+
+def test_mean_unit_vector():
+    assert mean_unit_vector([]) is None
+    assert mean_unit_vector([[3.0, 0.0], [0.0, 0.0]]) == pytest.approx([1.0, 0.0])
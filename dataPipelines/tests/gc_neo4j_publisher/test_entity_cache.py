@@ -0,0 +1,26 @@
+from dataPipelines.gc_neo4j_publisher.entity_cache import EntityCache, merge_stats
+
+
+def test_entity_cache_bounded_lru_with_stats():
+    calls = []
+
+    def compute(key):
+        calls.append(key)
+        return key.upper()
+
+    cache = EntityCache(maxsize=2)
+    cache.prewarm(["dod"], compute)
+    assert cache.get("dod", compute) == "DOD"
+    assert cache.get("navy", compute) == "NAVY"
+    assert cache.get("dod", compute) == "DOD"
+    # evicts navy, the least recently used
+    assert cache.get("army", compute) == "ARMY"
+    assert cache.get("navy", compute) == "NAVY"
+    assert calls == ["dod", "navy", "army", "navy"]
+    assert cache.stats() == {"hits": 2, "misses": 3, "size": 2}
+
+
+def test_merge_stats():
+    merged = merge_stats([{"hits": 3, "misses": 1, "size": 4}, {"hits": 1, "misses": 3, "size": 4}])
+    assert merged == {"hits": 4, "misses": 4, "size": 8, "hit_rate": 0.5}
+    assert merge_stats([])["hit_rate"] == 0.0
@@ -0,0 +1,71 @@
+import numpy as np
+
+from dataPipelines.gc_neo4j_publisher.similarity import reverse_neighbor_rows, top_k_similar
+
+
+def brute_force(vectors, k, cutoff):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    sims = unit @ unit.T
+    pairs = set()
+    for i in range(len(vectors)):
+        ranked = [j for j in np.argsort(-sims[i], kind="stable") if j != i]
+        pairs.update((i, j) for j in (ranked[:k] if k else ranked) if sims[i, j] >= cutoff)
+    return pairs
+
+
+def test_top_k_matches_brute_force_across_blocks():
+    vectors = np.random.RandomState(0).normal(size=(50, 8)) + 0.5
+    for k in (0, 3):
+        sources, targets, sims = top_k_similar(vectors, k=k, cutoff=0.5, block_size=7)
+        assert set(zip(sources.tolist(), targets.tolist())) == brute_force(vectors, k, 0.5)
+        assert np.all(sims >= 0.5)
+        # never similar to itself, most similar first within a row
+        assert not np.any(sources == targets)
+        for row in np.unique(sources):
+            assert np.all(np.diff(sims[sources == row]) <= 1e-6)
+
+
+def test_top_k_edge_cases():
+    assert [len(a) for a in top_k_similar(np.zeros((0, 4)))] == [0, 0, 0]
+    sources, targets, _ = top_k_similar(np.array([[1.0, 0.0], [1.0, 0.1], [0.0, 1.0]]), k=1, cutoff=0.5)
+    assert list(zip(sources.tolist(), targets.tolist())) == [(0, 1), (1, 0)]
+
+
+def test_top_k_for_some_rows():
+    vectors = np.random.RandomState(1).normal(size=(30, 6))
+    sources, targets, sims = top_k_similar(vectors, k=4, cutoff=-1.0, block_size=4)
+    rows = [2, 17, 29]
+    some = top_k_similar(vectors, k=4, cutoff=-1.0, block_size=2, rows=rows)
+    mask = np.isin(sources, rows)
+    assert some[0].tolist() == sources[mask].tolist()
+    assert some[1].tolist() == targets[mask].tolist()
+    assert np.allclose(some[2], sims[mask])
+
+
+def test_incremental_rows_reproduce_a_full_recompute():
+    rng = np.random.RandomState(2)
+    vectors = rng.normal(size=(80, 6)) + 0.3
+    k, cutoff = 3, 0.2
+    old_edges = brute_force(vectors, k, cutoff)
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    changed = [5, 40]
+    vectors = vectors.copy()
+    vectors[changed] = rng.normal(size=(2, 6)) + 0.3
+
+    # what create_similarity_relationships reads off the stored edges
+    entry_similarity = np.full(len(vectors), cutoff, dtype=np.float32)
+    for row in range(len(vectors)):
+        sims = [unit[row] @ unit[j] for i, j in old_edges if i == row]
+        if len(sims) >= k:
+            entry_similarity[row] = max(cutoff, min(sims))
+    entering = reverse_neighbor_rows(vectors, changed, entry_similarity, block_size=1)
+    leaving = sorted({i for i, j in old_edges if j in changed})
+    assert len(entering)
+    rows = np.union1d(np.union1d(changed, entering), leaving)
+
+    sources, targets, _ = top_k_similar(vectors, k=k, cutoff=cutoff, rows=rows)
+    incremental = {(i, j) for i, j in old_edges if i not in rows}
+    incremental.update(zip(sources.tolist(), targets.tolist()))
+    assert incremental == brute_force(vectors, k, cutoff)
+    assert not set(changed) & set(entering.tolist())
@@ -0,0 +1,97 @@
+from contextlib import contextmanager
+
+import pytest
+
+neo4j = pytest.importorskip("neo4j")
+pytest.importorskip("gamechangerml")
+
+from dataPipelines.gc_neo4j_publisher import neo4j_publisher
+
+
+class FakeResult:
+    def __init__(self, count):
+        self.count = count
+
+    def single(self):
+        return {"count": self.count}
+
+
+class FakeConnectionHelper:
+    """Sessions that count their rows, failing transiently for the chunks listed in flaky"""
+
+    def __init__(self, flaky=(), broken=()):
+        self.flaky = set(flaky)
+        self.broken = set(broken)
+        self.calls = []
+
+    @contextmanager
+    def neo4j_session_scope(self):
+        helper = self
+
+        class Session:
+            def run(self, query, rows):
+                helper.calls.append(rows[0])
+                if rows[0] in helper.broken:
+                    raise neo4j.exceptions.TransientError("still deadlocked")
+                if rows[0] in helper.flaky:
+                    helper.flaky.discard(rows[0])
+                    raise neo4j.exceptions.TransientError("deadlock")
+                return FakeResult(len(rows))
+
+        yield Session()
+
+
+def test_run_unwind_batches_retries_chunks(monkeypatch):
+    helper = FakeConnectionHelper(flaky=[10], broken=[20])
+    monkeypatch.setattr(neo4j_publisher.MainConfig, "connection_helper", helper)
+
+    summary = neo4j_publisher.run_unwind_batches("UNWIND $rows AS row RETURN count(row) AS count", list(range(25)),
+                                                 batch_size=10, max_retries=2, backoff=0)
+    assert summary["batches"] == 3
+    # the flaky chunk succeeded on its retry, the broken one gave up after 3 tries
+    assert summary["count"] == 20
+    assert len(summary["errors"]) == 1 and summary["errors"][0].startswith("rows 20-24")
+    assert sorted(helper.calls) == [0, 10, 10, 20, 20, 20]
+
+
+class RowsConnectionHelper:
+    """Sessions that keep the query and rows of every run"""
+
+    def __init__(self):
+        self.runs = []
+
+    @contextmanager
+    def neo4j_session_scope(self):
+        helper = self
+
+        class Session:
+            def run(self, query, rows):
+                helper.runs.append((query, rows))
+                return FakeResult(len(rows))
+
+        yield Session()
+
+
+class FakeQueue:
+    def put(self, item):
+        pass
+
+
+def test_process_dir_flags_written_docs_in_one_batch(tmp_path, monkeypatch):
+    helper = RowsConnectionHelper()
+    queries = []
+    monkeypatch.setattr(neo4j_publisher.MainConfig, "connection_helper", helper)
+    monkeypatch.setattr(neo4j_publisher, "process_query", lambda query, *args, **kwargs: queries.append(query))
+    monkeypatch.setattr(neo4j_publisher.Neo4jPublisher, "process_entity_list", lambda self, j, key="orgs": {})
+    for name in ["a", "b"]:
+        (tmp_path / f"{name}.json").write_text(f'{{"id": "{name}", "filename": "{name}.pdf"}}')
+    (tmp_path / "notes.txt").write_text("not a doc")
+
+    publisher = neo4j_publisher.Neo4jPublisher.__new__(neo4j_publisher.Neo4jPublisher)
+    publisher.process_dir(sorted(p.name for p in tmp_path.iterdir()), str(tmp_path), FakeQueue(), max_threads=1)
+
+    # one write per doc, the pending flags in a single UNWIND
+    assert len(queries) == 2 and all("createDocumentNodesFromJson" in q for q in queries)
+    assert len(helper.runs) == 1
+    query, rows = helper.runs[0]
+    assert "analytics_pending" in query and rows == ["a.pdf", "b.pdf"]
@@ -0,0 +1,44 @@
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from dataPipelines.gc_thumbnails import utils
+from dataPipelines.gc_thumbnails.utils import ThumbnailsCreator
+
+
+class LegacyPixmap:
+    """Only the PyMuPDF < 1.19 camelCase api"""
+
+    def writePNG(self, path):
+        with open(path, "wb") as f:
+            f.write(b"png")
+
+
+class LegacyPage:
+    def getPixmap(self, matrix=None):
+        self.matrix = matrix
+        return LegacyPixmap()
+
+
+class LegacyDoc:
+    closed = False
+
+    def loadPage(self, number):
+        return LegacyPage()
+
+    def close(self):
+        LegacyDoc.closed = True
+
+
+def test_thumbnail_with_legacy_pymupdf_api(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils.fitz, "open", lambda path: LegacyDoc())
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF")
+    creator = ThumbnailsCreator(tmp_path, tmp_path / "out", shrink_factor=1, max_workers=1)
+    (tmp_path / "out").mkdir()
+
+    result = creator.generate_thumbnails(pdf)
+
+    assert result.succeeded, result.error
+    assert (tmp_path / "out" / "doc.png").read_bytes() == b"png"
+    assert LegacyDoc.closed
@@ -0,0 +1,104 @@
+import gzip
+import importlib.util
+import io
+import sys
+from pathlib import Path
+
+import pytest
+
+from common.utils.parsed_json import dump_parsed_json
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[2] / "scripts"
+
+
+def load_script(name):
+    spec = importlib.util.spec_from_file_location(name, SCRIPTS_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_pub_dir_actions_include_compressed_jsons(tmp_path):
+    es_import = load_script("es_import")
+    dump_parsed_json({"id": "a", "text": "dropped", "title": "A"}, tmp_path, "DoDI 1.1", compression=None)
+    dump_parsed_json({"id": "b", "pages": [], "title": "B"}, tmp_path, "DoDI 2.2", compression="gzip")
+    (tmp_path / "notes.txt").write_text("not a doc")
+
+    actions = sorted(es_import.iter_pub_dir_actions("gamechanger", tmp_path))
+
+    assert [name for name, _, _ in actions] == ["DoDI 1.1.json", "DoDI 2.2.json.gz"]
+    assert [action["index"]["_id"] for _, action, _ in actions] == [
+        es_import.generate_doc_id("DoDI 1.1"), es_import.generate_doc_id("DoDI 2.2")]
+    assert [doc for _, _, doc in actions] == [{"id": "a", "title": "A"}, {"id": "b", "title": "B"}]
+
+
+@pytest.fixture
+def without_repo_modules(monkeypatch):
+    """The scripts are also run on their own, where the repo's packages can't be imported"""
+    for name in [n for n in sys.modules if n == "common" or n.startswith("common.")]:
+        monkeypatch.delitem(sys.modules, name)
+    monkeypatch.setitem(sys.modules, "common", None)
+
+
+def test_es_import_reads_compressed_jsons_without_the_repo(tmp_path, without_repo_modules):
+    (tmp_path / "a.json").write_text('{"id": "a", "raw_text": "dropped"}')
+    with gzip.open(tmp_path / "b.json.gz", "wt") as f:
+        f.write('{"id": "b"}')
+    es_import = load_script("es_import")
+
+    actions = sorted(es_import.iter_pub_dir_actions("gamechanger", tmp_path))
+
+    assert [action["index"]["_id"] for _, action, _ in actions] == [
+        es_import.generate_doc_id("a"), es_import.generate_doc_id("b")]
+    assert [doc for _, _, doc in actions] == [{"id": "a"}, {"id": "b"}]
+
+
+def test_es_export_reads_compressed_jsons_without_the_repo(tmp_path, without_repo_modules):
+    with gzip.open(tmp_path / "DoDI 1.1.json.gz", "wt") as f:
+        f.write('{"id": "a"}')
+    (tmp_path / "DoDI 1.1.pdf.metadata").write_text('{"doc_name": "DoDI 1.1 Change 1"}')
+    es_export = load_script("es_export")
+
+    assert es_export.load_parsed_json(tmp_path / "DoDI 1.1.json.gz") == {"id": "a"}
+    assert es_export.get_matching_doc_name(tmp_path / "DoDI 1.1.json.gz", tmp_path) == "DoDI 1.1 Change 1"
+
+
+class FakeIndexSettings:
+    def __init__(self, es_import, monkeypatch, settings):
+        self.settings = settings
+        self.puts = []
+        monkeypatch.setattr(es_import, "get_index_settings", lambda index_name, es_conf: dict(self.settings))
+        monkeypatch.setattr(es_import, "put_index_settings", self.put)
+        monkeypatch.setattr(es_import, "es_request", lambda **kwargs: io.BytesIO(b"{}"))
+
+    def put(self, index_name, settings, es_conf):
+        self.puts.append(settings)
+        self.settings.update(settings)
+
+
+def test_resumed_import_restores_settings_from_before_the_interruption(tmp_path, monkeypatch):
+    es_import = load_script("es_import")
+    es = FakeIndexSettings(es_import, monkeypatch, {"refresh_interval": "30s", "number_of_replicas": "2"})
+    checkpoint_path = tmp_path / "gamechanger.checkpoint"
+
+    # hard kill mid import, the context is never exited (the reference keeps it from being closed)
+    killed = es_import.tuned_for_bulk_import("gamechanger", None, es_import.ImportCheckpoint(checkpoint_path))
+    killed.__enter__()
+    assert es.settings == {"refresh_interval": "-1", "number_of_replicas": "0"}
+
+    checkpoint = es_import.ImportCheckpoint(checkpoint_path)
+    with es_import.tuned_for_bulk_import("gamechanger", None, checkpoint):
+        pass
+
+    assert es.settings == {"refresh_interval": "30s", "number_of_replicas": "2"}
+    assert checkpoint.original_settings is None and not checkpoint.settings_path.exists()
+
+
+def test_bulk_settings_are_never_taken_as_originals(monkeypatch):
+    es_import = load_script("es_import")
+    es = FakeIndexSettings(es_import, monkeypatch, {"refresh_interval": "-1", "number_of_replicas": "0"})
+
+    with es_import.tuned_for_bulk_import("gamechanger", None):
+        pass
+
+    assert es.puts[-1] == {"refresh_interval": None, "number_of_replicas": None}
@@ -1,6 +1,6 @@
 import click
 from rpa.edl_zip_mover import move_zips
-from rpa.rpa_landing_zone_mover import filter_and_move
+from rpa.rpa_landing_zone_mover import filter_and_move, compact_manifests
 
 
 @click.group()
@@ -16,3 +16,9 @@ def move_from_edl():
 @cli.command()
 def filter_move():
     filter_and_move()
+
+
+@cli.command(name='compact-manifests')
+@click.argument('crawlers', nargs=-1, required=True)
+def compact_manifests_command(crawlers):
+    compact_manifests(crawlers)
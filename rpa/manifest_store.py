@@ -0,0 +1,307 @@
+import bisect
+import datetime
+import glob
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import typing
+
+from botocore.exceptions import ClientError
+
+
+def version_hash_key(version_hash: str) -> bytes:
+    """Fixed-width index key for a version hash"""
+    return hashlib.blake2b(version_hash.encode('utf-8'), digest_size=VersionHashIndex.KEY_WIDTH).digest()
+
+
+class _SortedKeys(typing.Sequence):
+    """Sequence view over a buffer of sorted fixed-width keys, so bisect can search it in place"""
+
+    def __init__(self, buf, offset: int, count: int, width: int):
+        self.buf = buf
+        self.offset = offset
+        self.count = count
+        self.width = width
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: int) -> bytes:
+        start = self.offset + i * self.width
+        return self.buf[start:start + self.width]
+
+
+class VersionHashIndex:
+    """Compact, sorted set of version hash keys with an in-memory overlay for newly seen hashes
+
+    Serialized layout:
+        MAGIC | uint32 key width | uint64 key count | uint64 meta length | meta json | sorted keys
+    meta holds the names of the manifest segments the keys were built from
+    """
+
+    MAGIC = b'GCVHIDX1'
+    KEY_WIDTH = 16
+    _HEADER = struct.Struct('<8sIQQ')
+
+    def __init__(self, buf=b'', covered_segments: typing.Optional[typing.Iterable[str]] = None):
+        self._mmap = None
+        self.covered_segments: typing.Set[str] = set(covered_segments or [])
+        self._keys = _SortedKeys(buf, 0, 0, self.KEY_WIDTH)
+        self._overlay: typing.Set[bytes] = set()
+
+        if buf:
+            magic, width, count, meta_len = self._HEADER.unpack_from(buf, 0)
+            if magic != self.MAGIC or width != self.KEY_WIDTH:
+                raise ValueError("Not a version hash index or unsupported key width")
+            offset = self._HEADER.size
+            meta = json.loads(bytes(buf[offset:offset + meta_len]).decode('utf-8'))
+            self.covered_segments.update(meta.get('covered_segments', []))
+            self._keys = _SortedKeys(buf, offset + meta_len, count, width)
+
+    @classmethod
+    def from_file(cls, path: typing.Union[str, os.PathLike]) -> 'VersionHashIndex':
+        """Memory-map a serialized index from local disk"""
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return cls()
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        index = cls(mm)
+        index._mmap = mm
+        return index
+
+    def __contains__(self, version_hash: str) -> bool:
+        key = version_hash_key(version_hash)
+        if key in self._overlay:
+            return True
+        i = bisect.bisect_left(self._keys, key)
+        return i < len(self._keys) and self._keys[i] == key
+
+    def __len__(self) -> int:
+        return len(self._keys) + len(self._overlay)
+
+    def add(self, version_hash: str) -> None:
+        self._overlay.add(version_hash_key(version_hash))
+
+    def iter_keys(self) -> typing.Iterator[bytes]:
+        for i in range(len(self._keys)):
+            yield self._keys[i]
+        yield from self._overlay
+
+    def to_bytes(self, covered_segments: typing.Optional[typing.Iterable[str]] = None) -> bytes:
+        """Serialize the index (base keys + overlay) as a single sorted run"""
+        keys = sorted(set(self.iter_keys()))
+        segments = sorted(self.covered_segments if covered_segments is None else covered_segments)
+        meta = json.dumps({'covered_segments': segments}).encode('utf-8')
+        header = self._HEADER.pack(self.MAGIC, self.KEY_WIDTH, len(keys), len(meta))
+        return b''.join([header, meta, *keys])
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+class SegmentedManifestStore:
+    """Append-only cumulative manifest for a single crawler, stored as jsonlines segments on s3
+
+    Layout under the store prefix:
+        segments/<timestamp>.jsonl  - one segment per append, never rewritten
+        version-hashes.idx          - VersionHashIndex over all segments it lists as covered
+
+    Loading reads the index plus any segments appended since it was last compacted,
+    appending writes one new small segment, and compaction folds new segments into the index
+    (and merges small segments together) without touching what readers already use.
+    """
+
+    SEGMENTS_DIR = 'segments'
+    INDEX_NAME = 'version-hashes.idx'
+    SEGMENT_TS_FORMAT = '%Y%m%dT%H%M%S%f'
+    DEFAULT_MAX_UNCOMPACTED_SEGMENTS = 16
+    DEFAULT_MAX_UNCOMPACTED_BYTES = 32 * 1024 * 1024
+
+    def __init__(self, s3_client, bucket: str, prefix: str, legacy_manifest_key: typing.Optional[str] = None,
+                 max_uncompacted_segments: int = DEFAULT_MAX_UNCOMPACTED_SEGMENTS,
+                 max_uncompacted_bytes: int = DEFAULT_MAX_UNCOMPACTED_BYTES,
+                 cache_dir: typing.Optional[str] = None):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.prefix = prefix.rstrip('/')
+        self.legacy_manifest_key = legacy_manifest_key
+        self.max_uncompacted_segments = max_uncompacted_segments
+        self.max_uncompacted_bytes = max_uncompacted_bytes
+        self.cache_dir = cache_dir or tempfile.gettempdir()
+        self._lock = threading.Lock()
+        # the background compactor and the mover share the local index cache
+        self._index_lock = threading.Lock()
+
+    @property
+    def index_key(self) -> str:
+        return f"{self.prefix}/{self.INDEX_NAME}"
+
+    @property
+    def segments_prefix(self) -> str:
+        return f"{self.prefix}/{self.SEGMENTS_DIR}/"
+
+    def segment_key(self, name: str) -> str:
+        return f"{self.segments_prefix}{name}"
+
+    def list_segments(self) -> typing.List[typing.Tuple[str, int]]:
+        """(segment name, size in bytes) for every segment, in append order"""
+        segments = []
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.segments_prefix):
+            for obj in page.get('Contents', []):
+                name = obj['Key'][len(self.segments_prefix):]
+                if name.endswith('.jsonl'):
+                    segments.append((name, obj['Size']))
+        return sorted(segments)
+
+    def _object_exists(self, key: str) -> bool:
+        try:
+            self.s3_client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError:
+            return False
+
+    def _migrate_legacy_manifest(self) -> None:
+        """Adopt a legacy single-file cumulative manifest as the first segment (server side copy)"""
+        if not self.legacy_manifest_key or not self._object_exists(self.legacy_manifest_key):
+            return
+        name = "00000000T000000000000-legacy.jsonl"
+        print(f"Adopting legacy manifest {self.legacy_manifest_key} as segment {name}")
+        self.s3_client.copy_object(
+            Bucket=self.bucket,
+            Key=self.segment_key(name),
+            CopySource={'Bucket': self.bucket, 'Key': self.legacy_manifest_key}
+        )
+
+    def iter_segment_lines(self, name: str) -> typing.Iterator[dict]:
+        body = self.s3_client.get_object(Bucket=self.bucket, Key=self.segment_key(name))['Body']
+        for line in body.iter_lines():
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+    def _load_index(self) -> VersionHashIndex:
+        """Download the compacted index to local disk (skipped if unchanged) and memory-map it"""
+        try:
+            etag = self.s3_client.head_object(Bucket=self.bucket, Key=self.index_key)['ETag'].strip('"')
+        except ClientError:
+            return VersionHashIndex()
+
+        cache_name = hashlib.sha1(f"{self.bucket}/{self.index_key}".encode('utf-8')).hexdigest()
+        local_path = os.path.join(self.cache_dir, f"{cache_name}.{etag}.idx")
+        with self._index_lock:
+            if not os.path.exists(local_path):
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f".{cache_name}.", suffix='.part')
+                os.close(fd)
+                try:
+                    self.s3_client.download_file(self.bucket, self.index_key, tmp_path)
+                    os.replace(tmp_path, local_path)
+                except BaseException:
+                    try:
+                        os.remove(tmp_path)
+                    except FileNotFoundError:
+                        pass
+                    raise
+
+            index = VersionHashIndex.from_file(local_path)
+            # mapped already, indexes still in use by others stay readable once their file is removed
+            for stale_path in glob.glob(os.path.join(self.cache_dir, f"{cache_name}.*.idx")):
+                if stale_path != local_path:
+                    try:
+                        os.remove(stale_path)
+                    except FileNotFoundError:
+                        pass
+
+        return index
+
+    def load_version_hashes(self, max_attempts: int = 3) -> VersionHashIndex:
+        """Index of every version hash in the manifest, topped up with segments newer than the index"""
+        segments = self.list_segments()
+        if not segments:
+            self._migrate_legacy_manifest()
+
+        for attempt in range(1, max_attempts + 1):
+            index = self._load_index()
+            try:
+                for name, _ in self.list_segments():
+                    if name in index.covered_segments:
+                        continue
+                    for jsondoc in self.iter_segment_lines(name):
+                        version_hash = jsondoc.get('version_hash', None)
+                        if version_hash:
+                            index.add(version_hash)
+                return index
+            except ClientError as e:
+                index.close()
+                # a concurrent compaction merged away a segment between listing and reading it
+                if e.response.get('Error', {}).get('Code') != 'NoSuchKey' or attempt == max_attempts:
+                    raise
+
+    def append_segment(self, lines: typing.List[dict]) -> typing.Optional[str]:
+        """Write lines as a new segment, returns the segment name"""
+        if not lines:
+            return None
+        name = f"{datetime.datetime.utcnow().strftime(self.SEGMENT_TS_FORMAT)}.jsonl"
+        body = ''.join(json.dumps(jsondoc) + '\n' for jsondoc in lines).encode('utf-8')
+        self.s3_client.put_object(Body=body, Bucket=self.bucket, Key=self.segment_key(name))
+        return name
+
+    def needs_compaction(self) -> bool:
+        index = self._load_index()
+        try:
+            uncovered = [(name, size) for name, size in self.list_segments() if name not in index.covered_segments]
+        finally:
+            index.close()
+        return (
+            len(uncovered) > self.max_uncompacted_segments
+            or sum(size for _, size in uncovered) > self.max_uncompacted_bytes
+        )
+
+    def compact(self) -> None:
+        """Fold uncovered segments into the index and merge them into a single segment
+
+        Segments appended while this runs have later names and are simply left for the next compaction.
+        """
+        with self._lock:
+            index = self._load_index()
+            try:
+                existing = [name for name, _ in self.list_segments()]
+                uncovered = [name for name in existing if name not in index.covered_segments]
+                if not uncovered:
+                    return
+
+                merged_name = uncovered[-1].replace('.jsonl', '-merged.jsonl') if len(uncovered) > 1 else None
+                with tempfile.TemporaryFile(mode='w+b') as merged:
+                    for name in uncovered:
+                        for jsondoc in self.iter_segment_lines(name):
+                            version_hash = jsondoc.get('version_hash', None)
+                            if version_hash:
+                                index.add(version_hash)
+                            if merged_name:
+                                merged.write((json.dumps(jsondoc) + '\n').encode('utf-8'))
+
+                    # names of segments removed by earlier merges drop out of the index metadata here
+                    covered = set(existing)
+                    if merged_name:
+                        merged.seek(0)
+                        self.s3_client.upload_fileobj(merged, self.bucket, self.segment_key(merged_name))
+                        covered.add(merged_name)
+
+                self.s3_client.put_object(
+                    Body=index.to_bytes(covered_segments=covered),
+                    Bucket=self.bucket,
+                    Key=self.index_key
+                )
+            finally:
+                index.close()
+
+            # merged segment and index are in place, the originals are now redundant
+            if merged_name:
+                for name in uncovered:
+                    self.s3_client.delete_object(Bucket=self.bucket, Key=self.segment_key(name))
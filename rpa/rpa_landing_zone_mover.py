@@ -1,7 +1,10 @@
 import boto3
+from boto3.s3.transfer import TransferConfig
+import os
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 from zipfile import ZipFile
-from io import BytesIO
 from notification import slack
 from notification.slack import notify_with_tb
 import json
@@ -9,6 +12,8 @@ import typing
 import datetime
 import traceback
 import codecs
+from rpa.s3 import S3RangedFile
+from rpa.manifest_store import SegmentedManifestStore
 
 
 s3 = boto3.resource('s3')
@@ -19,6 +24,11 @@ source_prefix = "bronze/gamechanger/rpa-landing-zone/"
 
 destination_bucket = "advana-data-zone"
 
+# number of zip members uploaded concurrently, each upload streams one member at a time
+upload_workers = int(os.environ.get('RPA_UPLOAD_WORKERS', 8))
+# per-upload transfer config, no extra threads so memory stays ~ upload_workers * multipart_chunksize
+member_transfer_config = TransferConfig(use_threads=False)
+
 
 def filter_and_move():
     """
@@ -28,15 +38,14 @@ def filter_and_move():
 
         Things that happen in this function...
             retrieve zips from s3
-        for each zip, without downloading file, create zip obj ->
+        for each zip, without downloading file, create zip obj backed by ranged s3 reads ->
             read manifest.json for crawler used, metadata lines and version hashes
             get cumulative manifest for crawler used
             read through zip obj for metadata files, filter previous hashes from cumulative manifest (like scrapy does)
             create corrected manifest (matching what a scrapy crawler wouldve downloaded)
-            upload all new files, metadata, and corrected manifest
-            copy old cumulative manifest if exists, add new lines to new manifest
-            rename old cumulative manifest with datetime
-            upload new manifest
+            upload all new files and metadata through a bounded thread pool, then the corrected manifest
+            append corrected manifest lines as a new segment of the crawler's cumulative manifest
+            compact the cumulative manifest in the background once enough segments pile up
             delete zip from rpa landing zone
 
         any error - delete the created external-uploads/crawler-downloader/{external_uploads_dt} bucket and dont delete the zip from rpa landing zone
@@ -45,6 +54,10 @@ def filter_and_move():
     print('fetching zips...')
     zips_as_s3_objs = get_filename_s3_obj_map()
     print('objs :', zips_as_s3_objs.values())
+    # cumulative manifest compaction runs in the background while the next zips are handled
+    compactor = ThreadPoolExecutor(max_workers=1)
+    compactions = []
+    compacting_crawlers = set()
     for zip_filename, s3_obj in zips_as_s3_objs.items():
         print('checking', zip_filename)
         # archive keeps the original filename so zip_filename irrelevant when searching in the zip but it is useful for identifying the zip name
@@ -55,10 +68,10 @@ def filter_and_move():
 
         crawler_used = None
         try:
-            # create in memory zip file object
-            in_memory_zip = create_byte_obj(s3_obj)
+            # create s3 backed zip file object, central directory and members are read lazily with ranged gets
+            ranged_zip = create_ranged_file_obj(s3_obj)
 
-            with ZipFile(in_memory_zip, 'r') as zf:
+            with ranged_zip, ZipFile(ranged_zip, 'r') as zf, ThreadPoolExecutor(max_workers=upload_workers) as executor:
                 zip_names = zf.namelist()
                 # in archive base name (ie the original folder name when zipped)
                 base_dir = base_dir_heuristic(zip_names)
@@ -94,89 +107,66 @@ def filter_and_move():
                     # skip to next zip
                     continue
 
-                previous_hashes, cmltv_manifest_s3_obj, cmltv_manifest_lines = get_previous_manifest_for_crawler(
-                    crawler_used)
-
-                not_in_previous_hashes = set()
-
-                # sorting through the version hashes and checking for new files
-                for name in zip_names:
-                    if name.endswith('.metadata'):
-                        with zf.open(name) as metadata:
-                            # we need to correct the metadata for utf-8 first, then read everything else
-                            data = metadata.read()
-                            corrected_metadata = codecs.decode(
-                                data, 'utf-8-sig')
-                        metadata.close()
-
-                        # print for error checking (to be removed)
-                        print("raw data: " + data.decode() + "\n")
-                        print("cleaned metadata: " +
-                              str(corrected_metadata) + "\n")
-                        # clean just in case for newlines
-                        corrected_metadata = corrected_metadata.replace(
-                            "\n", "")
-                        # now read the metadata line as a json and get its version hash
-                        try:
-                            jsondoc = json.loads(corrected_metadata)
-                            version_hash = jsondoc.get('version_hash', None)
-                        except:
-                            print("WARNING: metadata file errored on load. Skipping")
-                            continue
-                        # only getting docs that aren't in previous hashes
-                        if version_hash and not version_hash in previous_hashes:
-                            not_in_previous_hashes.add(name)
-                            corrected_manifest_jdocs.append(jsondoc)
-
-                            # upload all of the files not in previous version hashes to s3
-                            zip_filename = name.replace(
-                                '.metadata', '')  # name of the main file
-                            if zip_filename in zip_names:
-                                # upload the main file
-                                upload_file_from_zip(
-                                    zf_ref=zf, zip_filename=zip_filename, prefix=destination_prefix_dt)
-                                # upload the metadata
-                                upload_jsonlines(
-                                    lines=[jsondoc], filename=name, prefix=destination_prefix_dt)
-
-                # upload the manifest file after getting all correctd metadata jdocs
-                upload_jsonlines(
-                    lines=corrected_manifest_jdocs, filename='manifest.json', prefix=destination_prefix_dt)
-
-                # the manifest from rpa is everything because it can't determine previous hashes before downloading
-                # need to make a corrected one from filtered hashes (like scrapy does)
-                with tempfile.TemporaryFile(mode='r+', encoding="UTF-8") as new_manifest:
-                    # new crawlers wont have existing cumulative manifest
-                    if cmltv_manifest_s3_obj:
-
-                        # copy old cumulative manifest lines into new manifest file
-                        for jsondoc in cmltv_manifest_lines:
-                            line = json.dumps(jsondoc) + '\n'
-                            new_manifest.write(line)
-
-                        # s3 copy old cumulative manifest to a new name before overwriting
-                        ts = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-                        backup_filename = f'cumulative-manifest.{ts}.json'
-                        backup_prefix = get_cumulative_manifest_prefix(crawler_used).replace(
-                            'cumulative-manifest.json', backup_filename)
-                        s3.Object(destination_bucket, backup_prefix).copy_from(
-                            CopySource={'Key': cmltv_manifest_s3_obj.key,
-                                        'Bucket': cmltv_manifest_s3_obj.bucket_name}
-                        )
-
-                    for jsondoc in corrected_manifest_jdocs:
-                        line = json.dumps(jsondoc) + '\n'
-                        new_manifest.write(line)
-
-                    # rewind file to top so there is data to read for put_object
-                    new_manifest.seek(0)
-
-                    key = get_cumulative_manifest_prefix(crawler_used)
-                    s3_client.put_object(
-                        Body=new_manifest.buffer,
-                        Bucket=destination_bucket,
-                        Key=key
-                    )
+                manifest_store = get_manifest_store_for_crawler(crawler_used)
+                previous_hashes = get_previous_hashes_for_crawler(manifest_store, crawler_used)
+                # the index is mmapped, it has to be closed whatever happens to this zip
+                with closing(previous_hashes):
+                    not_in_previous_hashes = set()
+                    upload_futures = []
+
+                    # sorting through the version hashes and checking for new files
+                    for name in zip_names:
+                        if name.endswith('.metadata'):
+                            with zf.open(name) as metadata:
+                                # we need to correct the metadata for utf-8 first, then read everything else
+                                data = metadata.read()
+                                corrected_metadata = codecs.decode(
+                                    data, 'utf-8-sig')
+
+                            # clean just in case for newlines
+                            corrected_metadata = corrected_metadata.replace(
+                                "\n", "")
+                            # now read the metadata line as a json and get its version hash
+                            try:
+                                jsondoc = json.loads(corrected_metadata)
+                                version_hash = jsondoc.get('version_hash', None)
+                            except:
+                                print("WARNING: metadata file errored on load. Skipping")
+                                continue
+                            # only getting docs that aren't in previous hashes
+                            if version_hash and not version_hash in previous_hashes:
+                                not_in_previous_hashes.add(name)
+                                corrected_manifest_jdocs.append(jsondoc)
+
+                                # upload all of the files not in previous version hashes to s3
+                                zip_filename = name.replace(
+                                    '.metadata', '')  # name of the main file
+                                if zip_filename in zip_names:
+                                    # upload the main file
+                                    upload_futures.append(executor.submit(
+                                        upload_file_from_zip,
+                                        zf_ref=zf, zip_filename=zip_filename, prefix=destination_prefix_dt))
+                                    # upload the metadata
+                                    upload_futures.append(executor.submit(
+                                        upload_jsonlines,
+                                        lines=[jsondoc], filename=name, prefix=destination_prefix_dt))
+
+                    # wait on all member uploads, any failure raises here and the uploads get undone below
+                    for future in upload_futures:
+                        future.result()
+
+                    # upload the manifest file after getting all correctd metadata jdocs
+                    upload_jsonlines(
+                        lines=corrected_manifest_jdocs, filename='manifest.json', prefix=destination_prefix_dt)
+
+                    # the manifest from rpa is everything because it can't determine previous hashes before downloading
+                    # need to make a corrected one from filtered hashes (like scrapy does)
+                    # corrected lines are appended to the cumulative manifest as a new segment, nothing is rewritten
+                    manifest_store.append_segment(corrected_manifest_jdocs)
+
+                if crawler_used not in compacting_crawlers and manifest_store.needs_compaction():
+                    compacting_crawlers.add(crawler_used)
+                    compactions.append(compactor.submit(manifest_store.compact))
 
         except:
             msg = f"[ERROR] RPA Landing Zone mover failed while handling the following:\n {source_bucket}/{s3_obj.key}"
@@ -193,6 +183,15 @@ def filter_and_move():
         # if no errors, go ahead and delete the zip so it won't be picked up again
         s3_obj.delete()
 
+    compactor.shutdown(wait=True)
+    for compaction in compactions:
+        try:
+            compaction.result()
+        except:
+            # uncompacted segments are still read on load, compaction is retried on the next run
+            msg = '[WARN] RPA Landing Zone Mover failed compacting a cumulative manifest'
+            notify_with_tb(msg, traceback)
+
 
 def base_dir_heuristic(zip_names: list):
     dirs = [zn for zn in zip_names if zn.endswith("/")]
@@ -226,35 +225,40 @@ def get_cumulative_manifest_prefix(crawler_used):
     return f"bronze/gamechanger/data-pipelines/orchestration/crawlers_rpa/{crawler_used}/cumulative-manifest.json"
 
 
-def get_previous_manifest_for_crawler(crawler_used) -> typing.Tuple[set, typing.Union[None, object]]:
-    previous_hashes = set()
-    manifest_s3_obj = None
-    lines = None
+def get_manifest_store_prefix(crawler_used):
+    return f"bronze/gamechanger/data-pipelines/orchestration/crawlers_rpa/{crawler_used}/cumulative-manifest"
+
+
+def get_manifest_store_for_crawler(crawler_used) -> SegmentedManifestStore:
+    return SegmentedManifestStore(
+        s3_client=s3_client,
+        bucket=destination_bucket,
+        prefix=get_manifest_store_prefix(crawler_used),
+        legacy_manifest_key=get_cumulative_manifest_prefix(crawler_used)
+    )
+
+
+def get_previous_hashes_for_crawler(manifest_store: SegmentedManifestStore, crawler_used):
+    """Version hash index of everything previously moved for the crawler, supports `in` checks"""
     try:
-        key = get_cumulative_manifest_prefix(crawler_used)
-        s3_obj = s3.Object(source_bucket, key)
-        lines = s3_obj.get()['Body'].read().decode(
-            'utf-8').splitlines()
-        if lines:
-            for line in lines:
-                jsondoc = json.loads(line)
-                version_hash = jsondoc.get('version_hash', None)
-                if version_hash:
-                    previous_hashes.add(version_hash)
-
-            # only set it if it has lines, would still be an Object otherwise
-            manifest_s3_obj = s3_obj
-
-    except s3_client.exceptions.NoSuchKey:
-        msg = f"[WARN] No cumulative-manifest found for {crawler_used}, a new one will be created"
-        slack.send_notification(msg)
+        previous_hashes = manifest_store.load_version_hashes()
     except Exception as e:
         msg = f"[ERROR] Unexpected error occurred getting previous manifest for crawler: {crawler_used}"
         notify_with_tb(msg, traceback)
         raise e
 
-    finally:
-        return (previous_hashes, manifest_s3_obj, lines)
+    if not len(previous_hashes):
+        msg = f"[WARN] No cumulative-manifest found for {crawler_used}, a new one will be created"
+        slack.send_notification(msg)
+
+    return previous_hashes
+
+
+def compact_manifests(crawlers: typing.Iterable[str]):
+    """Fold all appended segments into the index for the given crawlers' cumulative manifests"""
+    for crawler_used in crawlers:
+        print('compacting cumulative manifest for', crawler_used)
+        get_manifest_store_for_crawler(crawler_used).compact()
 
 
 def get_filename_s3_obj_map() -> typing.Dict[str, object]:
@@ -268,17 +272,16 @@ def get_filename_s3_obj_map() -> typing.Dict[str, object]:
     return out
 
 
-def create_byte_obj(s3_obj):
-    body_bytes = s3_obj.get()['Body'].read()
-    bytes_obj = BytesIO(body_bytes)
-    return bytes_obj
+def create_ranged_file_obj(s3_obj) -> S3RangedFile:
+    """Seekable file object over the s3 zip, only the byte ranges ZipFile asks for are downloaded"""
+    return S3RangedFile.from_s3_obj(s3_client, s3_obj)
 
 
 def upload_file_from_zip(zf_ref, zip_filename, prefix, bucket=destination_bucket):
     with zf_ref.open(zip_filename, "r") as f:
         _, __, filename = zip_filename.rpartition('/')
         s3_client.upload_fileobj(
-            f, bucket, f"{prefix}/{filename}")
+            f, bucket, f"{prefix}/{filename}", Config=member_transfer_config)
 
 
 def upload_jsonlines(lines: typing.List[dict], filename: str, prefix: str, bucket=destination_bucket):
@@ -1,4 +1,8 @@
+import io
 import subprocess
+import threading
+import typing
+from collections import OrderedDict
 
 
 def ls(s3_path: str, recursive: bool = False) -> list:
@@ -11,3 +15,124 @@ def ls(s3_path: str, recursive: bool = False) -> list:
     ]
 
     return file_list
+
+
+class S3RangedFile(io.RawIOBase):
+    """Read-only, seekable file object backed by ranged GETs against a single S3 object
+
+    Reads are served from fixed-size blocks that are fetched on demand and kept in a small
+    LRU cache, so consumers like ZipFile can jump to the central directory and stream
+    individual members without the whole object ever being held in memory.
+    """
+
+    DEFAULT_BLOCK_SIZE = 8 * 1024 * 1024
+    DEFAULT_MAX_CACHED_BLOCKS = 8
+
+    def __init__(self, s3_client, bucket: str, key: str, size: typing.Optional[int] = None,
+                 block_size: int = DEFAULT_BLOCK_SIZE, max_cached_blocks: int = DEFAULT_MAX_CACHED_BLOCKS):
+        super().__init__()
+        if block_size <= 0:
+            raise ValueError(f"Invalid block_size given: {block_size}")
+        if max_cached_blocks <= 0:
+            raise ValueError(f"Invalid max_cached_blocks given: {max_cached_blocks}")
+
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.size = size if size is not None else s3_client.head_object(Bucket=bucket, Key=key)['ContentLength']
+        self.block_size = block_size
+        self.max_cached_blocks = max_cached_blocks
+
+        self._pos = 0
+        self._blocks: 'OrderedDict[int, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.range_requests = 0
+
+    @classmethod
+    def from_s3_obj(cls, s3_client, s3_obj, **kwargs) -> 'S3RangedFile':
+        """Create from a boto3 Object/ObjectSummary without issuing an extra HEAD request"""
+        return cls(s3_client, bucket=s3_obj.bucket_name, key=s3_obj.key, size=getattr(s3_obj, 'size', None), **kwargs)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence given: {whence}")
+
+        if pos < 0:
+            raise ValueError(f"Negative seek position {pos}")
+
+        self._pos = pos
+        return self._pos
+
+    def _get_block(self, index: int) -> bytes:
+        with self._lock:
+            block = self._blocks.get(index)
+            if block is not None:
+                self._blocks.move_to_end(index)
+                return block
+
+        start = index * self.block_size
+        end = min(start + self.block_size, self.size) - 1
+        response = self.s3_client.get_object(Bucket=self.bucket, Key=self.key, Range=f"bytes={start}-{end}")
+        block = response['Body'].read()
+
+        with self._lock:
+            self.range_requests += 1
+            self._blocks[index] = block
+            self._blocks.move_to_end(index)
+            while len(self._blocks) > self.max_cached_blocks:
+                self._blocks.popitem(last=False)
+
+        return block
+
+    def read(self, size: int = -1) -> bytes:
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+
+        if self._pos >= self.size:
+            return b''
+
+        if size is None or size < 0:
+            size = self.size - self._pos
+        size = min(size, self.size - self._pos)
+
+        chunks = []
+        while size > 0:
+            index, offset = divmod(self._pos, self.block_size)
+            block = self._get_block(index)
+            chunk = block[offset:offset + size]
+            if not chunk:
+                break
+            chunks.append(chunk)
+            self._pos += len(chunk)
+            size -= len(chunk)
+
+        return b''.join(chunks)
+
+    def readall(self) -> bytes:
+        return self.read(-1)
+
+    def readinto(self, b) -> int:
+        data = self.read(len(b))
+        n = len(data)
+        b[:n] = data
+        return n
+
+    def close(self) -> None:
+        with self._lock:
+            self._blocks.clear()
+        super().close()
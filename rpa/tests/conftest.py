@@ -0,0 +1,75 @@
+import hashlib
+import io
+
+import pytest
+
+pytest.importorskip("botocore")
+from botocore.exceptions import ClientError
+
+
+class FakeBody(io.BytesIO):
+    def iter_lines(self):
+        yield from self.read().splitlines()
+
+
+class FakePaginator:
+    def __init__(self, client):
+        self.client = client
+
+    def paginate(self, Bucket, Prefix):
+        keys = sorted(k for (b, k) in self.client.objects if b == Bucket and k.startswith(Prefix))
+        # two keys per page, so callers have to follow pagination
+        for i in range(0, len(keys), 2):
+            yield {'Contents': [{'Key': k, 'Size': len(self.client.objects[(Bucket, k)])} for k in keys[i:i + 2]]}
+
+
+class FakeS3Client:
+    """In-memory stand-in for the boto3 s3 client calls the rpa movers make"""
+
+    def __init__(self):
+        self.objects = {}
+        self.calls = []
+
+    def _get(self, bucket, key, operation):
+        try:
+            return self.objects[(bucket, key)]
+        except KeyError:
+            raise ClientError({'Error': {'Code': 'NoSuchKey', 'Message': key}}, operation)
+
+    def head_object(self, Bucket, Key):
+        data = self._get(Bucket, Key, 'HeadObject')
+        return {'ContentLength': len(data), 'ETag': f'"{hashlib.md5(data).hexdigest()}"'}
+
+    def get_object(self, Bucket, Key, Range=None):
+        data = self._get(Bucket, Key, 'GetObject')
+        self.calls.append(('get_object', Key, Range))
+        if Range is not None:
+            start, end = (int(n) for n in Range[len('bytes='):].split('-'))
+            data = data[start:end + 1]
+        return {'Body': FakeBody(data)}
+
+    def put_object(self, Body, Bucket, Key):
+        self.objects[(Bucket, Key)] = bytes(Body)
+
+    def upload_fileobj(self, fileobj, bucket, key):
+        self.objects[(bucket, key)] = fileobj.read()
+
+    def download_file(self, bucket, key, filename):
+        self.calls.append(('download_file', key, None))
+        with open(filename, 'wb') as f:
+            f.write(self._get(bucket, key, 'GetObject'))
+
+    def copy_object(self, Bucket, Key, CopySource):
+        self.objects[(Bucket, Key)] = self._get(CopySource['Bucket'], CopySource['Key'], 'CopyObject')
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def get_paginator(self, name):
+        assert name == 'list_objects_v2'
+        return FakePaginator(self)
+
+
+@pytest.fixture
+def s3_client():
+    return FakeS3Client()
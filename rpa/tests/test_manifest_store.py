@@ -0,0 +1,108 @@
+import os
+import threading
+
+from rpa.manifest_store import SegmentedManifestStore, VersionHashIndex
+
+BUCKET = 'bucket'
+
+
+def make_store(s3_client, tmp_path, **kwargs):
+    return SegmentedManifestStore(s3_client, BUCKET, 'manifests/crawler/', cache_dir=str(tmp_path), **kwargs)
+
+
+def test_index_lookup_from_serialized_file(tmp_path):
+    index = VersionHashIndex()
+    for version_hash in ['b', 'a', 'c']:
+        index.add(version_hash)
+    path = tmp_path / 'index.idx'
+    path.write_bytes(index.to_bytes(covered_segments=['s2.jsonl', 's1.jsonl']))
+
+    loaded = VersionHashIndex.from_file(path)
+    try:
+        assert all(h in loaded for h in ['a', 'b', 'c'])
+        assert 'd' not in loaded
+        assert loaded.covered_segments == {'s1.jsonl', 's2.jsonl'}
+        # newly seen hashes go to the overlay, the mapped keys stay as they are
+        loaded.add('d')
+        assert 'd' in loaded and len(loaded) == 4
+    finally:
+        loaded.close()
+
+
+def test_append_load_and_compact(s3_client, tmp_path):
+    store = make_store(s3_client, tmp_path, max_uncompacted_segments=2)
+    for batch in [['h1', 'h2'], ['h3'], ['h4', None]]:
+        store.append_segment([{'version_hash': h, 'doc_name': f'doc {h}'} for h in batch])
+    assert store.append_segment([]) is None
+    assert len(store.list_segments()) == 3
+    assert store.needs_compaction()
+
+    index = store.load_version_hashes()
+    assert all(h in index for h in ['h1', 'h2', 'h3', 'h4']) and len(index) == 4
+    index.close()
+
+    store.compact()
+    segments = [name for name, _ in store.list_segments()]
+    assert len(segments) == 1 and segments[0].endswith('-merged.jsonl')
+    assert not store.needs_compaction()
+    # merged segment holds every line, including ones without a version hash
+    assert len(list(store.iter_segment_lines(segments[0]))) == 5
+
+    store.append_segment([{'version_hash': 'h5'}])
+    index = store.load_version_hashes()
+    try:
+        assert segments[0] in index.covered_segments
+        assert all(h in index for h in ['h1', 'h4', 'h5']) and 'h6' not in index
+    finally:
+        index.close()
+
+
+def test_legacy_manifest_is_adopted(s3_client, tmp_path):
+    s3_client.put_object(Body=b'{"version_hash": "old"}\n', Bucket=BUCKET, Key='legacy/manifest.json')
+    store = make_store(s3_client, tmp_path, legacy_manifest_key='legacy/manifest.json')
+
+    index = store.load_version_hashes()
+    try:
+        assert 'old' in index
+    finally:
+        index.close()
+
+
+def test_concurrent_index_loads_share_the_cache(s3_client, tmp_path):
+    store = make_store(s3_client, tmp_path)
+    store.append_segment([{'version_hash': 'h1'}, {'version_hash': 'h2'}])
+    store.compact()
+    (tmp_path / 'unrelated.idx').write_bytes(b'')
+
+    def load_index():
+        for _ in range(20):
+            index = store._load_index()
+            try:
+                assert 'h1' in index
+            finally:
+                index.close()
+
+    errors = []
+    threads = [threading.Thread(target=lambda: errors.extend(_catch(load_index))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+    # a new index version replaces the cached one, temp files don't linger
+    store.append_segment([{'version_hash': 'h3'}])
+    store.compact()
+    index = store._load_index()
+    index.close()
+    cached = sorted(os.listdir(tmp_path))
+    assert len([name for name in cached if name != 'unrelated.idx']) == 1
+    assert not any(name.endswith('.part') for name in cached)
+
+
+def _catch(func):
+    try:
+        func()
+    except Exception as e:
+        return [e]
+    return []
@@ -0,0 +1,65 @@
+import io
+import zipfile
+
+import pytest
+
+from rpa.s3 import S3RangedFile
+
+BUCKET = 'bucket'
+DATA = bytes(range(256)) * 40
+
+
+@pytest.fixture
+def ranged_file(s3_client):
+    s3_client.put_object(Body=DATA, Bucket=BUCKET, Key='landing/data.bin')
+    return S3RangedFile(s3_client, BUCKET, 'landing/data.bin', block_size=1000, max_cached_blocks=2)
+
+
+def test_reads_across_block_boundaries(ranged_file):
+    assert ranged_file.size == len(DATA)
+    ranged_file.seek(990)
+    assert ranged_file.read(2020) == DATA[990:3010]
+    assert ranged_file.tell() == 3010
+    # blocks 0-3, one ranged request each
+    assert ranged_file.range_requests == 4
+
+    ranged_file.seek(-10, io.SEEK_END)
+    assert ranged_file.read() == DATA[-10:]
+    assert ranged_file.read(5) == b''
+    ranged_file.seek(5)
+    ranged_file.seek(5, io.SEEK_CUR)
+    buf = bytearray(3)
+    assert ranged_file.readinto(buf) == 3 and bytes(buf) == DATA[10:13]
+
+
+def test_cached_blocks_are_reused_then_evicted(ranged_file, s3_client):
+    ranged_file.read(1500)
+    ranged_file.seek(0)
+    ranged_file.read(1500)
+    assert ranged_file.range_requests == 2
+
+    # only two blocks are kept, so block 0 is fetched again after reading blocks 2 and 3
+    ranged_file.seek(2000)
+    ranged_file.read(2000)
+    ranged_file.seek(0)
+    ranged_file.read(10)
+    assert ranged_file.range_requests == 5
+    assert ('get_object', 'landing/data.bin', 'bytes=3000-3999') in s3_client.calls
+
+
+def test_zipfile_reads_members_through_ranged_reads(s3_client):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as zf:
+        zf.writestr('a.pdf', DATA)
+        zf.writestr('a.pdf.metadata', b'{"doc_name": "a"}')
+    s3_client.put_object(Body=buf.getvalue(), Bucket=BUCKET, Key='landing/batch.zip')
+
+    with S3RangedFile(s3_client, BUCKET, 'landing/batch.zip', block_size=512) as f:
+        with zipfile.ZipFile(f) as zf:
+            assert zf.read('a.pdf.metadata') == b'{"doc_name": "a"}'
+            assert zf.read('a.pdf') == DATA
+
+
+def test_invalid_block_size(s3_client):
+    with pytest.raises(ValueError):
+        S3RangedFile(s3_client, BUCKET, 'landing/data.bin', size=10, block_size=0)